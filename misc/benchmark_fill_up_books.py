@@ -0,0 +1,112 @@
+"""Quick benchmark of the per-date loop and the as-of fill up of the book logs."""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils import BookKeeperDataOps  # noqa: E402
+from utils.bk_schema import apply_book_logs_schema  # noqa: E402
+
+
+def generate_logs(n: int, days: int) -> pd.DataFrame:
+    """Generate the logs of n books, each logged about once a week."""
+    rng = np.random.default_rng(0)
+    n_logs = max(days // 7, 1)
+    slugs = np.repeat([f"bench-author-book-{i}" for i in range(n)], n_logs)
+    offsets = rng.integers(0, days, size=n * n_logs)
+    return apply_book_logs_schema(
+        pd.DataFrame(
+            {
+                "slug": slugs,
+                "title": "Bench Book",
+                "author": "Bench Author",
+                "page_n": 300,
+                "page_current": rng.integers(0, 300, size=n * n_logs),
+                "finish_date": None,
+                "deleted": False,
+                "log_created_at": pd.Timestamp("2024-01-01")
+                + pd.to_timedelta(offsets, unit="D"),
+            }
+        ).drop_duplicates(["slug", "log_created_at"])
+    )
+
+
+def fill_up_book_df_loop(
+    book_df: pd.DataFrame, df_dates: Iterable[pd.Timestamp]
+) -> pd.DataFrame:
+    """Fill up the logs of one book with a query per date, as it used to be."""
+    latest_log: pd.DataFrame
+    rows_to_add: list[pd.DataFrame] = []
+    first_log_date = book_df["log_created_at"].min()
+
+    for date in (d for d in df_dates if d >= first_log_date):
+        row_for_date = book_df.query(f"log_created_at == '{date}'")
+
+        if row_for_date.shape[0] > 0:
+            latest_log = row_for_date.iloc[0]
+
+        else:
+            new_row = latest_log.copy()
+            new_row["log_created_at"] = date
+            rows_to_add.append(new_row)
+
+    return pd.concat([pd.DataFrame(rows_to_add), book_df], axis=0)
+
+
+def get_sorted_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """Get the slug, the date and the page count of the rows, sorted."""
+    return (
+        df[["slug", "log_created_at", "page_current"]]
+        .astype({"slug": str, "page_current": int, "log_created_at": "datetime64[s]"})
+        .sort_values(["slug", "log_created_at"])
+        .reset_index(drop=True)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1, 100, 10_000])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument(
+        "--loop-max",
+        type=int,
+        default=100,
+        help="skip the per-date loop above this many books",
+    )
+    args = parser.parse_args()
+    # the loop compares the dates as strings, as it used to
+    warnings.simplefilter("ignore", FutureWarning)
+
+    bkdata = BookKeeperDataOps()
+    df_dates = pd.date_range("2024-01-01", periods=args.days, freq="D")
+    print(f"{'books':>8} {'mode':>8} {'seconds':>9} {'rows':>10}")
+    for n in args.sizes:
+        books_df = generate_logs(n, args.days)
+
+        start = time.perf_counter()
+        filled_df = bkdata.fill_up_books_df(books_df, df_dates)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>8} {'as-of':>8} {elapsed:>9.3f} {len(filled_df):>10}")
+
+        if n > args.loop_max:
+            continue
+
+        start = time.perf_counter()
+        looped_df = pd.concat(
+            fill_up_book_df_loop(book_df, df_dates)
+            for _, book_df in books_df.groupby("slug", observed=True)
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{n:>8} {'loop':>8} {elapsed:>9.3f} {len(looped_df):>10}")
+
+        pd.testing.assert_frame_equal(
+            get_sorted_keys(filled_df), get_sorted_keys(looped_df)
+        )
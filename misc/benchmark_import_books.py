@@ -0,0 +1,63 @@
+"""Quick benchmark of the bulk import of a reading list file."""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils import BookKeeperIO  # noqa: E402
+from utils.bk_import import IMPORT_CHUNK_SIZE, BookLogsImporter  # noqa: E402
+
+BENCHMARK_USER = "benchmark_import_books"
+
+
+def generate_reading_list(n: int) -> pd.DataFrame:
+    """Generate a reading list of n books, one in a hundred invalid."""
+    return pd.DataFrame(
+        {
+            "title": [f"Book {i}" if i % 100 else "" for i in range(n)],
+            "author": [f"Bench Áuthor {i % 1000}" for i in range(n)],
+            "publisher": "Bench Publisher",
+            "published_year": 2020,
+            "page_n": 300,
+            "page_current": [i % 300 for i in range(n)],
+            "tag1": "bench",
+            "language": "en",
+            "log_created_at": "2024-01-01",
+        }
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1_000, 100_000])
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    bk = BookKeeperIO(BENCHMARK_USER)
+    print(f"{'rows':>8} {'format':>6} {'seconds':>9} {'rows/sec':>10}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in args.sizes:
+            books_df = generate_reading_list(n)
+            for suffix in ("csv", "jsonl"):
+                path = os.path.join(tmp_dir, f"books.{suffix}")
+                if suffix == "csv":
+                    books_df.to_csv(path, index=False)
+                else:
+                    books_df.to_json(path, orient="records", lines=True)
+
+                bk.table.drop(bk.sql_engine, checkfirst=True)
+                bk._forget_user_table()
+                importer = BookLogsImporter(bk, chunk_size=args.chunk_size)
+
+                start = time.perf_counter()
+                importer.run(path)
+                elapsed = time.perf_counter() - start
+                print(f"{n:>8} {suffix:>6} {elapsed:>9.3f} {n / elapsed:>10.0f}")
+
+    bk.table.drop(bk.sql_engine, checkfirst=True)
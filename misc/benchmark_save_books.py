@@ -0,0 +1,75 @@
+"""Quick benchmark of the row-by-row and the bulk save path of BookKeeperIO."""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils import BookKeeperIO  # noqa: E402
+
+BENCHMARK_USER = "benchmark_save_books"
+
+
+def generate_books(n: int) -> pd.DataFrame:
+    """Generate n books logged today."""
+    today = pd.Timestamp.today().normalize().date()
+    return pd.DataFrame(
+        {
+            "title": [f"Book {i}" for i in range(n)],
+            "subtitle": "",
+            "author": "Bench Author",
+            "location": "shelf",
+            "publisher": "Bench Publisher",
+            "published_year": 2020,
+            "page_n": 300,
+            "page_current": [i % 300 for i in range(n)],
+            "finish_date": None,
+            "tag1": "bench",
+            "tag2": "",
+            "tag3": "",
+            "language": "en",
+            "slug": [f"bench-author-book-{i}" for i in range(n)],
+            "started": True,
+            "deleted": False,
+            "log_created_at": today,
+        }
+    )
+
+
+def time_save(bk: BookKeeperIO, df: pd.DataFrame, bulk: bool) -> float:
+    """Save the dataframe into an empty table and return the elapsed seconds."""
+    bk.table.drop(bk.sql_engine, checkfirst=True)
+    bk._create_user_table()
+
+    start = time.perf_counter()
+    assert bk.save_books(df, bulk=bulk)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 1_000, 100_000])
+    parser.add_argument(
+        "--row-by-row-max",
+        type=int,
+        default=100_000,
+        help="skip the row-by-row path above this many rows",
+    )
+    args = parser.parse_args()
+
+    bk = BookKeeperIO(BENCHMARK_USER)
+    print(f"{'rows':>8} {'mode':>11} {'seconds':>9} {'rows/sec':>10}")
+    for n in args.sizes:
+        books_df = generate_books(n)
+        for bulk in (False, True):
+            if not bulk and n > args.row_by_row_max:
+                continue
+            elapsed = time_save(bk, books_df, bulk=bulk)
+            mode = "bulk" if bulk else "row-by-row"
+            print(f"{n:>8} {mode:>11} {elapsed:>9.3f} {n / elapsed:>10.0f}")
+
+    bk.table.drop(bk.sql_engine, checkfirst=True)
@@ -0,0 +1,90 @@
+"""
+Remove the redundant book logs of every user.
+
+A log is redundant when it repeats the previous log of the same book.
+Users are compacted one after the other, in batches of books committed
+together with a checkpoint, so an interrupted run continues where it stopped.
+"""
+
+import argparse
+import os
+import sys
+
+from sqlalchemy import inspect, select
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils.bk_compaction import (  # noqa: E402
+    COMPACTION_BATCH_SIZE,
+    BookLogsCompactor,
+    CompactionReport,
+)
+from utils.bk_engine import get_engine  # noqa: E402
+from utils.bk_io import (  # noqa: E402
+    BookKeeperIO,
+    StorageLayout,
+    get_partitioned_book_logs_table,
+    schema,
+    storage_layout,
+)
+
+USER_TABLE_SUFFIX = "_book_logs"
+
+engine = get_engine()
+
+
+def get_user_ids(layout: StorageLayout) -> list[str]:
+    """Get the users with logs in the given layout."""
+    if layout == StorageLayout.PARTITIONED:
+        table = get_partitioned_book_logs_table(schema)
+        if not inspect(engine).has_table(table.name, schema=schema):
+            return []
+        with engine.connect() as conn:
+            return (
+                conn.execute(
+                    select(table.c.user_id).distinct().order_by(table.c.user_id)
+                )
+                .scalars()
+                .all()
+            )
+
+    return sorted(
+        name[: -len(USER_TABLE_SUFFIX)]
+        for name in inspect(engine).get_table_names(schema=schema)
+        if name.endswith(USER_TABLE_SUFFIX)
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-size", type=int, default=COMPACTION_BATCH_SIZE)
+    parser.add_argument(
+        "--max-batches", type=int, help="stop each user after this many batches"
+    )
+    parser.add_argument(
+        "--layout",
+        choices=[layout.value for layout in StorageLayout],
+        default=storage_layout,
+    )
+    args = parser.parse_args()
+
+    layout = StorageLayout(args.layout)
+    user_ids = get_user_ids(layout)
+    print(f"{len(user_ids)} users to compact")
+
+    total = CompactionReport()
+    for i, user_id in enumerate(user_ids, start=1):
+        compactor = BookLogsCompactor(
+            BookKeeperIO(user_id, layout=layout), batch_size=args.batch_size
+        )
+        report = compactor.run(max_batches=args.max_batches)
+        total = CompactionReport(*(a + b for a, b in zip(total, report)))
+        print(
+            f"[{i}/{len(user_ids)}] {user_id}: {report.rows_deleted}"
+            f"/{report.rows_scanned} rows, {report.bytes_deleted} bytes"
+        )
+
+    print(
+        f"{total.rows_deleted}/{total.rows_scanned} rows deleted, "
+        f"{total.bytes_deleted} bytes deleted"
+    )
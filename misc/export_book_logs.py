@@ -0,0 +1,55 @@
+"""
+Export the book logs of a user to a CSV, JSON Lines or Parquet file.
+
+The logs are streamed from the database in chunks,
+so memory stays flat however long the history is.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils.bk_export import (  # noqa: E402
+    EXPORT_CHUNK_SIZE,
+    BookLogsExporter,
+    ExportFormat,
+)
+from utils.bk_io import BookKeeperIO, StorageLayout, storage_layout  # noqa: E402
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("user_id")
+    parser.add_argument("path", help="the file to write, its extension sets the format")
+    parser.add_argument(
+        "--format",
+        choices=[export_format.value for export_format in ExportFormat],
+        help="overrides the format given by the extension",
+    )
+    parser.add_argument(
+        "--latest", action="store_true", help="export only the latest log per book"
+    )
+    parser.add_argument("--start", type=date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    parser.add_argument(
+        "--layout",
+        choices=[layout.value for layout in StorageLayout],
+        default=storage_layout,
+    )
+    args = parser.parse_args()
+
+    exporter = BookLogsExporter(
+        BookKeeperIO(args.user_id, layout=StorageLayout(args.layout)),
+        chunk_size=args.chunk_size,
+    )
+    n_rows = exporter.export(
+        args.path,
+        export_format=ExportFormat(args.format) if args.format else None,
+        latest_only=args.latest,
+        start=args.start,
+        end=args.end,
+    )
+    print(f"{n_rows} logs exported to {args.path}")
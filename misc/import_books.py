@@ -0,0 +1,78 @@
+"""
+Import a reading list file into the book logs of a user.
+
+The file is a CSV or JSON Lines file with the columns of the book logs table,
+title and author are required. Books the user already has are skipped,
+the rows not imported are written to an error report.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils.bk_import import (  # noqa: E402
+    IMPORT_CHUNK_SIZE,
+    BookLogsImporter,
+    ImportFormat,
+    ImportReport,
+)
+from utils.bk_io import BookKeeperIO, StorageLayout, storage_layout  # noqa: E402
+
+PROGRESS_BAR_WIDTH = 30
+
+
+def print_progress(report: ImportReport, share: float) -> None:
+    """Print a progress bar of the import on one line."""
+    done = int(share * PROGRESS_BAR_WIDTH)
+    bar = "#" * done + "-" * (PROGRESS_BAR_WIDTH - done)
+    print(
+        f"\r[{bar}] {share:>4.0%} {report.rows_read} rows, "
+        f"{report.rows_imported} imported",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("user_id")
+    parser.add_argument(
+        "path", help="the file to import, its extension sets the format"
+    )
+    parser.add_argument(
+        "--format",
+        choices=[import_format.value for import_format in ImportFormat],
+        help="overrides the format given by the extension",
+    )
+    parser.add_argument(
+        "--errors", default="import_errors.csv", help="where to write the error report"
+    )
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument(
+        "--layout",
+        choices=[layout.value for layout in StorageLayout],
+        default=storage_layout,
+    )
+    args = parser.parse_args()
+
+    importer = BookLogsImporter(
+        BookKeeperIO(args.user_id, layout=StorageLayout(args.layout)),
+        chunk_size=args.chunk_size,
+    )
+    report = importer.run(
+        args.path,
+        import_format=ImportFormat(args.format) if args.format else None,
+        progress=print_progress,
+    )
+    print(file=sys.stderr)
+
+    print(
+        f"{report.rows_imported}/{report.rows_read} rows imported, "
+        f"{report.rows_duplicate} duplicates, {report.rows_invalid} invalid"
+    )
+    if importer.issues:
+        importer.write_issues(args.errors)
+        print(f"rows not imported are listed in {args.errors}")
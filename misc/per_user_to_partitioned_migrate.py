@@ -0,0 +1,123 @@
+"""
+Migrate the per-user book log tables into the partitioned book_logs table.
+
+Every <user>_book_logs table of the schema is copied in its own transaction,
+which also records the user in the book_logs_migration table.
+Users already recorded there are skipped, so an interrupted run can simply
+be restarted. Users are migrated in parallel by a pool of workers.
+"""
+
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Integer,
+    String,
+    Table,
+    func,
+    inspect,
+    literal,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from utils.bk_engine import get_engine  # noqa: E402
+from utils.bk_io import (  # noqa: E402
+    get_book_log_columns,
+    get_book_logs_table,
+    get_partitioned_book_logs_table,
+    metadata,
+    schema,
+)
+
+USER_TABLE_SUFFIX = "_book_logs"
+
+engine = get_engine()
+
+migration_table = Table(
+    "book_logs_migration",
+    metadata,
+    Column("user_id", String, primary_key=True),
+    Column("rows_copied", Integer),
+    Column("migrated_at", DateTime, server_default=func.now()),
+    schema=schema,
+)
+
+
+def get_user_ids() -> list[str]:
+    """Get the users that still have a per-user table to migrate."""
+    table_names = inspect(engine).get_table_names(schema=schema)
+    user_ids = {
+        name[: -len(USER_TABLE_SUFFIX)]
+        for name in table_names
+        if name.endswith(USER_TABLE_SUFFIX)
+    }
+
+    with engine.connect() as conn:
+        migrated = set(conn.execute(select(migration_table.c.user_id)).scalars())
+
+    return sorted(user_ids - migrated)
+
+
+def migrate_user(user_id: str) -> int:
+    """Copy the logs of one user and record the user as migrated."""
+    user_table = get_book_logs_table(f"{user_id}{USER_TABLE_SUFFIX}", schema)
+    partitioned_table = get_partitioned_book_logs_table(schema)
+    columns = [col.name for col in get_book_log_columns()]
+
+    # ids are left to the sequence of the partitioned table
+    logs = select(literal(user_id), *(user_table.c[col] for col in columns)).order_by(
+        user_table.c.id
+    )
+    stmt = (
+        insert(partitioned_table)
+        .from_select(["user_id", *columns], logs)
+        .on_conflict_do_nothing(index_elements=["user_id", "slug", "log_created_at"])
+    )
+
+    with engine.begin() as conn:
+        rows_copied = conn.execute(stmt).rowcount
+        conn.execute(
+            insert(migration_table).values(user_id=user_id, rows_copied=rows_copied)
+        )
+
+    return rows_copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only list the users to migrate"
+    )
+    args = parser.parse_args()
+
+    get_partitioned_book_logs_table(schema).create(engine, checkfirst=True)
+    migration_table.create(engine, checkfirst=True)
+
+    user_ids = get_user_ids()
+    print(f"{len(user_ids)} users to migrate")
+    if args.dry_run:
+        print("\n".join(user_ids))
+        sys.exit(0)
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(migrate_user, uid): uid for uid in user_ids}
+        for i, future in enumerate(as_completed(futures), start=1):
+            user_id = futures[future]
+            try:
+                print(f"[{i}/{len(user_ids)}] {user_id}: {future.result()} rows")
+            except Exception as e:  # noqa: B902
+                failed.append(user_id)
+                print(f"[{i}/{len(user_ids)}] {user_id}: failed - {e}")
+
+    if failed:
+        print(f"{len(failed)} users failed, rerun the script to retry them")
+        sys.exit(1)
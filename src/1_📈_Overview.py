@@ -7,17 +7,14 @@ Showing the statistics of the books that you have logged.
 """
 
 import math
-from datetime import datetime, timedelta
 
 import altair as alt
-import pandas as pd
 import streamlit as st
 
 from utils import BookKeeperDataOps, base_layout, with_authentication, with_user_logs
 
 # VARS
 OVERVIEW_LOTTIE_URL = "https://assets3.lottiefiles.com/packages/lf20_4XmSkB.json"
-TWO_WEEKS_AGO = datetime.today() - timedelta(days=14)
 
 
 @base_layout(
@@ -30,44 +27,14 @@ TWO_WEEKS_AGO = datetime.today() - timedelta(days=14)
 def main() -> None:
     """Main flow of the Overview page."""
     bkdata = BookKeeperDataOps()
-    latest_books_with_state_df = bkdata.add_books_state(
-        st.session_state.bk.remove_deleted_books(st.session_state.latest_book_state_df)
+    reading_stats = bkdata.get_reading_stats(
+        st.session_state.bk.get_reading_stats(),
+        st.session_state.latest_book_state_df,
+        st.session_state.bk.get_books_history(),
     )
-
-    ## BOOKS currently in progress
-    in_progress_books = latest_books_with_state_df.query(
-        "state == 'in progress'"
-    ).copy()
-    in_progress_books["progress_perc"] = in_progress_books.apply(
-        lambda x: round(x["page_current"] / x["page_n"] * 100, 2), axis=1
-    )
-
-    in_progress_book_titles = in_progress_books["slug"].tolist()  # noqa: F841
-
-    earliest_log_date_current = bkdata.get_earliest_log_for_books(  # noqa: F841
-        slugs=in_progress_book_titles, books_df=st.session_state.books_df
-    ) - pd.DateOffset(days=3)
-
-    filled_up_df = bkdata.fill_up_dataframe(st.session_state.books_df)
-
-    summed_pages = (
-        filled_up_df.groupby("log_created_at")
-        .agg({"page_current": "sum"})
-        .reset_index()
-    ).copy()
-
-    filled_up_currently_reading = filled_up_df.query(
-        "slug in @in_progress_book_titles and log_created_at >= @earliest_log_date_current"
-    ).copy()
-
-    summed_pages["smoothed_page_current"] = (
-        summed_pages["page_current"].ewm(span=15).mean()
-    )
-
-    books_read = latest_books_with_state_df.query("state == 'finished'").shape[0]
-    pages_read = summed_pages["page_current"].max()
-    earliest_log = filled_up_df["log_created_at"].min()
-    days_passed = (datetime.today().date() - earliest_log.date()).days
+    latest_books_with_state_df = reading_stats.books
+    in_progress_books = reading_stats.in_progress
+    kpis = reading_stats.kpis
 
     # UI
 
@@ -77,21 +44,21 @@ def main() -> None:
     with main_cols[0]:
         st.metric(
             "Books read",
-            books_read,
+            kpis["books_read"],
         )
     with main_cols[1]:
         st.metric(
             "Pages read",
-            int(summed_pages["page_current"].max()),
+            kpis["pages_read"],
         )
 
     with main_cols[2]:
-        st.metric("Days per books", round(days_passed / books_read, 2))
+        st.metric("Days per books", kpis["days_per_book"])
 
     with main_cols[3]:
         st.metric(
             "Pages per day",
-            round(pages_read / days_passed, 2),
+            kpis["pages_per_day"],
         )
 
     st.divider()
@@ -110,36 +77,16 @@ def main() -> None:
                 if row * col_counter + col >= in_progress_books.shape[0]:
                     break
                 book = in_progress_books.iloc[row * col_counter + col]
-                two_weeks_ago_pagecount_log = (
-                    bkdata.get_closest_date_pagecount_for_book(
-                        filled_up_currently_reading,
-                        book["slug"],
-                        date=TWO_WEEKS_AGO,
-                    )
-                )
                 with cols[col]:
-                    metric_delta = round(
-                        book["progress_perc"]
-                        - (
-                            two_weeks_ago_pagecount_log["page_current"]
-                            / book["page_n"]
-                            * 100
-                        ),
-                        2,
-                    )
                     st.metric(
                         label=f"{book['title']}",
                         value=f"{book['progress_perc']} %",
-                        delta=f"{metric_delta} %",
+                        delta=f"{book['progress_delta']} %",
                     )
 
-        filled_up_currently_reading["smoothed_page_current"] = (
-            filled_up_currently_reading["page_current"].ewm(span=3).mean()
-        )
-
         fig_currently_reading = (
             alt.Chart(
-                filled_up_currently_reading,
+                reading_stats.in_progress_daily,
                 title="Pages read over time - books in progress",
             )
             .mark_line(opacity=0.9, size=3)
@@ -159,12 +106,24 @@ def main() -> None:
     ## Reading stats
     with st.expander("Reading Statistics", expanded=False):
         st.markdown("### Reading Statistics")
+        rolling_rates = reading_stats.rolling_rates
+        rate_cols = st.columns(len(rolling_rates) + 1)
+        for rate_col, (window, rate) in zip(rate_cols, rolling_rates.items()):
+            with rate_col:
+                st.metric(f"Pages per day, last {window} days", rate)
+        with rate_cols[-1]:
+            st.metric(
+                "Reading streak",
+                f"{reading_stats.streaks['current']} days",
+                help=f"Longest streak: {reading_stats.streaks['longest']} days",
+            )
+
         fig_read_pages_all = (
-            alt.Chart(summed_pages, title="Pages read over time")
+            alt.Chart(reading_stats.daily, title="Pages read over time")
             .mark_line(opacity=0.8, color="#f5bf42", size=4)
             .encode(
-                x=alt.X("log_created_at", title="date"),
-                y=alt.Y("smoothed_page_current", title="pages read"),
+                x=alt.X("stat_date", title="date"),
+                y=alt.Y("smoothed_total_pages", title="pages read"),
             )
         )
 
@@ -80,19 +80,20 @@ def main() -> None:
             "tag3": book_tag3,
             "language": book_language,
         }
-        success, st.session_state.today_books_df = st.session_state.bk.add_book(
-            book, finished, st.session_state.today_books_df
-        )
+        similar_slugs = st.session_state.bk.get_similar_slugs(book)
+        success = st.session_state.bk.add_book(book, finished)
 
         if success:
             st.success("Book added!")
+            if similar_slugs:
+                st.info(f"Similar books already logged: {', '.join(similar_slugs)}")
         else:
             st.warning("Book already exists")
 
     st.divider()
 
     # show edited and deleted books
-    today_books_df = st.session_state.today_books_df
+    today_books_df = st.session_state.bk.get_today_batch()
     edited_books_df = today_books_df.query("deleted==False")
     deleted_books_df = today_books_df.query("deleted==True")
 
@@ -106,15 +107,13 @@ def main() -> None:
 
     if not today_books_df.empty:
         if st.button("Save updates"):
-            saved = st.session_state.bk.save_books(st.session_state.today_books_df)
+            saved = st.session_state.bk.save_books()
             if saved:
                 st.success("Books saved!")
                 with st.spinner("Updating books..."):
-                    (
-                        st.session_state.books_df,
-                        st.session_state.today_books_df,
-                        st.session_state.latest_book_state_df,
-                    ) = st.session_state.bk.get_updated_tables()
+                    _, st.session_state.latest_book_state_df = (
+                        st.session_state.bk.get_latest_tables()
+                    )
 
 
 if __name__ == "__main__":
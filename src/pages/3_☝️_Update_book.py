@@ -108,9 +108,7 @@ def main() -> None:
             "tag3": book_tag3,
             "language": selected_book.get("language"),
         }
-        success, st.session_state.today_books_df = st.session_state.bk.update_book(
-            book, finished, st.session_state.today_books_df
-        )
+        success = st.session_state.bk.update_book(book, finished)
         if success:
             st.success("Books updated!")
         else:
@@ -119,7 +117,7 @@ def main() -> None:
     st.divider()
 
     # show edited and deleted books
-    today_books_df = st.session_state.today_books_df
+    today_books_df = st.session_state.bk.get_today_batch()
     edited_books_df = today_books_df.query("deleted==False")
     deleted_books_df = today_books_df.query("deleted==True")
 
@@ -133,15 +131,13 @@ def main() -> None:
 
     if not today_books_df.empty:
         if st.button("Save updates"):
-            saved = st.session_state.bk.save_books(st.session_state.today_books_df)
+            saved = st.session_state.bk.save_books()
             if saved:
                 st.success("Books saved!")
                 with st.spinner("Updating books..."):
-                    (
-                        st.session_state.books_df,
-                        st.session_state.today_books_df,
-                        st.session_state.latest_book_state_df,
-                    ) = st.session_state.bk.get_updated_tables()
+                    _, st.session_state.latest_book_state_df = (
+                        st.session_state.bk.get_latest_tables()
+                    )
 
 
 if __name__ == "__main__":
@@ -32,20 +32,16 @@ def main() -> None:
     )
 
     if st.button("Delete book"):
-        success, st.session_state.today_books_df = st.session_state.bk.delete_book(
-            selected_slug_for_deletion,
-            st.session_state.today_books_df,
-            st.session_state.latest_book_state_df,
+        success = st.session_state.bk.delete_book(
+            selected_slug_for_deletion, st.session_state.latest_book_state_df
         )
         if success:
-            saved = st.session_state.bk.save_books(st.session_state.today_books_df)
+            saved = st.session_state.bk.save_books()
             if saved:
                 st.success("Book deleted!")
-                (
-                    st.session_state.books_df,
-                    st.session_state.today_books_df,
-                    st.session_state.latest_book_state_df,
-                ) = st.session_state.bk.get_updated_tables()
+                _, st.session_state.latest_book_state_df = (
+                    st.session_state.bk.get_latest_tables()
+                )
             else:
                 st.error("Something went wrong, please try again.")
         else:
@@ -60,7 +56,7 @@ def main() -> None:
     """
     )
 
-    today_books_df = st.session_state.today_books_df
+    today_books_df = st.session_state.bk.get_today_batch()
     deleted_books_df = today_books_df.query("deleted==True")
 
     selected_slug_for_revert = st.selectbox(
@@ -68,22 +64,14 @@ def main() -> None:
     )
 
     if st.button("Revert deletion"):
-        (
-            success,
-            st.session_state.today_books_df,
-        ) = st.session_state.bk.revert_deletion_book(
-            selected_slug_for_revert,
-            st.session_state.today_books_df,
-        )
+        success = st.session_state.bk.revert_deletion_book(selected_slug_for_revert)
         if success:
-            saved = st.session_state.bk.save_books(st.session_state.today_books_df)
+            saved = st.session_state.bk.save_books()
             if saved:
                 st.success("Book deletion reverted!")
-                (
-                    st.session_state.books_df,
-                    st.session_state.today_books_df,
-                    st.session_state.latest_book_state_df,
-                ) = st.session_state.bk.get_updated_tables()
+                _, st.session_state.latest_book_state_df = (
+                    st.session_state.bk.get_latest_tables()
+                )
             else:
                 st.error("Something went wrong, please try again.")
         else:
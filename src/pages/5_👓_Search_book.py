@@ -33,20 +33,28 @@ def main() -> None:
 
     # define filters
 
-    # filter by author
-
     st.markdown("### Configure the filters to find subset of books")
 
+    facet_counts = {
+        facet: bk_data_ops.get_facet_counts(
+            st.session_state.latest_book_state_df, facet
+        )
+        for facet in ("author", "publisher", "language", "tag")
+    }
+
     col1, col2, col3 = st.columns(3)
 
     with col1:
         selected_author = st.multiselect(
-            "Select author", not_deleted_books_latest_state["author"].unique()
+            "Select author",
+            facet_counts["author"].index,
+            format_func=lambda x: f"{x} ({facet_counts['author'][x]})",
         )
 
         selected_publisher = st.multiselect(
             "Select publisher",
-            not_deleted_books_latest_state["publisher"].unique(),
+            facet_counts["publisher"].index,
+            format_func=lambda x: f"{x} ({facet_counts['publisher'][x]})",
         )
 
     with col2:
@@ -67,30 +75,51 @@ def main() -> None:
             max_published_year,
         )
 
+    with col3:
+        selected_language = st.multiselect(
+            "Select language",
+            facet_counts["language"].index,
+            format_func=lambda x: f"{x} ({facet_counts['language'][x]})",
+        )
+
+        selected_tag = st.multiselect(
+            "Select tag",
+            facet_counts["tag"].index,
+            format_func=lambda x: f"{x} ({facet_counts['tag'][x]})",
+        )
+
     filtered_books = bk_data_ops.filter_books(
         st.session_state.latest_book_state_df,
         selected_author,
         selected_min_published_year,
         selected_max_published_year,
         selected_publisher,
+        s_language=selected_language,
+        s_tag=selected_tag,
     )
     st.markdown("Books matching filters")
     st.write(bk_data_ops.show_books_overview(filtered_books))
 
-    # filter by published year
-
-    # filter by tag
-
     st.divider()
-    st.markdown("### Select slug for book and find detailed logs")
+    st.markdown("### Search for a book and find detailed logs")
 
-    selected_slug = st.selectbox(  # noqa: F841
-        "Select book", not_deleted_books_latest_state["slug"].unique()
-    )
+    search_query = st.text_input("Search by title, author, tag or location")
+    book_slugs = not_deleted_books_latest_state["slug"].unique()
+    if search_query:
+        found_books = st.session_state.bk.search_books(
+            st.session_state.latest_book_state_df, search_query
+        )
+        if found_books.empty:
+            st.info(f"No books found for '{search_query}'.")
+        else:
+            st.write(bk_data_ops.show_books_overview(found_books))
+            book_slugs = found_books["slug"]
+
+    selected_slug = st.selectbox("Select book", book_slugs)
 
     # get the book
     selected_book_df = bk_data_ops.get_logs_for_book(
-        st.session_state.books_df, selected_slug
+        st.session_state.bk.get_books_history(), selected_slug
     )
     st.write(selected_book_df.sort_values("log_created_at", ascending=True))
 
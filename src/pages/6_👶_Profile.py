@@ -64,6 +64,20 @@ def main() -> None:
         except Exception as e:  # noqa: B902
             st.error(e)
 
+        # memory used by the book logs loaded in this session
+        if "bk" in st.session_state:
+            memory_report = st.session_state.bk.get_memory_report()
+            if memory_report is not None:
+                with st.expander("Memory used by your book logs"):
+                    st.dataframe(memory_report)
+
+            save_metrics = st.session_state.bk.get_save_metrics()
+            st.caption(
+                f"{save_metrics['upserts_written']} book logs saved, "
+                f"{save_metrics['upserts_avoided']} unchanged ones skipped "
+                "this session."
+            )
+
     ## If user gave wrong credentials
     elif st.session_state["authentication_status"] is False:
         st.error("Username/password is incorrect")
@@ -1,7 +1,28 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-"""Config vars for test module for BookKeeperIO."""
+"""Config vars and shared fixtures for test module for BookKeeperIO."""
+
+import pytest
+from sqlalchemy import delete, inspect
+
+from src.utils import BookKeeperIO
 
 TEST_BUCKET_NAME = "testinfrastructurestack-bookkeepertestbucket15775-10d3x3rqj0o54"
 TEST_REGION = "eu-north-1"
 TEST_USERNAME = "test-user"
+TEST_DB_USERNAME = "test_user"
+
+
+@pytest.fixture
+def db_bookkeeper_io():
+    """Return a BookKeeperIO instance and drop its logs and stats after the test."""
+    bk = BookKeeperIO(user_id=TEST_DB_USERNAME)
+    yield bk
+    bk.table.drop(bk.sql_engine, checkfirst=True)
+    # the statistics table is shared by every user, only the user's rows go
+    with bk.sql_engine.begin() as conn:
+        if inspect(conn).has_table(bk.reading_stats_table.name, schema=bk.schema):
+            conn.execute(
+                delete(bk.reading_stats_table).where(bk._reading_stats_filter())
+            )
+    bk._forget_user_table()
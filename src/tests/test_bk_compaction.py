@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_compaction."""
+
+from datetime import date, timedelta
+
+import pandas as pd
+
+from src.tests.conftest import TEST_DB_USERNAME
+from src.utils import BookKeeperDataOps, BookKeeperIO
+from src.utils.bk_compaction import BookLogsCompactor, get_redundant_log_ids
+from src.utils.bk_schema import apply_book_logs_schema
+
+START_DATE = date(2024, 1, 1)
+
+
+def make_logs(page_counts: dict[str, list[int]], finish_after: int = 3) -> pd.DataFrame:
+    """Return daily logs of the books, finished after the given number of days."""
+    logs = []
+    for slug, pages in page_counts.items():
+        for day, page_current in enumerate(pages):
+            log_created_at = START_DATE + timedelta(days=2 * day)
+            logs.append(
+                {
+                    "id": len(logs) + 1,
+                    "title": slug,
+                    "author": "Test Author",
+                    "page_n": 100,
+                    "page_current": page_current,
+                    "finish_date": (
+                        START_DATE + timedelta(days=finish_after)
+                        if page_current == 100
+                        else None
+                    ),
+                    "slug": slug,
+                    "started": page_current > 0,
+                    "deleted": False,
+                    "log_created_at": log_created_at,
+                }
+            )
+    return pd.DataFrame(logs)
+
+
+def test_compaction_keeps_latest_and_daily_pages():
+    """Test dropping the redundant logs changes none of the derived tables."""
+    logs_df = make_logs(
+        {
+            "first": [0, 0, 0, 10, 10, 20, 10, 10],
+            "second": [5, 5, 5],
+            "third": [50, 100, 100, 100, 100],
+            "fourth": [7],
+        }
+    )
+
+    redundant_ids = get_redundant_log_ids(logs_df)
+    compacted_df = logs_df[~logs_df["id"].isin(redundant_ids)]
+
+    assert len(redundant_ids) == 6
+    assert len(compacted_df) == len(logs_df) - 6
+
+    bkdata = BookKeeperDataOps()
+    bk = BookKeeperIO(TEST_DB_USERNAME)
+
+    def daily_pages(df):
+        filled_df = bkdata.fill_up_dataframe(apply_book_logs_schema(df))
+        return (
+            filled_df[["slug", "log_created_at", "page_current"]]
+            .drop_duplicates()
+            .reset_index(drop=True)
+        )
+
+    def latest(df):
+        return (
+            bk._get_latest_book_version(df, date_col="log_created_at")
+            .sort_values("slug")
+            .reset_index(drop=True)
+        )
+
+    pd.testing.assert_frame_equal(daily_pages(compacted_df), daily_pages(logs_df))
+    pd.testing.assert_frame_equal(latest(compacted_df), latest(logs_df))
+
+
+def test_compaction_keeps_filled_dataframe():
+    """Test the filled dataframe is the same with or without the dropped logs."""
+    logs_df = make_logs({"first": [0, 10, 10, 10, 10, 20], "second": [5, 5, 5]})
+    # a change of any other column keeps the log too
+    logs_df.loc[3, "title"] = "First, revised"
+    redundant_ids = get_redundant_log_ids(logs_df)
+    compacted_df = logs_df[~logs_df["id"].isin(redundant_ids)]
+
+    bkdata = BookKeeperDataOps()
+    filled_df = bkdata.fill_up_dataframe(apply_book_logs_schema(logs_df))
+    compacted_filled_df = bkdata.fill_up_dataframe(apply_book_logs_schema(compacted_df))
+
+    assert redundant_ids == [3, 8]
+    pd.testing.assert_frame_equal(compacted_filled_df, filled_df)
+
+
+def test_compactor_resumes_from_checkpoint(db_bookkeeper_io):
+    """Test the compactor deletes the redundant logs in resumable batches."""
+    bk = db_bookkeeper_io
+    logs_df = make_logs({"first": [0, 0, 10, 10, 10], "second": [5, 5, 5, 5]})
+    bk._create_user_table()
+    assert bk.save_books(logs_df.drop(columns="id"))
+    BookLogsCompactor(bk).table.drop(bk.sql_engine, checkfirst=True)
+
+    partial_report = BookLogsCompactor(bk, batch_size=1).run(max_batches=1)
+    assert (partial_report.slugs, partial_report.rows_deleted) == (1, 2)
+
+    report = BookLogsCompactor(bk, batch_size=1).run()
+    assert (report.slugs, report.rows_scanned, report.rows_deleted) == (2, 9, 4)
+    assert report.bytes_deleted > 0
+
+    books_df, _, _ = BookKeeperIO(TEST_DB_USERNAME).get_updated_tables()
+    assert sorted(books_df["page_current"].tolist()) == [0, 5, 5, 10, 10]
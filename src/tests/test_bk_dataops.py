@@ -2,9 +2,11 @@
 # -*- coding: utf-8 -*-
 """Test module BookKeeperDataOps."""
 
+import pandas as pd
 from pytest import fixture
 
 from src.utils import BookKeeperDataOps
+from src.utils.bk_schema import apply_book_logs_schema
 
 
 def test_constructor():
@@ -12,3 +14,85 @@ def test_constructor():
     bk_dops = BookKeeperDataOps()
 
     assert isinstance(bk_dops, BookKeeperDataOps)
+
+
+def test_fill_up_books_df():
+    """Test that every book is filled up from its first log with its latest log."""
+    books_df = apply_book_logs_schema(
+        pd.DataFrame(
+            {
+                "slug": ["first", "first", "second"],
+                "page_current": [10, 30, 5],
+                "log_created_at": ["2024-01-02", "2024-01-04", "2024-01-03"],
+            }
+        )
+    )
+    df_dates = pd.date_range("2024-01-01", "2024-01-05", freq="D")
+
+    bk_dops = BookKeeperDataOps()
+    filled_df = bk_dops.fill_up_books_df(books_df, df_dates)
+    pages = (
+        filled_df.sort_values("log_created_at")
+        .groupby("slug")["page_current"]
+        .apply(list)
+        .to_dict()
+    )
+
+    assert pages == {"first": [10, 10, 30, 30], "second": [5, 5, 5]}
+    assert filled_df.tail(3).equals(books_df)
+
+    book_df = books_df.query("slug == 'second'")
+    assert bk_dops.fill_up_book_df(book_df, df_dates).shape[0] == 3
+
+
+def test_get_closest_date_pagecounts_for_books():
+    """Test that the page counts of all books are looked up as of the date."""
+    books_df = apply_book_logs_schema(
+        pd.DataFrame(
+            {
+                "slug": ["first", "first", "second", "third"],
+                "page_current": [10, 30, 5, 50],
+                "log_created_at": [
+                    "2024-01-02",
+                    "2024-01-04",
+                    "2024-01-05",
+                    "2024-01-01",
+                ],
+            }
+        )
+    )
+
+    pagecounts = BookKeeperDataOps().get_closest_date_pagecounts_for_books(
+        books_df, ["first", "second"], pd.Timestamp("2024-01-03 12:00")
+    )
+
+    assert pagecounts.to_dict() == {"first": 10, "second": 0}
+
+
+def test_get_logs_for_book():
+    """Test that the logs of a book are sliced from the sorted history."""
+    books_df = apply_book_logs_schema(
+        pd.DataFrame(
+            {
+                "slug": ["second", "o'brien-book", "second", "o'brien-book"],
+                "page_current": [20, 30, 10, 5],
+                "log_created_at": [
+                    "2024-01-03",
+                    "2024-01-02",
+                    "2024-01-01",
+                    "2024-01-01",
+                ],
+            }
+        )
+    )
+    bk_dops = BookKeeperDataOps()
+
+    logs_df = bk_dops.get_logs_for_book(books_df, "o'brien-book")
+    assert logs_df["page_current"].tolist() == [5, 30]
+    assert bk_dops.get_logs_for_book(books_df, "second").index.tolist() == [2, 0]
+    assert bk_dops.get_logs_for_book(books_df, "missing").empty
+
+    closest_log = bk_dops.get_closest_date_pagecount_for_book(
+        books_df, "second", pd.Timestamp("2024-01-02")
+    )
+    assert closest_log["page_current"] == 20
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module EngineFactory."""
+
+from src.utils.bk_engine import EngineFactory
+
+
+def test_engine_options_from_env():
+    """Test the pool options are read from the environment."""
+    factory = EngineFactory(
+        env={
+            "PG_HOST": "db.local",
+            "PG_USER": "bk",
+            "PG_PASSWORD": "secret",
+            "PG_POOL_SIZE": "3",
+            "PG_MAX_OVERFLOW": "0",
+            "PG_POOL_PRE_PING": "false",
+            "PG_STATEMENT_TIMEOUT": "5000",
+        }
+    )
+    engine = factory.get_engine()
+
+    assert engine.url.host == "db.local"
+    assert engine.url.port == 5432
+    assert engine.url.database == "admin_db"
+    assert engine.pool.size() == 3
+    assert engine.pool._max_overflow == 0
+    assert not engine.pool._pre_ping
+    assert factory._get_engine_options()["connect_args"] == {
+        "options": "-c statement_timeout=5000"
+    }
+    assert factory.get_engine() is engine
+
+
+def test_read_only_engine_uses_replica():
+    """Test reads go to the replica only when one is configured."""
+    factory = EngineFactory(env={"PG_HOST": "primary.local"})
+    assert factory.get_engine(read_only=True) is factory.get_engine()
+
+    factory = EngineFactory(
+        env={
+            "PG_HOST": "primary.local",
+            "PG_READ_REPLICA_URL": "postgresql://bk@replica.local/admin_db",
+        }
+    )
+    assert factory.get_engine(read_only=True).url.host == "replica.local"
+    assert factory.get_engine().url.host == "primary.local"
+    assert set(factory.get_pool_status()) == {"primary", "replica"}
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_export."""
+
+import json
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from src.utils.bk_export import BookLogsExporter, ExportFormat
+
+START_DATE = date(2024, 1, 1)
+
+
+@pytest.fixture
+def db_bookkeeper_io(db_bookkeeper_io):
+    """Return the BookKeeperIO instance with a few days of logs."""
+    bk = db_bookkeeper_io
+    logs = [
+        {
+            "title": title,
+            "author": "Test Author",
+            "page_n": 100,
+            "page_current": 10 * day,
+            "finish_date": None,
+            "slug": f"test-author-{title.lower()}",
+            "started": day > 0,
+            "deleted": False,
+            "log_created_at": START_DATE + timedelta(days=day),
+        }
+        for title in ("First", "Second")
+        for day in range(5)
+    ]
+    assert bk.save_books(pd.DataFrame(logs))
+    return bk
+
+
+def test_iter_chunks(db_bookkeeper_io):
+    """Test that the chunks add up to the history, filtered as asked."""
+    exporter = BookLogsExporter(db_bookkeeper_io, chunk_size=3)
+
+    chunks = list(exporter.iter_chunks())
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    history_df = pd.concat(chunks, ignore_index=True)
+    assert history_df["page_current"].tolist() == [0, 10, 20, 30, 40] * 2
+
+    latest_df = pd.concat(exporter.iter_chunks(latest_only=True))
+    assert latest_df["page_current"].tolist() == [40, 40]
+
+    range_df = pd.concat(
+        exporter.iter_chunks(
+            latest_only=True, start=START_DATE, end=START_DATE + timedelta(days=2)
+        )
+    )
+    assert range_df["page_current"].tolist() == [20, 20]
+
+
+@pytest.mark.parametrize("export_format", list(ExportFormat))
+def test_export(db_bookkeeper_io, tmp_path, export_format):
+    """Test that every format holds the same logs."""
+    path = tmp_path / f"logs.{export_format.value}"
+    exporter = BookLogsExporter(db_bookkeeper_io, chunk_size=4)
+
+    assert exporter.export(path) == 10
+
+    if export_format == ExportFormat.CSV:
+        exported_df = pd.read_csv(path)
+    elif export_format == ExportFormat.JSONL:
+        with open(path) as f:
+            exported_df = pd.DataFrame([json.loads(line) for line in f])
+    else:
+        exported_df = pd.read_parquet(path)
+
+    assert len(exported_df) == 10
+    assert exported_df["page_current"].tolist() == [0, 10, 20, 30, 40] * 2
+    assert str(exported_df["log_created_at"].iloc[-1]) == "2024-01-05"
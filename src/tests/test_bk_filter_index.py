@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_filter_index."""
+
+import gc
+
+import pandas as pd
+
+from src.utils import BookKeeperDataOps
+from src.utils.bk_filter_index import BookFilterIndex, filter_indexes, get_filter_index
+from src.utils.bk_schema import apply_book_logs_schema
+
+
+def make_books() -> pd.DataFrame:
+    """Return the latest state of four books, one of them deleted."""
+    return apply_book_logs_schema(
+        pd.DataFrame(
+            {
+                "slug": ["a-one", "a-two", "b-one", "c-one"],
+                "author": ["A", "A", "B", "C"],
+                "publisher": ["X", "Y", "X", "X"],
+                "language": ["en", "hu", "hu", "en"],
+                "tag1": ["novel", "poetry", "novel", "novel"],
+                "tag2": ["classic", "", "novel", None],
+                "published_year": [1990, 2005, None, 2020],
+                "deleted": [False, False, False, True],
+            },
+            index=[10, 11, 12, 13],
+        )
+    )
+
+
+def test_filter_index_masks():
+    """Test that facets are ORed within and ANDed across, years by range."""
+    filter_index = BookFilterIndex(make_books())
+
+    assert filter_index.get_mask().tolist() == [True, True, True, False]
+    assert filter_index.get_mask(authors=["A", "C"], publishers="X").tolist() == [
+        True,
+        False,
+        False,
+        False,
+    ]
+    assert filter_index.get_mask(tags=["classic", "poetry"]).tolist() == [
+        True,
+        True,
+        False,
+        False,
+    ]
+    assert filter_index.get_mask(
+        published_year_min=2000, include_deleted=True
+    ).tolist() == [False, True, False, True]
+    assert not filter_index.get_mask(authors=["unknown"]).any()
+
+    # a book counts once for a tag it has in two columns
+    assert filter_index.get_facet_counts("tag").to_dict() == {
+        "novel": 2,
+        "classic": 1,
+        "poetry": 1,
+    }
+    assert filter_index.get_facet_counts("language").to_dict() == {"hu": 2, "en": 1}
+
+
+def test_filter_books_reuses_index():
+    """Test that filter_books keeps the index while the dataframe lives."""
+    books_df = make_books()
+    bk_dops = BookKeeperDataOps()
+
+    filtered_df = bk_dops.filter_books(books_df, ["A"], 1995, 0, [], s_language=["hu"])
+    assert filtered_df.index.tolist() == [11]
+    assert get_filter_index(books_df) is get_filter_index(books_df)
+
+    n_indexes = len(filter_indexes)
+    del books_df
+    gc.collect()
+    assert len(filter_indexes) == n_indexes - 1
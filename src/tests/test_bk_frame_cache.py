@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_frame_cache."""
+
+import gc
+import weakref
+
+import pandas as pd
+
+from src.utils import bk_frame_cache
+from src.utils.bk_frame_cache import FrameCache
+
+
+def test_frame_cache_registers_one_finalizer_per_frame(monkeypatch):
+    """Test values are kept while their dataframes live, one finalizer each."""
+    finalized = []
+    weakref_finalize = weakref.finalize
+
+    def finalize(df, *args):
+        finalized.append(id(df))
+        return weakref_finalize(df, *args)
+
+    monkeypatch.setattr(bk_frame_cache.weakref, "finalize", finalize)
+    cache = FrameCache()
+    first_df, second_df = pd.DataFrame({"a": [1]}), pd.DataFrame({"a": [2]})
+
+    # a value replaced every day registers no new finalizers
+    for day in range(3):
+        cache.put(day, first_df, second_df)
+    cache.put("first only", first_df)
+    assert cache.get(first_df, second_df) == 2
+    assert cache.get(second_df, first_df) is None
+    assert sorted(finalized) == sorted([id(first_df), id(second_df)])
+
+    del second_df
+    gc.collect()
+    assert len(cache) == 1
+    assert cache.get(first_df) == "first only"
+
+    del first_df
+    gc.collect()
+    assert len(cache) == 0
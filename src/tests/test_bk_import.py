@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_import."""
+
+import json
+
+import pandas as pd
+import pytest
+
+from src.tests.conftest import TEST_DB_USERNAME
+from src.utils import BookKeeperIO
+from src.utils.bk_import import BookLogsImporter, ImportReport, create_slugs
+
+BOOKS = [
+    {"title": "Egy polgár vallomásai", "author": "Márai Sándor", "page_n": "500"},
+    {"title": "The Hobbit", "author": "J.R.R. Tolkien", "page_n": "300"},
+    {"title": "", "author": "Nobody"},
+    {"title": "Mort", "author": "Terry Pratchett", "page_n": "many"},
+    {"title": "Guards! Guards!", "author": "Terry Pratchett", "page_n": "10"},
+    {"title": "Guards! Guards!", "author": "Terry Pratchett", "page_n": "10"},
+    {
+        "title": "Guards! Guards!",
+        "author": "Terry Pratchett",
+        "page_n": "10",
+        "page_current": "5",
+        "log_created_at": "2024-01-02",
+    },
+    {
+        "title": "Dune",
+        "author": "Frank Herbert",
+        "page_n": "600",
+        "page_current": "600",
+        "finish_date": "2024-01-05",
+        "log_created_at": "2024-01-05",
+    },
+    {"title": "Emma", "author": "Jane Austen", "page_n": "400", "page_current": "401"},
+]
+
+
+@pytest.fixture
+def db_bookkeeper_io(db_bookkeeper_io):
+    """Return the BookKeeperIO instance with one book logged already."""
+    bk = db_bookkeeper_io
+    existing_df = pd.DataFrame(
+        [
+            {
+                "title": "The Hobbit",
+                "author": "J. R. R. Tolkien",
+                "slug": "j-r-r-tolkien-the-hobbit",
+                "log_created_at": pd.Timestamp("2024-01-01"),
+            }
+        ]
+    )
+    assert bk.save_books(existing_df)
+    return bk
+
+
+def test_create_slugs_matches_create_slug():
+    """Test that the vectorized slugs are the ones of the Add page."""
+    books_df = pd.DataFrame(BOOKS)[["title", "author"]]
+
+    assert create_slugs(books_df).tolist() == [
+        BookKeeperIO._create_slug(book) for book in books_df.to_dict("records")
+    ]
+
+
+def test_import_books_legacy_slug(db_bookkeeper_io, tmp_path):
+    """Test that a book logged with its accents dropped is not imported again."""
+    legacy_df = pd.DataFrame(
+        [
+            {
+                "title": "Egy polgár vallomásai",
+                "author": "Márai Sándor",
+                "slug": "mrai-sndor-egy-polgr-vallomsai",
+                "log_created_at": pd.Timestamp("2024-01-01"),
+            }
+        ]
+    )
+    assert db_bookkeeper_io.save_books(legacy_df)
+    path = tmp_path / "books.csv"
+    pd.DataFrame(BOOKS[:1]).to_csv(path, index=False)
+
+    importer = BookLogsImporter(db_bookkeeper_io)
+    assert importer.run(path).rows_duplicate == 1
+    assert [issue.reason for issue in importer.issues] == ["already exists"]
+
+
+@pytest.mark.parametrize("suffix", ["csv", "jsonl"])
+def test_import_books(db_bookkeeper_io, tmp_path, suffix):
+    """Test that the valid new books are imported and the rest reported."""
+    path = tmp_path / f"books.{suffix}"
+    if suffix == "csv":
+        pd.DataFrame(BOOKS).to_csv(path, index=False)
+    else:
+        path.write_text("".join(json.dumps(book) + "\n" for book in BOOKS))
+
+    progress = []
+    importer = BookLogsImporter(db_bookkeeper_io, chunk_size=3)
+    report = importer.run(path, progress=lambda r, share: progress.append(share))
+
+    assert report == ImportReport(
+        rows_read=9, rows_imported=4, rows_duplicate=2, rows_invalid=3
+    )
+    assert progress[-1] == 1.0 and len(progress) == 3
+    assert [(issue.row, issue.reason) for issue in importer.issues] == [
+        (2, "already exists"),
+        (3, "missing title"),
+        (4, "invalid page_n"),
+        (6, "repeated in file"),
+        (9, "page_current above page_n"),
+    ]
+
+    _, latest_df = BookKeeperIO(TEST_DB_USERNAME).get_latest_tables()
+    latest_df = latest_df.set_index("slug")
+    assert sorted(latest_df.index) == [
+        "frank-herbert-dune",
+        "j-r-r-tolkien-the-hobbit",
+        "marai-sandor-egy-polgar-vallomasai",
+        "terry-pratchett-guards-guards",
+    ]
+    assert latest_df.loc["frank-herbert-dune", "finish_date"] == pd.Timestamp(
+        "2024-01-05"
+    )
+    assert latest_df.loc["marai-sandor-egy-polgar-vallomasai", "page_n"] == 500
+
+    errors_path = tmp_path / "errors.csv"
+    importer.write_issues(errors_path)
+    assert len(pd.read_csv(errors_path)) == 5
@@ -2,11 +2,27 @@
 # -*- coding: utf-8 -*-
 """Test module BookKeeperIO."""
 
+import asyncio
+
 import boto3
+import pandas as pd
 import pytest
-
-from src.tests.conftest import TEST_BUCKET_NAME, TEST_REGION, TEST_USERNAME
-from src.utils import BookKeeperIO
+from sqlalchemy import event
+
+from src.tests.conftest import (
+    TEST_BUCKET_NAME,
+    TEST_DB_USERNAME,
+    TEST_REGION,
+    TEST_USERNAME,
+)
+from src.utils import (
+    AsyncBookKeeperIO,
+    BookKeeperDataOps,
+    BookKeeperIO,
+    StorageLayout,
+)
+from src.utils.bk_engine import engine_factory
+from src.utils.bk_schema import apply_book_logs_schema
 
 
 @pytest.fixture(autouse=True)
@@ -26,6 +42,25 @@ def bookkeeper_io():
     return BookKeeperIO(user_id=TEST_USERNAME)
 
 
+def make_book(title: str, page_current: int) -> dict:
+    """Return a book as submitted by the add page."""
+    return {
+        "title": title,
+        "subtitle": "",
+        "author": "Test Author",
+        "location": "shelf",
+        "publisher": "Test Publisher",
+        "published_year": 2020,
+        "page_n": 100,
+        "page_current": page_current,
+        "finish_date": None,
+        "tag1": "",
+        "tag2": "",
+        "tag3": "",
+        "language": "en",
+    }
+
+
 def test_constructor():
     """Test the constructor of the BookKeeperIO class."""
     bk = BookKeeperIO(TEST_USERNAME)
@@ -33,6 +68,16 @@ def test_constructor():
     assert bk.user_id == TEST_USERNAME
 
 
+def test_constructor_shares_table_definition():
+    """Test that sessions of the same user share one table definition."""
+    bk = BookKeeperIO(TEST_USERNAME, layout=StorageLayout.PER_USER)
+    other_bk = BookKeeperIO(TEST_USERNAME, layout=StorageLayout.PER_USER)
+
+    assert bk.table is other_bk.table
+    assert bk.table.name == f"{TEST_USERNAME}_book_logs"
+    assert "slug" in bk.table.c
+
+
 def test_constructor_missing_args():
     """Test the constructor of the BookKeeperIO class missing username."""
     with pytest.raises(TypeError):
@@ -93,6 +138,72 @@ def test_create_slug_empty_fields(bookkeeper_io):
 
 # test _append_book_to_df
 
+
+def test_create_slug_accents(bookkeeper_io):
+    """Test that the accents are folded, not dropped."""
+    book = {
+        "title": "Egy polgár vallomásai",
+        "author": "Márai Sándor",
+    }
+    slug = bookkeeper_io._create_slug(book)
+
+    assert slug == "marai-sandor-egy-polgar-vallomasai"
+
+
+def test_add_book_refuses_legacy_slug(bookkeeper_io):
+    """Test that a book logged with its accents dropped is still a duplicate."""
+    book = {
+        **make_book("Egy polgár vallomásai", 0),
+        "author": "Márai Sándor",
+    }
+    bookkeeper_io.slug_index.reset(["mrai-sndor-egy-polgr-vallomsai"])
+
+    slug = bookkeeper_io._create_slug(book, legacy=True)
+    assert slug == "mrai-sndor-egy-polgr-vallomsai"
+    assert not bookkeeper_io.add_book(dict(book), False)
+
+
+def test_add_book_refuses_duplicates(bookkeeper_io):
+    """Test that add_book refuses exact and normalized duplicates."""
+    book = {**make_book("The Hobbit", 0), "author": "J.R.R. Tolkien"}
+    assert bookkeeper_io.add_book(dict(book), False)
+    assert not bookkeeper_io.add_book(dict(book), False)
+
+    book["author"] = "J. R. R. Tolkien"
+    assert not bookkeeper_io.add_book(dict(book), False)
+    assert len(bookkeeper_io.get_today_batch()) == 1
+
+    book["author"] = "Tolkien"
+    assert bookkeeper_io.get_similar_slugs(book) == ["jrr-tolkien-the-hobbit"]
+
+
+def test_add_book_keeps_word_boundaries(bookkeeper_io):
+    """Test that books only differing in where their words split are added."""
+    assert bookkeeper_io.add_book({**make_book("Cat Tales", 0), "author": "Tom"}, False)
+    assert bookkeeper_io.add_book({**make_book("Tales", 0), "author": "Tomcat"}, False)
+    assert len(bookkeeper_io.get_today_batch()) == 2
+
+
+def test_search_books_follows_today_batch(bookkeeper_io):
+    """Test that books added, updated and deleted today are searched."""
+    latest_df = pd.DataFrame(
+        [{**make_book("Learning Spark", 10), "slug": "test-author-learning-spark"}]
+    )
+    assert bookkeeper_io.search_books(latest_df, "spar")["slug"].tolist() == [
+        "test-author-learning-spark"
+    ]
+
+    assert bookkeeper_io.add_book(make_book("Spark Streaming", 0), False)
+    assert bookkeeper_io.search_books(latest_df, "spark streaming")[
+        "slug"
+    ].tolist() == ["test-author-spark-streaming"]
+
+    bookkeeper_io.delete_book("test-author-learning-spark", latest_df)
+    assert bookkeeper_io.search_books(latest_df, "spark")["slug"].tolist() == [
+        "test-author-spark-streaming"
+    ]
+
+
 # test add_book
 
 # test update_book
@@ -117,6 +228,176 @@ def test_create_slug_empty_fields(bookkeeper_io):
 
 # test update_tables
 
+
+def test_get_updated_tables_incremental(db_bookkeeper_io):
+    """Test that the incremental refresh matches a full reload."""
+    bk = db_bookkeeper_io
+    bk.add_book(make_book("First", 10), False)
+    bk.add_book(make_book("Second", 0), False)
+    assert bk.save_books()
+
+    _, today_df, latest_df = bk.get_updated_tables()
+    book = latest_df.query("slug=='test-author-first'").iloc[0].to_dict()
+    book["page_current"] = 42
+    bk.update_book(book, False)
+    assert bk.save_books()
+
+    books_df, today_df, latest_df = bk.get_updated_tables()
+    full_books_df, full_today_df, full_latest_df = bk.get_updated_tables(
+        full_refresh=True
+    )
+
+    def by_slug(df):
+        return df.sort_values("slug").reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(by_slug(books_df), by_slug(full_books_df))
+    pd.testing.assert_frame_equal(by_slug(today_df), by_slug(full_today_df))
+    pd.testing.assert_frame_equal(by_slug(latest_df), by_slug(full_latest_df))
+    assert latest_df.query("slug=='test-author-first'")["page_current"].item() == 42
+
+
+def test_get_updated_tables_reads_primary(db_bookkeeper_io, monkeypatch):
+    """Test the history the watermark is set from is not read from a replica."""
+    bk = db_bookkeeper_io
+    bk.add_book(make_book("First", 10), False)
+    assert bk.save_books()
+
+    read_only_calls = []
+
+    def use_replica(read_only: bool) -> bool:
+        read_only_calls.append(read_only)
+        return False
+
+    monkeypatch.setattr(engine_factory, "_use_replica", use_replica)
+    bk.get_updated_tables(full_refresh=True)
+    bk.get_updated_tables()
+    assert read_only_calls and not any(read_only_calls)
+
+
+def test_get_updated_tables_late_write(db_bookkeeper_io):
+    """Test that a log of an earlier day written late reaches loaded sessions."""
+    bk = db_bookkeeper_io
+    yesterday = pd.Timestamp.today().normalize() - pd.Timedelta(days=1)
+    bk.add_book(make_book("First", 10), False)
+    bk.add_book(make_book("Second", 0), False)
+    assert bk.save_books()
+    book = {**make_book("First", 10), "slug": "test-author-first"}
+    assert bk.save_books(pd.DataFrame([{**book, "log_created_at": yesterday}]))
+
+    other_bk = BookKeeperIO(user_id=TEST_DB_USERNAME)
+    other_bk.get_updated_tables()
+    # a flush after midnight writes yesterday's log below the watermark date
+    assert bk.save_books(
+        pd.DataFrame([{**book, "page_current": 5, "log_created_at": yesterday}])
+    )
+
+    books_df, _, _ = other_bk.get_updated_tables()
+    full_books_df, _, _ = BookKeeperIO(TEST_DB_USERNAME).get_updated_tables()
+    pd.testing.assert_frame_equal(
+        books_df.sort_values("id").reset_index(drop=True),
+        full_books_df.sort_values("id").reset_index(drop=True),
+    )
+    assert books_df.query("log_created_at==@yesterday")["page_current"].tolist() == [5]
+
+
+def test_save_books_writes_changed_logs_only(db_bookkeeper_io):
+    """Test that only the logs changed since the last save are written."""
+    bk = db_bookkeeper_io
+    bk.add_book(make_book("First", 10), False)
+    bk.add_book(make_book("Second", 0), False)
+    assert bk.save_books()
+    assert not bk.today_batch.dirty
+
+    today_df, _ = bk.get_latest_tables()
+    book = today_df.query("slug=='test-author-first'").iloc[0].to_dict()
+    bk.update_book(dict(book), False)
+    assert not bk.today_batch.dirty
+
+    book["page_current"] = 42
+    bk.update_book(book, False)
+    assert bk.delete_book("test-author-second", today_df)
+    assert bk.today_batch.get_dirty_df()["slug"].tolist() == [
+        "test-author-first",
+        "test-author-second",
+    ]
+    assert bk.save_books()
+    assert bk.get_save_metrics() == {"upserts_written": 4, "upserts_avoided": 0}
+
+    # a log changed back to its saved values is not written again
+    assert bk.revert_deletion_book("test-author-second")
+    assert bk.delete_book("test-author-second", today_df)
+    statements = []
+
+    def record_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(bk.sql_engine, "before_cursor_execute", record_statement)
+    try:
+        assert bk.save_books()
+    finally:
+        event.remove(bk.sql_engine, "before_cursor_execute", record_statement)
+
+    assert not statements
+    assert bk.get_save_metrics() == {"upserts_written": 4, "upserts_avoided": 2}
+
+    today_df, latest_df = BookKeeperIO(TEST_DB_USERNAME).get_latest_tables()
+    assert today_df.sort_values("slug")["deleted"].tolist() == [False, True]
+    assert latest_df.query("slug=='test-author-first'")["page_current"].item() == 42
+
+
+def test_save_books_row_by_row_missing_values(db_bookkeeper_io):
+    """Test that missing integers are saved as NULL without bulk upserts."""
+    bk = db_bookkeeper_io
+    bk.add_book({**make_book("First", 10), "published_year": None}, False)
+    books_df = apply_book_logs_schema(bk.get_today_batch())
+    assert books_df["published_year"].isna().all()
+
+    assert bk.save_books(books_df, bulk=False)
+    _, latest_df = BookKeeperIO(TEST_DB_USERNAME).get_latest_tables()
+    assert latest_df["published_year"].isna().all()
+    assert latest_df["page_current"].tolist() == [10]
+
+
+def test_reading_stats_follow_saves(db_bookkeeper_io):
+    """Test that the stats updated on save match the ones of every log."""
+    bk = db_bookkeeper_io
+
+    def make_logs(rows):
+        return apply_book_logs_schema(
+            pd.DataFrame(
+                rows, columns=["slug", "log_created_at", "page_current", "finish_date"]
+            ).assign(title="Title", author="Author", page_n=100, deleted=False)
+        )
+
+    assert bk.save_books(
+        make_logs(
+            [
+                ["first", "2024-01-01", 10, None],
+                ["first", "2024-01-04", 30, None],
+                ["second", "2024-01-02", 20, None],
+            ]
+        )
+    )
+    stats_df = bk.get_reading_stats()
+    assert stats_df["total_pages"].tolist() == [10, 30, 30, 50]
+
+    # a later log, a changed one and a new book in the past
+    assert bk.save_books(
+        make_logs(
+            [
+                ["first", "2024-01-02", 15, None],
+                ["second", "2024-01-06", 100, "2024-01-06"],
+                ["third", "2024-01-03", 5, None],
+            ]
+        )
+    )
+    stats_df = bk.get_reading_stats()
+    rebuilt_df = BookKeeperDataOps().get_timeline(bk.get_books_history()).daily_stats()
+    pd.testing.assert_frame_equal(stats_df, rebuilt_df)
+    assert stats_df["total_pages"].tolist() == [10, 35, 40, 55, 55, 135]
+    assert stats_df["books_finished"].sum() == 1
+
+
 # def test_add_book(bookkeeper_io):
 #     book = {
 #         "title": "Test Book",
@@ -132,3 +413,243 @@ def test_create_slug_empty_fields(bookkeeper_io):
 #     # Assert that the book was added successfully
 #     assert added
 #     assert len(book_df) == 1
+
+
+def test_get_latest_tables(db_bookkeeper_io):
+    """Test that the server side latest state matches the one from the history."""
+    bk = db_bookkeeper_io
+    bk.add_book(make_book("First", 10), False)
+    bk.add_book(make_book("Second", 0), False)
+    assert bk.save_books()
+
+    today_df, latest_df = bk.get_latest_tables()
+    _, history_today_df, history_latest_df = BookKeeperIO(
+        user_id=TEST_DB_USERNAME
+    ).get_updated_tables()
+
+    def by_slug(df):
+        return df.sort_values("slug").reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(by_slug(latest_df), by_slug(history_latest_df))
+    pd.testing.assert_frame_equal(by_slug(today_df), by_slug(history_today_df))
+    assert bk.existing_book_slugs == {"test-author-first", "test-author-second"}
+
+
+def test_partitioned_layout_separates_users():
+    """Test that users sharing the partitioned table only see their own logs."""
+    bk = BookKeeperIO(TEST_DB_USERNAME, layout=StorageLayout.PARTITIONED)
+    other_bk = BookKeeperIO(
+        f"{TEST_DB_USERNAME}_other", layout=StorageLayout.PARTITIONED
+    )
+    assert bk.table is other_bk.table
+
+    try:
+        bk.add_book(make_book("First", 10), False)
+        assert bk.save_books()
+        other_bk.add_book(make_book("First", 20), False)
+        assert other_bk.save_books()
+
+        _, latest_df = bk.get_latest_tables()
+        _, other_latest_df = other_bk.get_latest_tables()
+
+        assert "user_id" not in latest_df.columns
+        assert latest_df["page_current"].tolist() == [10]
+        assert other_latest_df["page_current"].tolist() == [20]
+    finally:
+        bk.table.drop(bk.sql_engine, checkfirst=True)
+
+
+def test_user_table_existence_is_cached(db_bookkeeper_io):
+    """Test that saving and loading do not query the catalog once cached."""
+    bk = db_bookkeeper_io
+    bk.add_book(make_book("First", 10), False)
+    assert bk.save_books()
+
+    statements = []
+
+    def record_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(bk.sql_engine, "before_cursor_execute", record_statement)
+    try:
+        assert bk.save_books(bk.get_today_batch())
+        bk.get_latest_tables()
+    finally:
+        event.remove(bk.sql_engine, "before_cursor_execute", record_statement)
+
+    assert statements
+    assert not any("pg_catalog" in statement for statement in statements)
+
+
+def test_user_table_created_elsewhere_is_found(db_bookkeeper_io):
+    """Test that a table missing on the first check is found once created."""
+    bk = db_bookkeeper_io
+    assert not bk._user_table_exists()
+
+    # another process saves the first log of the user
+    bk.add_book(make_book("First", 10), False)
+    with bk.sql_engine.begin() as conn:
+        bk.table.create(conn, checkfirst=True)
+        conn.execute(bk.table.insert(), bk._get_book_records(bk.get_today_batch()))
+
+    assert bk._user_table_exists()
+    _, latest_df = bk.get_latest_tables()
+    assert latest_df["slug"].tolist() == ["test-author-first"]
+
+
+def test_save_books_recreates_dropped_table(db_bookkeeper_io):
+    """Test that a table dropped behind the cache is created again on save."""
+    bk = db_bookkeeper_io
+    bk.add_book(make_book("First", 10), False)
+    assert bk.save_books()
+
+    bk.table.drop(bk.sql_engine)
+
+    assert bk.save_books(bk.get_today_batch())
+    _, latest_df = BookKeeperIO(TEST_DB_USERNAME).get_latest_tables()
+    assert latest_df["slug"].tolist() == ["test-author-first"]
+
+
+def test_async_bookkeeper_io_matches_sync(db_bookkeeper_io):
+    """Test that the asyncio variant saves and loads the same tables."""
+    bk = db_bookkeeper_io
+
+    async def save_and_load():
+        async_bk = AsyncBookKeeperIO(user_id=TEST_DB_USERNAME)
+        try:
+            async_bk.add_book(make_book("First", 10), False)
+            async_bk.add_book(make_book("Second", 0), False)
+            assert await async_bk.save_books()
+            return await async_bk.get_updated_tables()
+        finally:
+            await async_bk.async_engine.dispose()
+
+    books_df, today_df, latest_df = asyncio.run(save_and_load())
+    sync_books_df, sync_today_df, sync_latest_df = bk.get_updated_tables()
+
+    def by_slug(df):
+        return df.sort_values("slug").reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(by_slug(books_df), by_slug(sync_books_df))
+    pd.testing.assert_frame_equal(by_slug(today_df), by_slug(sync_today_df))
+    pd.testing.assert_frame_equal(by_slug(latest_df), by_slug(sync_latest_df))
+
+
+def test_async_full_load_reads_history_once(db_bookkeeper_io):
+    """Test that the asyncio variant derives its tables from one history read."""
+    bk = db_bookkeeper_io
+    bk.add_book(make_book("First", 10), False)
+    assert bk.save_books()
+    statements = []
+
+    def record_statement(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async def load():
+        async_bk = AsyncBookKeeperIO(user_id=TEST_DB_USERNAME)
+        sync_engine = async_bk.async_engine.sync_engine
+        event.listen(sync_engine, "before_cursor_execute", record_statement)
+        try:
+            return await async_bk.get_updated_tables(full_refresh=True)
+        finally:
+            event.remove(sync_engine, "before_cursor_execute", record_statement)
+            await async_bk.async_engine.dispose()
+
+    books_df, today_df, latest_df = asyncio.run(load())
+    assert len(statements) == 1
+    assert books_df["slug"].tolist() == today_df["slug"].tolist()
+    assert latest_df["page_current"].tolist() == [10]
+
+
+def test_async_bookkeeper_io_keeps_blocking_hooks(db_bookkeeper_io):
+    """Test that the methods inherited by the asyncio variant still block."""
+    async_bk = AsyncBookKeeperIO(user_id=TEST_DB_USERNAME)
+    assert async_bk._user_table_exists() is False
+
+    async_bk.add_book(make_book("First", 10), False)
+    assert async_bk._write_books(async_bk.get_today_batch())
+    assert async_bk._user_table_exists() is True
+    assert async_bk._get_latest_books()["slug"].tolist() == ["test-author-first"]
+
+
+def test_async_get_reading_stats(db_bookkeeper_io):
+    """Test the asyncio variant reads the example stats, then the user's."""
+    bk = db_bookkeeper_io
+    example_stats_df = bk.get_reading_stats()
+
+    async def load_before_and_after_save():
+        async_bk = AsyncBookKeeperIO(user_id=TEST_DB_USERNAME)
+        try:
+            before_df = await async_bk.get_reading_stats()
+            async_bk.add_book(make_book("First", 10), False)
+            assert await async_bk.save_books()
+            return before_df, await async_bk.get_reading_stats()
+        finally:
+            await async_bk.async_engine.dispose()
+
+    before_df, after_df = asyncio.run(load_before_and_after_save())
+    pd.testing.assert_frame_equal(before_df, example_stats_df)
+    pd.testing.assert_frame_equal(
+        after_df, BookKeeperIO(TEST_DB_USERNAME).get_reading_stats()
+    )
+    assert after_df["total_pages"].tolist() == [10]
+
+
+def test_get_updated_tables_from_snapshot(db_bookkeeper_io, tmp_path, monkeypatch):
+    """Test a new session starts from the snapshot and revalidates it."""
+    monkeypatch.setenv("BK_SNAPSHOT_DIR", str(tmp_path))
+    bk = BookKeeperIO(user_id=TEST_DB_USERNAME)
+    bk.add_book(make_book("First", 10), False)
+    assert bk.save_books()
+    bk.get_updated_tables()
+
+    # the snapshot is refreshed with the logs saved after it
+    bk.add_book(make_book("Second", 20), False)
+    assert bk.save_books()
+    snapshot_bk = BookKeeperIO(user_id=TEST_DB_USERNAME)
+    monkeypatch.setattr(snapshot_bk, "_get_all_books", pytest.fail)
+    books_df, _, latest_df = snapshot_bk.get_updated_tables()
+    assert sorted(latest_df["slug"]) == ["test-author-first", "test-author-second"]
+    pd.testing.assert_frame_equal(
+        books_df.sort_values("id").reset_index(drop=True),
+        BookKeeperIO(user_id=TEST_DB_USERNAME)
+        .get_updated_tables(full_refresh=True)[0]
+        .sort_values("id")
+        .reset_index(drop=True),
+    )
+
+    # logs removed below the snapshot's max id invalidate it
+    with bk.sql_engine.begin() as conn:
+        conn.execute(
+            bk.table.delete().where(
+                bk._user_filter(), bk.table.c.slug == "test-author-first"
+            )
+        )
+    books_df, _, _ = BookKeeperIO(user_id=TEST_DB_USERNAME).get_updated_tables()
+    assert books_df["slug"].tolist() == ["test-author-second"]
+
+
+def test_get_updated_tables_unchanged(db_bookkeeper_io, tmp_path, monkeypatch):
+    """Test refreshes without saves in between do not rewrite the snapshot."""
+    monkeypatch.setenv("BK_SNAPSHOT_DIR", str(tmp_path))
+    bk = BookKeeperIO(user_id=TEST_DB_USERNAME)
+    bk.add_book(make_book("First", 10), False)
+    assert bk.save_books()
+    books_df, _, _ = bk.get_updated_tables()
+
+    saved_keys = []
+    monkeypatch.setattr(
+        bk.snapshot_cache, "save", lambda key, *args: saved_keys.append(key)
+    )
+    assert bk.get_updated_tables()[0] is books_df
+    assert bk.get_updated_tables()[0] is books_df
+    assert saved_keys == []
+
+    # a log changed by another session is merged and saved
+    other_bk = BookKeeperIO(user_id=TEST_DB_USERNAME)
+    _, _, latest_df = other_bk.get_updated_tables()
+    other_bk.update_book({**latest_df.iloc[0].to_dict(), "page_current": 30}, False)
+    assert other_bk.save_books()
+    _, _, latest_df = bk.get_updated_tables()
+    assert latest_df["page_current"].tolist() == [30]
+    assert saved_keys == [bk._snapshot_key()]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_reading_stats."""
+
+import gc
+
+import pandas as pd
+
+from src.utils import BookKeeperDataOps
+from src.utils.bk_reading_stats import (
+    ReadingStats,
+    cache_reading_stats,
+    get_cached_reading_stats,
+    reading_stats_cache,
+)
+from src.utils.bk_schema import apply_book_logs_schema
+
+TODAY = pd.Timestamp("2024-01-10")
+
+
+def make_logs() -> pd.DataFrame:
+    """Return the logs of a finished, an in progress and a deleted book."""
+    return apply_book_logs_schema(
+        pd.DataFrame(
+            {
+                "slug": ["done", "done", "reading", "reading", "gone"],
+                "title": ["Done", "Done", "Reading", "Reading", "Gone"],
+                "page_n": [40, 40, 200, 200, 10],
+                "page_current": [20, 40, 50, 100, 5],
+                "finish_date": [None, "2024-01-02", None, None, None],
+                "deleted": [False, False, False, False, True],
+                "log_created_at": [
+                    "2024-01-01",
+                    "2024-01-02",
+                    "2024-01-05",
+                    "2024-01-08",
+                    "2024-01-01",
+                ],
+            }
+        )
+    )
+
+
+def make_reading_stats(logs_df: pd.DataFrame) -> ReadingStats:
+    """Return the reading statistics of the logs, computed on TODAY."""
+    bk_dops = BookKeeperDataOps()
+    latest_df = logs_df.drop_duplicates("slug", keep="last")
+    timeline = bk_dops.get_timeline(logs_df)
+    return ReadingStats(
+        timeline.daily_stats(),
+        bk_dops.add_books_state(latest_df.query("not deleted")),
+        timeline,
+        bk_dops.get_closest_date_pagecounts_for_books(
+            timeline.logs, ["reading"], date=pd.Timestamp("2024-01-06")
+        ),
+        TODAY,
+    )
+
+
+def test_reading_stats_kpis():
+    """Test the KPIs, the rolling rates, the streaks and the progress."""
+    reading_stats = make_reading_stats(make_logs())
+
+    # the days without logs up to today are read as days without reading
+    assert reading_stats.daily["stat_date"].iloc[-1] == TODAY
+    assert reading_stats.daily["total_pages"].tolist() == [
+        25,
+        45,
+        45,
+        45,
+        95,
+        95,
+        95,
+        145,
+        145,
+        145,
+    ]
+    assert reading_stats.kpis == {
+        "books_read": 1,
+        "pages_read": 145,
+        "days_passed": 9,
+        "days_per_book": 9.0,
+        "pages_per_day": 16.11,
+    }
+    assert reading_stats.rolling_rates == {7: 14.29, 30: 4.83, 90: 1.61}
+    assert reading_stats.streaks == {"current": 0, "longest": 2}
+
+    in_progress = reading_stats.in_progress
+    assert in_progress["slug"].tolist() == ["reading"]
+    assert in_progress["progress_perc"].tolist() == [50.0]
+    assert in_progress["progress_delta"].tolist() == [25.0]
+    assert reading_stats.in_progress_daily["log_created_at"].min() == pd.Timestamp(
+        "2024-01-05"
+    )
+
+
+def test_get_reading_stats_is_memoized():
+    """Test that the statistics are kept while the dataframes live."""
+    bk_dops = BookKeeperDataOps()
+    books_df = make_logs()
+    latest_df = books_df.drop_duplicates("slug", keep="last")
+    stats_df = bk_dops.get_timeline(books_df).daily_stats()
+
+    reading_stats = bk_dops.get_reading_stats(stats_df, latest_df, books_df)
+    assert bk_dops.get_reading_stats(stats_df, latest_df, books_df) is reading_stats
+    assert reading_stats.kpis["books_read"] == 1
+    assert "gone" not in reading_stats.books["slug"].tolist()
+
+    # computing them again on another day replaces them, the frames stay tracked
+    n_frames = len(reading_stats_cache._keys_by_frame)
+    next_day = reading_stats.today + pd.Timedelta(days=1)
+    assert get_cached_reading_stats((stats_df, latest_df, books_df), next_day) is None
+    cache_reading_stats((stats_df, latest_df, books_df), make_reading_stats(books_df))
+    assert len(reading_stats_cache._keys_by_frame) == n_frames
+
+    n_cached = len(reading_stats_cache)
+    del stats_df
+    gc.collect()
+    assert len(reading_stats_cache) == n_cached - 1
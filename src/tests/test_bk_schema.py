@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_schema."""
+
+from datetime import date
+
+import pandas as pd
+
+from src.utils.bk_schema import (
+    BOOK_LOGS_DTYPES,
+    apply_book_logs_schema,
+    get_memory_report,
+)
+
+
+def make_raw_logs() -> pd.DataFrame:
+    """Return logs with the dtypes of a plain read."""
+    return pd.DataFrame(
+        {
+            "title": ["First", "Second"],
+            "author": ["Test Author", "Test Author"],
+            "location": ["shelf", None],
+            "publisher": ["Test Publisher", "Test Publisher"],
+            "published_year": [2020, 2021],
+            "page_n": [100, 200],
+            "page_current": [10, 0],
+            "finish_date": [date(2024, 1, 2), None],
+            "tag1": ["", ""],
+            "tag2": ["", ""],
+            "tag3": ["", ""],
+            "language": ["en", "hu"],
+            "slug": ["test-author-first", "test-author-second"],
+            "started": [True, False],
+            "deleted": [False, False],
+            "log_created_at": [date(2024, 1, 3), date(2024, 1, 3)],
+        }
+    )
+
+
+def test_apply_book_logs_schema():
+    """Test the columns are cast to the canonical dtypes."""
+    books_df = apply_book_logs_schema(make_raw_logs())
+
+    for col, dtype in BOOK_LOGS_DTYPES.items():
+        assert books_df[col].dtype == dtype
+    assert books_df["title"].dtype == object
+    assert pd.isna(books_df["finish_date"].iloc[1])
+    assert books_df.query("log_created_at==@pd.Timestamp('2024-01-03')").shape[0] == 2
+    assert apply_book_logs_schema(books_df) is books_df
+
+
+def test_get_memory_report():
+    """Test the report compares every column with its plain read dtype."""
+    raw_df = make_raw_logs()
+    report = get_memory_report(apply_book_logs_schema(raw_df))
+
+    assert list(report.index) == [*raw_df.columns, "total"]
+    assert report.loc["page_n", "raw_bytes"] == 2 * 8
+    assert report.loc["page_n", "typed_bytes"] == 2 * 4 + 2
+    assert (report["saved_bytes"] == report["raw_bytes"] - report["typed_bytes"]).all()
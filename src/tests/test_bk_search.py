@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_search."""
+
+from src.utils.bk_search import BookSearchIndex, tokenize
+
+
+def test_tokenize():
+    """Test that terms are lowercase and accents are folded."""
+    assert tokenize("Márai Sándor: A gyertyák csonkig égnek") == [
+        "marai",
+        "sandor",
+        "a",
+        "gyertyak",
+        "csonkig",
+        "egnek",
+    ]
+    assert tokenize(None) == []
+
+
+def test_search_index():
+    """Test that prefixes match, titles rank higher and changes are followed."""
+    search_index = BookSearchIndex()
+    search_index.reset(
+        [
+            {"slug": "learning-spark", "title": "Learning Spark", "author": "Damji"},
+            {"slug": "spark-guide", "title": "Guide", "tag1": "spark"},
+            {"slug": "hidden", "title": "Spark", "deleted": True},
+        ]
+    )
+
+    assert [slug for slug, _ in search_index.search("spark")] == [
+        "learning-spark",
+        "spark-guide",
+    ]
+    assert [slug for slug, _ in search_index.search("learn sp")] == ["learning-spark"]
+    assert search_index.search("") == []
+    assert search_index.search("spark missing") == []
+
+    search_index.put({"slug": "spark-guide", "title": "Guide", "tag1": "python"})
+    assert [slug for slug, _ in search_index.search("spark")] == ["learning-spark"]
+    assert [slug for slug, _ in search_index.search("pyth")] == ["spark-guide"]
+
+    search_index.remove("learning-spark")
+    assert search_index.search("spark") == []
+    assert "spark" not in search_index._terms
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_slug_index."""
+
+from src.utils.bk_slug_index import SlugIndex
+
+
+def test_slug_index_duplicates_and_similar():
+    """Test the exact, normalized and similar lookups of the index."""
+    index = SlugIndex(["jrr-tolkien-the-hobbit", "terry-pratchett-mort"])
+
+    assert "jrr-tolkien-the-hobbit" in index
+    assert "j-r-r-tolkien-the-hobbit" not in index
+    assert index.get_duplicates("j-r-r-tolkien-the-hobbit") == {
+        "jrr-tolkien-the-hobbit"
+    }
+    assert index.get_duplicates("tolkien-the-hobbit") == set()
+    assert index.get_duplicates("terry-pratchettmort") == set()
+
+    assert index.get_similar("tolkien-the-hobbit") == ["jrr-tolkien-the-hobbit"]
+    assert index.get_similar("terry-pratchet-mort") == ["terry-pratchett-mort"]
+    assert index.get_similar("terry-pratchett-mort") == []
+    assert index.get_similar("marai-sandor-egy-polgar-vallomasai") == []
+
+
+def test_slug_index_add_and_reset():
+    """Test that the index is kept up to date incrementally."""
+    index = SlugIndex()
+    index.add("marai-sandor-egy-polgar-vallomasai")
+    index.update(["marai-sandor-egy-polgar-vallomasai", "terry-pratchett-mort"])
+
+    assert len(index) == 2
+    assert index.get_duplicates("márai-sándor-egy-polgár-vallomásai")
+
+    index.reset(["terry-pratchett-mort"])
+
+    assert index.slugs == {"terry-pratchett-mort"}
+    assert index.get_similar("marai-sandor-egy-polgar-vallomasai") == []
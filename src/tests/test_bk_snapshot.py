@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module SnapshotCache."""
+
+import os
+
+import pandas as pd
+
+from src.utils.bk_snapshot import DataVersion, SnapshotCache
+from src.utils.example_data import EXAMPLE_DATA
+
+
+def test_save_and_load(tmp_path):
+    """Test a snapshot keeps the logs, their dtypes and their version."""
+    cache = SnapshotCache(tmp_path, max_bytes=10_000_000)
+    books_df = EXAMPLE_DATA.assign(id=[1, 2, 3])
+
+    cache.save("user", books_df, DataVersion(max_id=3, row_count=3))
+    loaded_df, version = cache.load("user")
+
+    pd.testing.assert_frame_equal(loaded_df, books_df)
+    assert version == DataVersion(max_id=3, row_count=3)
+    assert cache.load("other_user") is None
+
+
+def test_evict_least_recently_used(tmp_path):
+    """Test the least recently used snapshots are evicted over the size limit."""
+    cache = SnapshotCache(tmp_path, max_bytes=10_000_000)
+    version = DataVersion(max_id=3, row_count=3)
+    for key in ("first", "second", "third"):
+        cache.save(key, EXAMPLE_DATA, version)
+    snapshot_bytes = cache._get_path("first").stat().st_size
+
+    # first is the oldest on disk but the most recently loaded
+    for age, key in enumerate(("third", "second", "first")):
+        os.utime(cache._get_path(key), (age, age))
+    cache.load("first")
+
+    cache.max_bytes = 2 * snapshot_bytes
+    assert cache.evict() == [cache._get_path("third")]
+    assert cache.load("first") is not None
+    assert cache.load("third") is None
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_timeline."""
+
+import pandas as pd
+
+from src.utils import BookKeeperDataOps
+from src.utils.bk_schema import apply_book_logs_schema
+from src.utils.bk_timeline import BookTimeline
+
+
+def make_logs() -> pd.DataFrame:
+    """Return the logs of two books, one of them finished and logged after."""
+    return apply_book_logs_schema(
+        pd.DataFrame(
+            {
+                "slug": ["first", "first", "first", "second", "second"],
+                "page_n": [100, 100, 100, 50, 50],
+                "page_current": [10, None, 40, 50, 50],
+                "finish_date": [None, None, None, "2024-01-04", "2024-01-04"],
+                "log_created_at": [
+                    "2024-01-01",
+                    "2024-01-03",
+                    "2024-01-06",
+                    "2024-01-02",
+                    "2024-01-07",
+                ],
+            }
+        )
+    )
+
+
+def test_timeline_to_dense():
+    """Test that the runs are expanded from the first log of every book."""
+    timeline = BookTimeline(make_logs())
+    dense_df = timeline.to_dense()
+
+    pages = dense_df.groupby("slug")["page_current"].apply(list).to_dict()
+    assert pages == {
+        "first": [10, 10, 10, 10, 10, 40, 40],
+        "second": [50, 50, 50, 50, 50, 50],
+    }
+    # the days without a log repeat the previous log
+    assert dense_df["page_n"].tolist() == [100] * 7 + [50] * 6
+
+    window_df = timeline.to_dense(start="2024-01-05", end="2024-01-06", slugs=["first"])
+    assert window_df["log_created_at"].dt.day.tolist() == [5, 6]
+    assert window_df["page_current"].tolist() == [10, 40]
+    assert window_df["page_n"].tolist() == [100, 100]
+
+
+def test_timeline_daily_totals():
+    """Test that the totals match summing the dense rows."""
+    bkdata = BookKeeperDataOps()
+    timeline = bkdata.get_timeline(make_logs())
+    dense_totals = (
+        bkdata.fill_up_dataframe(make_logs())
+        .groupby("log_created_at")["page_current"]
+        .sum()
+        .tolist()
+    )
+
+    assert timeline.daily_totals()["page_current"].tolist() == dense_totals
+    assert dense_totals == [10, 60, 60, 60, 60, 90, 90]
+    assert timeline.daily_totals(start="2024-01-06")["page_current"].tolist() == [
+        90,
+        90,
+    ]
+    assert BookTimeline(make_logs().iloc[0:0]).daily_totals().empty
+
+
+def test_timeline_daily_stats():
+    """Test that the stats of two sets of books add up to the stats of both."""
+    logs_df = make_logs()
+    stats_df = BookTimeline(logs_df).daily_stats()
+
+    assert stats_df["total_pages"].tolist() == [10, 60, 60, 60, 60, 90, 90]
+    assert stats_df["pages_delta"].tolist() == [10, 50, 0, 0, 0, 30, 0]
+    assert stats_df["active_books"].tolist() == [1, 1, 0, 0, 0, 1, 0]
+    assert stats_df["books_finished"].tolist() == [0, 0, 0, 1, 0, 0, 0]
+
+    first_df, second_df = (
+        BookTimeline(logs_df[logs_df["slug"] == slug])
+        .daily_stats(end="2024-01-07")
+        .set_index("stat_date")
+        for slug in ["first", "second"]
+    )
+    pd.testing.assert_frame_equal(
+        first_df.add(second_df, fill_value=0).astype("int64").reset_index(),
+        stats_df,
+    )
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module bk_today_batch."""
+
+import pandas as pd
+
+from src.utils.bk_today_batch import TodayBatch
+
+
+def make_log(slug: str, page_current: int) -> dict:
+    """Return today's log of a book."""
+    return {
+        "slug": slug,
+        "page_current": page_current,
+        "finish_date": None,
+        "log_created_at": pd.Timestamp.today().normalize(),
+        "deleted": False,
+    }
+
+
+def test_today_batch_tracks_changes():
+    """Test that only changed logs are flagged and the dataframe is reused."""
+    batch = TodayBatch()
+    batch.load(pd.DataFrame([{**make_log("first", 10), "id": 1}]))
+    df = batch.to_df()
+
+    assert not batch.put(make_log("first", 10))
+    assert batch.to_df() is df
+    assert batch.put(make_log("second", 0))
+    assert batch.set_deleted("first", True)
+    assert not batch.set_deleted("third", True)
+
+    assert batch.dirty == {"first", "second"}
+    assert batch.to_df()["deleted"].tolist() == [True, False]
+
+    batch.mark_clean({"first"})
+    assert batch.get_dirty_df()["slug"].tolist() == ["second"]
+
+    # changing a log back to its saved values clears the flag
+    assert batch.set_deleted("first", False)
+    assert batch.dirty == {"first", "second"}
+    assert batch.set_deleted("first", True)
+    assert batch.dirty == {"second"}
+
+
+def test_today_batch_load_keeps_unsaved_logs():
+    """Test that reloading today's logs does not drop the unsaved ones."""
+    batch = TodayBatch()
+    batch.put(make_log("first", 20))
+    batch.load(pd.DataFrame([make_log("first", 10), make_log("second", 5)]))
+
+    assert batch.to_df().set_index("slug")["page_current"].to_dict() == {
+        "second": 5,
+        "first": 20,
+    }
+    assert batch.dirty == {"first"}
+
+    empty_batch = TodayBatch()
+    empty_batch.load(pd.DataFrame(columns=["slug", "deleted"]))
+    assert empty_batch.to_df().query("deleted==True").empty
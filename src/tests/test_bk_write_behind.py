@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Test module WriteBehindQueue."""
+
+import asyncio
+import time
+
+import pandas as pd
+
+from src.tests.conftest import TEST_DB_USERNAME
+from src.utils import AsyncBookKeeperIO, BookKeeperIO
+from src.utils.bk_io import write_pending_books
+from src.utils.bk_write_behind import WriteBehindQueue
+
+
+def make_record(slug: str, page_current: int) -> dict:
+    """Return a log as appended to the journal."""
+    return {"slug": slug, "page_current": page_current, "log_created_at": "2024-01-01"}
+
+
+class RecordingWriter:
+    """Writer keeping the logs it is given, failing while told to."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.fail = False
+        self.written: list[pd.DataFrame] = []
+
+    def __call__(self, user_id: str, layout: str, df: pd.DataFrame) -> bool:
+        """Write the logs of the user."""
+        if self.fail:
+            raise ConnectionError("database is down")
+        self.written.append(df)
+        return True
+
+
+def test_journal_is_replayed_and_coalesced(tmp_path):
+    """Test pending logs survive a restart and are written once per book and day."""
+    journal_path = str(tmp_path / "journal.sqlite")
+    writer = RecordingWriter()
+    queue = WriteBehindQueue(journal_path, writer, start=False)
+    queue.enqueue("user", "per_user", [make_record("a", 10), make_record("b", 5)])
+    queue.enqueue("user", "per_user", [make_record("a", 20)])
+
+    # a new process finds the same logs in the journal
+    queue = WriteBehindQueue(journal_path, writer, start=False)
+    assert queue.get_metrics()["queue_depth"] == 3
+    pending_df = queue.get_pending("user", "per_user")
+    assert dict(zip(pending_df["slug"], pending_df["page_current"])) == {
+        "a": 20,
+        "b": 5,
+    }
+
+    writer.fail = True
+    assert not queue.flush()
+    assert queue.get_metrics()["queue_depth"] == 3
+    assert "database is down" in queue.get_metrics()["last_error"]
+
+    writer.fail = False
+    assert queue.flush()
+    metrics = queue.get_metrics()
+    assert metrics["queue_depth"] == 0
+    assert (metrics["flushes"], metrics["failed_flushes"]) == (2, 1)
+    assert sorted(writer.written[0]["page_current"]) == [5, 20]
+
+
+def test_failing_user_does_not_block_others(tmp_path, monkeypatch):
+    """Test the logs of other users are saved while one user's saves fail."""
+    monkeypatch.setattr("src.utils.bk_write_behind.FLUSH_BATCH_SIZE", 2)
+    writer = RecordingWriter()
+    queue = WriteBehindQueue(str(tmp_path / "journal.sqlite"), writer, start=False)
+    queue.enqueue("failing", "per_user", [make_record(s, 1) for s in "abc"])
+    queue.enqueue("user", "per_user", [make_record("a", 10)])
+
+    def write_books(user_id: str, layout: str, df: pd.DataFrame) -> bool:
+        if user_id == "failing":
+            raise ConnectionError("permission denied")
+        return writer(user_id, layout, df)
+
+    queue.write_books = write_books
+    assert not queue.flush()
+    assert [df["page_current"].tolist() for df in writer.written] == [[10]]
+    assert len(queue.get_pending("failing", "per_user")) == 3
+
+    # the failing user backs off, the background thread skips it until due
+    queue.write_books = writer
+    assert not queue.flush(due_only=True)
+    assert queue.get_metrics()["queue_depth"] == 3
+    assert queue.flush()
+    assert queue.flush()
+    assert queue.get_metrics()["queue_depth"] == 0
+
+
+def test_background_thread_flushes(tmp_path):
+    """Test the background thread writes the logs without being asked."""
+    writer = RecordingWriter()
+    queue = WriteBehindQueue(
+        str(tmp_path / "journal.sqlite"), writer, flush_interval=0.05
+    )
+    try:
+        queue.enqueue("user", "per_user", [make_record("a", 10)])
+        deadline = time.monotonic() + 5
+        while queue.get_metrics()["queue_depth"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        queue.stop(timeout=5)
+
+    assert queue.get_metrics()["flushed_rows"] == 1
+
+
+def test_save_books_write_behind(db_bookkeeper_io, tmp_path):
+    """Test saved logs show up in the tables before and after they are written."""
+    bk = db_bookkeeper_io
+    bk.write_behind = WriteBehindQueue(
+        str(tmp_path / "journal.sqlite"), write_pending_books, start=False
+    )
+    book = {
+        "title": "First",
+        "subtitle": "",
+        "author": "Test Author",
+        "location": "shelf",
+        "publisher": "Test Publisher",
+        "published_year": 2020,
+        "page_n": 100,
+        "page_current": 10,
+        "finish_date": None,
+        "tag1": "",
+        "tag2": "",
+        "tag3": "",
+        "language": "en",
+    }
+    bk.add_book(book, False)
+    assert bk.save_books()
+
+    today_df, latest_df = bk.get_latest_tables()
+    assert today_df["slug"].tolist() == ["test-author-first"]
+    assert latest_df["page_current"].tolist() == [10]
+
+    assert bk.write_behind.flush()
+    _, latest_df = BookKeeperIO(TEST_DB_USERNAME).get_latest_tables()
+    assert latest_df["page_current"].tolist() == [10]
+    assert bk.write_behind.get_pending(bk.user_id, bk.layout.value).empty
+
+
+def test_reading_stats_write_behind(db_bookkeeper_io, tmp_path):
+    """Test the reading statistics include the logs before and after they are written."""
+    bk = db_bookkeeper_io
+    bk.write_behind = WriteBehindQueue(
+        str(tmp_path / "journal.sqlite"), write_pending_books, start=False
+    )
+    book = {
+        "title": "First",
+        "subtitle": "",
+        "author": "Test Author",
+        "location": "shelf",
+        "publisher": "Test Publisher",
+        "published_year": 2020,
+        "page_n": 100,
+        "page_current": 10,
+        "finish_date": None,
+        "tag1": "",
+        "tag2": "",
+        "tag3": "",
+        "language": "en",
+    }
+    bk.add_book(book, False)
+    assert bk.save_books()
+    assert bk.write_behind.flush()
+    assert bk.get_reading_stats()["total_pages"].tolist() == [10]
+
+    bk.update_book({**book, "page_current": 30}, False)
+    assert bk.save_books()
+    stats_df = bk.get_reading_stats()
+    assert stats_df["total_pages"].tolist() == [30]
+    assert stats_df["pages_delta"].tolist() == [30]
+
+    # the statistics are read again once the queue is flushed
+    assert bk.write_behind.flush()
+    assert bk.get_reading_stats()["total_pages"].tolist() == [30]
+    assert bk.get_reading_stats() is bk.get_reading_stats()
+
+
+def test_async_save_books_write_behind(db_bookkeeper_io, tmp_path):
+    """Test the asyncio variant saves through the queue and reads its logs."""
+    book = {
+        "title": "First",
+        "subtitle": "",
+        "author": "Test Author",
+        "location": "shelf",
+        "publisher": "Test Publisher",
+        "published_year": 2020,
+        "page_n": 100,
+        "page_current": 10,
+        "finish_date": None,
+        "tag1": "",
+        "tag2": "",
+        "tag3": "",
+        "language": "en",
+    }
+    queue = WriteBehindQueue(
+        str(tmp_path / "journal.sqlite"), write_pending_books, start=False
+    )
+
+    async def save_and_load():
+        async_bk = AsyncBookKeeperIO(user_id=TEST_DB_USERNAME)
+        async_bk.write_behind = queue
+        try:
+            async_bk.add_book(book, False)
+            assert await async_bk.save_books()
+            return await async_bk.get_updated_tables()
+        finally:
+            await async_bk.async_engine.dispose()
+
+    _, today_df, latest_df = asyncio.run(save_and_load())
+    assert today_df["slug"].tolist() == ["test-author-first"]
+    assert latest_df["page_current"].tolist() == [10]
+    assert not db_bookkeeper_io._user_table_exists()
+
+    assert queue.flush()
+    _, latest_df = BookKeeperIO(TEST_DB_USERNAME).get_latest_tables()
+    assert latest_df["page_current"].tolist() == [10]
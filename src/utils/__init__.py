@@ -7,14 +7,19 @@ With classes and functions for IO and data manipulation.
 """
 
 from .auth import AuthIO
+from .bk_async_io import AsyncBookKeeperIO
 from .bk_data_ops import BookKeeperDataOps
-from .bk_io import BookKeeperIO
+from .bk_engine import get_pool_status
+from .bk_io import BookKeeperIO, StorageLayout
 from .ui_component import base_layout, with_authentication, with_user_logs
 from .utils import load_lottie_asset
 
 AuthIO = AuthIO
+AsyncBookKeeperIO = AsyncBookKeeperIO
 BookKeeperDataOps = BookKeeperDataOps
 BookKeeperIO = BookKeeperIO
+StorageLayout = StorageLayout
+get_pool_status = get_pool_status
 load_lottie_asset = load_lottie_asset
 with_authentication = with_authentication
 base_layout = base_layout
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Asyncio IO focused module of the app.
+
+With classes and functions related to the non-blocking reading and writing
+of the book logs.
+"""
+
+import asyncio
+from typing import Tuple
+
+import pandas as pd
+from sqlalchemy import inspect
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.sql import Select
+
+from .bk_data_ops import BookKeeperDataOps
+from .bk_engine import get_async_engine
+from .bk_io import (
+    BookKeeperIO,
+    StorageLayout,
+    user_tables_existing,
+)
+from .bk_schema import apply_book_logs_schema
+from .example_data import EXAMPLE_DATA
+
+
+class AsyncBookKeeperIO(BookKeeperIO):
+    """
+    Class to handle the IO operations of the BookKeeper app with asyncio.
+
+    The public methods reaching the database are coroutines, built on
+    private coroutines suffixed with _async, independent queries run
+    concurrently on separate connections. The blocking private methods
+    of BookKeeperIO keep their meaning, so the inherited methods such as
+    add_book and delete_book work the same.
+    """
+
+    def __init__(self, user_id: str, layout: StorageLayout | None = None):
+        """
+        Class constructor.
+
+        :param user_id: the id of the user
+        :type user_id: str
+        :param layout: the layout of the book logs, defaults to PG_STORAGE_LAYOUT
+        :type layout: StorageLayout, optional
+        """
+        super().__init__(user_id, layout=layout)
+        # the hooks inherited from BookKeeperIO keep the blocking engine
+        self.async_engine = get_async_engine()
+
+    # public methods
+    async def get_latest_tables(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Update today's batch and the latest state of the books.
+
+        The two queries run concurrently.
+
+        :return: today's batch and the latest state of the books
+        :rtype: Tuple[pd.DataFrame, pd.DataFrame]
+        """
+        if self._books_df is not None:
+            _, today_batch_df, latest_state_df = await self.get_updated_tables()
+        elif not await self._user_table_exists_async():
+            today = pd.Timestamp.today().normalize()  # noqa: F841
+            _, today_batch_df, latest_state_df = self._overlay_pending_books(
+                EXAMPLE_DATA, EXAMPLE_DATA.query("log_created_at==@today"), EXAMPLE_DATA
+            )
+        else:
+            today_batch_df, latest_state_df = await asyncio.gather(
+                self._get_today_books_async(), self._get_latest_books_async()
+            )
+            self.slug_index.reset(latest_state_df["slug"].unique().tolist())
+
+            _, today_batch_df, latest_state_df = self._overlay_pending_books(
+                None, today_batch_df, latest_state_df
+            )
+
+        return self._load_today_batch(today_batch_df), latest_state_df
+
+    async def get_books_history(self) -> pd.DataFrame:
+        """
+        Get every log of the user's books.
+
+        Loaded lazily on the first call and refreshed only after a save.
+
+        :return: the user's book list
+        :rtype: pd.DataFrame
+        """
+        if self._books_df is None or self._history_stale:
+            await self.get_updated_tables()
+
+        books_df, _, _ = self._overlay_pending_books(self._books_df, None, None)
+        return books_df
+
+    async def get_updated_tables(
+        self, full_refresh: bool = False
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        Update the user's book list, today's batch and the latest state of the books.
+
+        A full load reads the history once and derives today's batch and
+        the latest state from it, so the three tables and the watermark
+        agree. Later calls only fetch the logs above the watermark.
+
+        :param full_refresh: whether to reload every log, defaults to False
+        :type full_refresh: bool, optional
+
+        :return: the user's book list, today's batch and the latest state of the books
+        :rtype: Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        """
+        today = pd.Timestamp.today().normalize()
+
+        if full_refresh or self._books_df is None or self._watermark_id is None:
+            if await self._user_table_exists_async():
+                books_df = await self._get_all_books_async()
+                self.slug_index.reset(books_df["slug"].unique().tolist())
+            else:
+                books_df = EXAMPLE_DATA
+            self._books_df = books_df
+            self._today_batch_df = books_df.query("log_created_at==@today")
+            self._latest_state_df = self._get_latest_book_version(
+                books_df, date_col="log_created_at"
+            )
+        else:
+            new_books_df = self._get_changed_books(
+                await self._get_books_since_watermark_async()
+            )
+            if not new_books_df.empty or today != self._today:
+                self._merge_new_books(new_books_df, today)
+
+        self._today = today
+        self._set_watermark(self._books_df)
+        self._history_stale = False
+
+        return self._overlay_pending_books(
+            self._books_df, self._today_batch_df.copy(), self._latest_state_df
+        )
+
+    async def save_books(
+        self, df: pd.DataFrame | None = None, bulk: bool = True
+    ) -> bool:
+        """
+        Save the dataframe to the user's table.
+
+        Same upserts as BookKeeperIO.save_books, sent without blocking the loop.
+        With a write-behind queue the logs are appended to its journal
+        like BookKeeperIO.save_books does, the queue writes them.
+
+        :param df: the dataframe to save, defaults to today's unsaved logs
+        :type df: pd.DataFrame, optional
+        :param bulk: whether to use multi-row upserts, defaults to True
+        :type bulk: bool, optional
+
+        :return: whether the dataframe was saved or not
+        :rtype: bool
+        """
+        saved_slugs: set[str] = set()
+        if df is None:
+            df, saved_slugs = self._get_unsaved_books()
+            if df.empty:
+                return True
+
+        if self.write_behind is not None:
+            self.write_behind.enqueue(
+                self.user_id, self.layout.value, self._get_book_records(df)
+            )
+            self._history_stale = True
+            self._mark_saved(df, saved_slugs)
+            return True
+
+        # a second attempt is made in case the cached table has been dropped
+        for _ in range(2):
+            if not await self._user_table_exists_async():
+                await self._create_user_table_async()
+
+            try:
+                async with self.async_engine.begin() as conn:
+                    previous_df = await conn.run_sync(
+                        self._read_logs_for_stats, set(df.get("slug", ()))
+                    )
+                    if bulk:
+                        books = self._get_book_records(df)
+                        if books:
+                            await conn.execute(
+                                self._get_upsert_daily_book_logs_stmt(), books
+                            )
+                    else:
+                        for _, row in df.iterrows():
+                            stmt = self._get_upsert_daily_book_log_stmt(dict(row))
+                            await conn.execute(stmt)
+
+                    await conn.run_sync(self._update_reading_stats, previous_df, df)
+
+                if not df.empty:
+                    user_tables_existing.add(self._user_table_key())
+                self._history_stale = True
+                self._mark_saved(df, saved_slugs)
+                return True
+            except ProgrammingError:
+                self._forget_user_table()
+
+        return False
+
+    async def get_reading_stats(self) -> pd.DataFrame:
+        """
+        Get the reading statistics of every day.
+
+        Same as BookKeeperIO.get_reading_stats, read without blocking the loop.
+
+        :return: the total pages, the pages read, the books finished and
+            the books read of every day
+        :rtype: pd.DataFrame
+        """
+        if self._reading_stats_df is not None:
+            return self._reading_stats_df
+
+        pending_df = self._get_pending_books()
+        if not await self._user_table_exists_async():
+            books_df = EXAMPLE_DATA if pending_df.empty else pending_df
+            stats_df = BookKeeperDataOps().get_timeline(books_df).daily_stats()
+        else:
+            async with self.async_engine.begin() as conn:
+                stats_df = await conn.run_sync(self._load_reading_stats, pending_df)
+
+        if pending_df.empty:
+            self._reading_stats_df = stats_df
+        return stats_df
+
+    # private methods
+    async def _get_all_books_async(self) -> pd.DataFrame:
+        """
+        Get all the user's books.
+
+        Read from the primary like BookKeeperIO._get_all_books,
+        the watermark is set from them.
+
+        :return: the user's books
+        :rtype: pd.DataFrame
+        """
+        return await self._read_books_async(self._select_books())
+
+    async def _get_latest_books_async(self) -> pd.DataFrame:
+        """
+        Get the latest log of each of the user's books.
+
+        :return: the latest version of the books
+        :rtype: pd.DataFrame
+        """
+        stmt = (
+            self._select_books()
+            .distinct(self.table.c.slug)
+            .order_by(self.table.c.slug, self.table.c.log_created_at.desc())
+        )
+        return await self._read_books_async(stmt)
+
+    async def _get_today_books_async(self) -> pd.DataFrame:
+        """
+        Get the logs of the user's books created today.
+
+        :return: today's batch
+        :rtype: pd.DataFrame
+        """
+        today = pd.Timestamp.today().normalize().date()
+        stmt = self._select_books().where(self.table.c.log_created_at == today)
+        return await self._read_books_async(stmt)
+
+    async def _get_books_since_watermark_async(self) -> pd.DataFrame:
+        """
+        Get the user's logs that are new or might have changed since the last load.
+
+        :return: the user's logs above the watermark
+        :rtype: pd.DataFrame
+        """
+        stmt = self._select_books().where(
+            (self.table.c.id > self._watermark_id)
+            | (self.table.c.log_created_at >= self._watermark_date)
+        )
+        return await self._read_books_async(stmt)
+
+    async def _read_books_async(self, stmt: Select) -> pd.DataFrame:
+        """
+        Read the result of the query into a dataframe.
+
+        The columns are cast to the canonical dtypes of bk_schema.
+        The cached existence of the user's table is dropped if the query fails.
+
+        :param stmt: the query to run
+        :type stmt: sqlalchemy.Select
+
+        :return: the result of the query
+        :rtype: pd.DataFrame
+        """
+        try:
+            async with self.async_engine.connect() as conn:
+                result = await conn.execute(stmt)
+                books_df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+        except ProgrammingError:
+            self._forget_user_table()
+            raise
+
+        return apply_book_logs_schema(books_df)
+
+    async def _user_table_exists_async(self) -> bool:
+        """
+        Check if the user's table exists.
+
+        Shares the cache of BookKeeperIO.
+
+        :return: whether the table exists or not
+        :rtype: bool
+        """
+        key = self._user_table_key()
+        if (
+            key not in user_tables_existing
+            and await self._query_user_table_exists_async()
+        ):
+            user_tables_existing.add(key)
+
+        return key in user_tables_existing
+
+    async def _query_user_table_exists_async(self) -> bool:
+        """
+        Query the database whether the user's table exists.
+
+        :return: whether the table exists or not
+        :rtype: bool
+        """
+        async with self.async_engine.connect() as conn:
+            has_table = await conn.run_sync(
+                lambda sync_conn: inspect(sync_conn).has_table(
+                    self.table.name, schema=self.schema
+                )
+            )
+            if not has_table or self.layout == StorageLayout.PER_USER:
+                return has_table
+
+            stmt = self._select_books().limit(1)
+            return (await conn.execute(stmt)).first() is not None
+
+    async def _create_user_table_async(self) -> bool:
+        """
+        Create the user's table in the database.
+
+        :return: whether the table was created or not
+        :rtype: bool
+        """
+        try:
+            async with self.async_engine.begin() as conn:
+                await conn.run_sync(self.table.create, checkfirst=True)
+            # an empty shared table does not count as the user's in this layout
+            if self.layout == StorageLayout.PER_USER:
+                user_tables_existing.add(self._user_table_key())
+
+            return True
+        except ProgrammingError:
+            return False
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compaction focused module of the app.
+
+With classes and functions related to removing redundant book logs.
+"""
+
+from typing import NamedTuple
+
+import pandas as pd
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Integer,
+    String,
+    Table,
+    delete,
+    func,
+    select,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+
+from .bk_engine import engine_factory
+from .bk_io import BookKeeperIO, metadata, metadata_lock
+
+COMPACTION_BATCH_SIZE = 500
+COMPACTION_TABLE_NAME = "book_logs_compaction"
+
+# columns that do not describe the state of the book
+NON_STATE_COLUMNS = {"id", "user_id", "log_created_at"}
+
+
+class CompactionReport(NamedTuple):
+    """What a compaction pass has gone through and deleted."""
+
+    slugs: int = 0
+    rows_scanned: int = 0
+    rows_deleted: int = 0
+    bytes_deleted: int = 0
+
+
+def get_compaction_table(schema: str | None) -> Table:
+    """
+    Get the table holding the checkpoint of every user's compaction.
+
+    :param schema: the schema of the table
+    :type schema: str | None
+
+    :return: the checkpoint table
+    :rtype: sqlalchemy.Table
+    """
+    key = f"{schema}.{COMPACTION_TABLE_NAME}" if schema else COMPACTION_TABLE_NAME
+
+    with metadata_lock:
+        if key in metadata.tables:
+            return metadata.tables[key]
+
+        return Table(
+            COMPACTION_TABLE_NAME,
+            metadata,
+            Column("user_id", String, primary_key=True),
+            Column("layout", String, primary_key=True),
+            Column("last_slug", String),
+            Column("finished", Boolean, nullable=False, default=False),
+            Column("slugs", Integer, nullable=False, default=0),
+            Column("rows_scanned", Integer, nullable=False, default=0),
+            Column("rows_deleted", Integer, nullable=False, default=0),
+            Column("bytes_deleted", BigInteger, nullable=False, default=0),
+            Column("updated_at", DateTime, server_default=func.now()),
+            schema=schema,
+        )
+
+
+def get_redundant_log_ids(logs_df: pd.DataFrame) -> list[int]:
+    """
+    Get the logs repeating the state of the previous log of the same book.
+
+    The first and the last log of every book are always kept, so are the logs
+    where any column other than the id and the date changes. A dropped log
+    equals the log kept before it, which fill_up_dataframe repeats on the
+    days without a log, so the filled dataframe and the latest version of
+    the books stay exactly as they were.
+
+    :param logs_df: the logs of the books, with their ids
+    :type logs_df: pd.DataFrame
+
+    :return: the ids of the redundant logs
+    :rtype: list[int]
+    """
+    if logs_df.empty:
+        return []
+
+    logs_df = logs_df.sort_values(["slug", "log_created_at", "id"])
+    state_columns = [col for col in logs_df.columns if col not in NON_STATE_COLUMNS]
+    state_df = logs_df[state_columns].astype(object)
+
+    previous_df = state_df.groupby(logs_df["slug"]).shift()
+    same_as_previous = (
+        (state_df == previous_df) | (state_df.isna() & previous_df.isna())
+    ).all(axis=1)
+    # the first log has no previous one, the shift leaves it all missing
+    is_first = logs_df["slug"] != logs_df["slug"].shift()
+    is_last = logs_df["slug"] != logs_df["slug"].shift(-1)
+
+    return logs_df.loc[same_as_previous & ~is_first & ~is_last, "id"].tolist()
+
+
+class BookLogsCompactor:
+    """Class to remove the redundant logs of a user in resumable batches of books."""
+
+    def __init__(self, bk: BookKeeperIO, batch_size: int = COMPACTION_BATCH_SIZE):
+        """
+        Class constructor.
+
+        :param bk: the IO of the user to compact the logs of
+        :type bk: BookKeeperIO
+        :param batch_size: the number of books compacted per transaction
+        :type batch_size: int, optional
+        """
+        self.bk = bk
+        self.batch_size = batch_size
+        self.table = get_compaction_table(bk.schema)
+
+    def run(self, max_batches: int | None = None) -> CompactionReport:
+        """
+        Compact the logs of the user, continuing an interrupted pass if there is one.
+
+        Every batch is committed together with the checkpoint,
+        so the pass can be stopped at any point and resumed later.
+        Today's logs can still change and are left alone.
+
+        :param max_batches: the number of batches to stop after, defaults to all
+        :type max_batches: int, optional
+
+        :return: the totals of the pass so far
+        :rtype: CompactionReport
+        """
+        if not self.bk._user_table_exists():
+            return CompactionReport()
+
+        self.table.create(self.bk.sql_engine, checkfirst=True)
+        last_slug, report, finished = self._load_checkpoint()
+        if finished:
+            last_slug, report = None, CompactionReport()
+
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            last_slug, report, finished = self._compact_batch(last_slug, report)
+            batches += 1
+            if finished:
+                break
+
+        return report
+
+    def _compact_batch(
+        self, last_slug: str | None, report: CompactionReport
+    ) -> tuple[str | None, CompactionReport, bool]:
+        """
+        Compact the next batch of books and move the checkpoint past them.
+
+        :param last_slug: the last book compacted, None to start from the first
+        :type last_slug: str | None
+        :param report: the totals of the pass before this batch
+        :type report: CompactionReport
+
+        :return: the last book compacted, the totals and whether the pass finished
+        :rtype: tuple[str | None, CompactionReport, bool]
+        """
+        logs = self.bk.table
+        today = pd.Timestamp.today().normalize().date()
+
+        slugs_stmt = (
+            select(logs.c.slug)
+            .distinct()
+            .where(self.bk._user_filter())
+            .order_by(logs.c.slug)
+            .limit(self.batch_size)
+        )
+        if last_slug is not None:
+            slugs_stmt = slugs_stmt.where(logs.c.slug > last_slug)
+
+        with engine_factory.connect() as conn:
+            slugs = conn.execute(slugs_stmt).scalars().all()
+            if not slugs:
+                self._save_checkpoint(conn, None, report, finished=True)
+                conn.commit()
+                return None, report, True
+
+            logs_stmt = self.bk._select_books().where(
+                logs.c.slug.in_(slugs), logs.c.log_created_at < today
+            )
+            logs_df = pd.read_sql_query(logs_stmt, conn)
+            redundant_ids = get_redundant_log_ids(logs_df)
+
+            # the size of the deleted rows, postgres reuses it after a VACUUM
+            bytes_deleted = 0
+            if redundant_ids:
+                delete_stmt = (
+                    delete(logs)
+                    .where(self.bk._user_filter(), logs.c.id.in_(redundant_ids))
+                    .returning(func.pg_column_size(logs.table_valued()))
+                )
+                bytes_deleted = sum(conn.execute(delete_stmt).scalars())
+
+            report = CompactionReport(
+                slugs=report.slugs + len(slugs),
+                rows_scanned=report.rows_scanned + len(logs_df),
+                rows_deleted=report.rows_deleted + len(redundant_ids),
+                bytes_deleted=report.bytes_deleted + bytes_deleted,
+            )
+            self._save_checkpoint(conn, slugs[-1], report, finished=False)
+            conn.commit()
+
+        return slugs[-1], report, False
+
+    def _load_checkpoint(self) -> tuple[str | None, CompactionReport, bool]:
+        """
+        Load where the last pass of the user got to.
+
+        :return: the last book compacted, the totals and whether the pass finished
+        :rtype: tuple[str | None, CompactionReport, bool]
+        """
+        stmt = select(self.table).where(
+            self.table.c.user_id == self.bk.user_id,
+            self.table.c.layout == self.bk.layout.value,
+        )
+        with engine_factory.connect() as conn:
+            row = conn.execute(stmt).mappings().first()
+
+        if row is None:
+            return None, CompactionReport(), False
+
+        report = CompactionReport(*(row[field] for field in CompactionReport._fields))
+        return row["last_slug"], report, row["finished"]
+
+    def _save_checkpoint(
+        self,
+        conn: Connection,
+        last_slug: str | None,
+        report: CompactionReport,
+        finished: bool,
+    ) -> None:
+        """
+        Save where the pass of the user got to, in the transaction of the batch.
+
+        :param conn: the connection of the batch
+        :type conn: sqlalchemy.engine.Connection
+        :param last_slug: the last book compacted
+        :type last_slug: str | None
+        :param report: the totals of the pass so far
+        :type report: CompactionReport
+        :param finished: whether the pass finished
+        :type finished: bool
+        """
+        values = {"last_slug": last_slug, "finished": finished, **report._asdict()}
+        stmt = insert(self.table).values(
+            user_id=self.bk.user_id, layout=self.bk.layout.value, **values
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "layout"],
+            set_={**values, "updated_at": func.now()},
+        )
+        conn.execute(stmt)
@@ -10,8 +10,19 @@ from enum import Enum
 from typing import Any, Iterable
 
 import boto3
+import numpy as np
 import pandas as pd
 
+from .bk_filter_index import get_filter_index
+from .bk_logs_index import get_logs_index
+from .bk_reading_stats import (
+    ReadingStats,
+    cache_reading_stats,
+    get_cached_reading_stats,
+)
+from .bk_schema import apply_book_logs_schema
+from .bk_timeline import BookTimeline
+
 s3_client = boto3.client("s3", region_name="eu-north-1")
 
 
@@ -51,52 +62,79 @@ class BookKeeperDataOps:
     def filter_books(
         self,
         latest_book_state_df: pd.DataFrame,
-        s_author: str,
+        s_author: str | list[str],
         s_published_year_min: int,
         s_published_year_max: int,
-        s_publisher: str,
+        s_publisher: str | list[str],
+        s_language: list[str] | None = None,
+        s_tag: list[str] | None = None,
     ) -> pd.DataFrame:
         """
         Filter the books by given properties.
 
+        The filter index of the dataframe is built on the first call and
+        reused by the later calls on the same dataframe.
+
         :param latest_book_state_df: the dataframe to filter
         :type latest_book_state_df: pd.DataFrame
-        :param s_author: the author to filter by
-        :type s_author: str
+        :param s_author: the author or the authors to filter by
+        :type s_author: str | list[str]
         :param s_published_year_min: the min published year to filter by
         :type s_published_year_min: int
         :param s_published_year_max: the max published year to filter by
         :type s_published_year_max: int
-        :param s_publisher: the publisher to filter by
-        :type s_publisher: str
-
-        :return: the filtered dataframe
+        :param s_publisher: the publisher or the publishers to filter by
+        :type s_publisher: str | list[str]
+        :param s_language: the languages to filter by
+        :type s_language: list[str], optional
+        :param s_tag: the tags to filter by
+        :type s_tag: list[str], optional
+
+        :return: the filtered dataframe, without the deleted books
         :rtype: pd.DataFrame
         """
-        filtered_df = latest_book_state_df
-        if s_author:
-            filtered_df = filtered_df.query("author==@s_author")
-        if s_publisher:
-            filtered_df = filtered_df.query("publisher==@s_publisher")
-        if s_published_year_min:
-            filtered_df = filtered_df.query("published_year>=@s_published_year_min")
-        if s_published_year_max:
-            filtered_df = filtered_df.query("published_year<=@s_published_year_max")
-        return filtered_df
+        mask = get_filter_index(latest_book_state_df).get_mask(
+            authors=s_author,
+            publishers=s_publisher,
+            languages=s_language,
+            tags=s_tag,
+            published_year_min=s_published_year_min,
+            published_year_max=s_published_year_max,
+        )
+        return latest_book_state_df.iloc[np.flatnonzero(mask)]
+
+    def get_facet_counts(
+        self, latest_book_state_df: pd.DataFrame, facet: str
+    ) -> pd.Series:
+        """
+        Count the books not deleted per value of the facet.
+
+        :param latest_book_state_df: the dataframe to count the books of
+        :type latest_book_state_df: pd.DataFrame
+        :param facet: the facet to count, author, publisher, language or tag
+        :type facet: str
+
+        :return: the number of books per value, the most frequent first
+        :rtype: pd.Series
+        """
+        return get_filter_index(latest_book_state_df).get_facet_counts(facet)
 
     def get_logs_for_book(self, books_df: pd.DataFrame, slug: str) -> pd.DataFrame:
         """
         Get the logs for a given book.
 
+        The logs are sliced from the logs index of the dataframe,
+        built on the first call and reused by the later ones.
+
         :param slug: the slug of the book to get the logs for
         :type slug: str
         :param books_df: the dataframe to get the logs from
         :type books_df: pd.DataFrame
 
-        :return: the logs for the given book
+        :return: the logs for the given book, from the oldest to the latest
         :rtype: pd.DataFrame
         """
-        return books_df.query(f"slug=='{slug}'")
+        return get_logs_index(books_df).get_logs(slug)
 
     def get_closest_date_pagecount_for_book(
         self, books_df: pd.DataFrame, slug: str, date: pd.Timestamp
@@ -112,10 +150,52 @@ class BookKeeperDataOps:
         :return: the logs for the given book
         :rtype: pd.DataFrame
         """
-        logs_for_book = self.get_logs_for_book(books_df, slug)
-        sorted_logs = logs_for_book.sort_values(by="log_created_at", ascending=True)
+        sorted_logs = self.get_logs_for_book(books_df, slug)
         return sorted_logs.iloc[sorted_logs["log_created_at"].searchsorted(date)]
 
+    def get_closest_date_pagecounts_for_books(
+        self, books_df: pd.DataFrame, slugs: Iterable[str], date: pd.Timestamp
+    ) -> pd.Series:
+        """
+        Get the page count of every given book as of a date.
+
+        All books are looked up in one as-of merge, each taking the page
+        count of its latest log at or before the date.
+
+        :param books_df: the dataframe to get the logs from
+        :type books_df: pd.DataFrame
+        :param slugs: the slugs of the books to get the page counts for
+        :type slugs: Iterable[str]
+        :param date: the date to get the page counts at
+        :type date: pd.Timestamp
+
+        :return: the page counts by slug, 0 for books not logged by the date
+        :rtype: pd.Series
+        """
+        slugs = list(slugs)
+        date_dtype = books_df["log_created_at"].dtype
+        targets_df = pd.DataFrame(
+            {
+                "slug": pd.Series(slugs, dtype=object),
+                "log_created_at": pd.Series(
+                    pd.Timestamp(date), index=range(len(slugs))
+                ),
+            }
+        ).astype({"log_created_at": date_dtype})
+        logs_df = (
+            books_df.loc[
+                books_df["slug"].isin(slugs),
+                ["slug", "log_created_at", "page_current"],
+            ]
+            .astype({"slug": object})
+            .sort_values("log_created_at", kind="stable")
+        )
+
+        pagecounts_df = pd.merge_asof(
+            targets_df, logs_df, on="log_created_at", by="slug"
+        )
+        return pagecounts_df.set_index("slug")["page_current"].fillna(0)
+
     def fill_up_book_df(
         self, book_df: pd.DataFrame, df_dates: Iterable[pd.Timestamp]
     ) -> pd.DataFrame:
@@ -130,22 +210,61 @@ class BookKeeperDataOps:
         :return: the dataframe filled up
         :rtype: pd.DataFrame
         """
-        latest_log: pd.DataFrame
-        rows_to_add: list[pd.DataFrame] = []
-        first_log_date = book_df["log_created_at"].min()
+        return self.fill_up_books_df(book_df, df_dates)
 
-        for date in (d for d in df_dates if d >= first_log_date):
-            row_for_date = book_df.query(f"log_created_at == '{date}'")
+    def fill_up_books_df(
+        self, books_df: pd.DataFrame, df_dates: Iterable[pd.Timestamp]
+    ) -> pd.DataFrame:
+        """
+        Given current logs for books fill up the dataframe for given dates.
 
-            if row_for_date.shape[0] > 0:
-                latest_log = row_for_date.iloc[0]
+        Every book gets a copy of its latest log for each date from its first
+        log on that it was not logged at, all books matched in one as-of merge.
 
-            else:
-                new_row = latest_log.copy()
-                new_row["log_created_at"] = date
-                rows_to_add.append(new_row)
+        :param books_df: the dataframe to fill up
+        :type books_df: pd.DataFrame
+        :param df_dates: the dates to fill up the dataframe for
+        :type df_dates: Iterable[pd.Timestamp]
 
-        return pd.concat([pd.DataFrame(rows_to_add), book_df], axis=0)
+        :return: the dataframe filled up, the added rows first
+        :rtype: pd.DataFrame
+        """
+        date_dtype = books_df["log_created_at"].dtype
+        dates = np.unique(pd.to_datetime(list(df_dates)).to_numpy().astype(date_dtype))
+        first_log_dates = books_df.groupby("slug", observed=True)[
+            "log_created_at"
+        ].min()
+
+        # every book paired with the dates from its first log on
+        first_positions = np.searchsorted(dates, first_log_dates.to_numpy())
+        lengths = len(dates) - first_positions
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        grid_df = pd.DataFrame(
+            {
+                "slug": np.repeat(first_log_dates.index.to_numpy(), lengths),
+                "log_created_at": dates[np.repeat(first_positions, lengths) + offsets],
+            }
+        )
+        logged = pd.MultiIndex.from_frame(books_df[["slug", "log_created_at"]])
+        grid_df = grid_df[~pd.MultiIndex.from_frame(grid_df).isin(logged)]
+
+        # the first log of a day is the one carried over
+        logs_df = (
+            books_df.drop_duplicates(["slug", "log_created_at"])
+            .rename(columns={"log_created_at": "as_of"})
+            .sort_values("as_of", kind="stable")
+        )
+        filled_df = pd.merge_asof(
+            grid_df.sort_values("log_created_at", kind="stable"),
+            logs_df,
+            left_on="log_created_at",
+            right_on="as_of",
+            by="slug",
+        )
+
+        return pd.concat([filled_df[books_df.columns], books_df], axis=0)
 
     def backdate_books(self, books_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -168,60 +287,102 @@ class BookKeeperDataOps:
         finished_books_df["log_created_at"] = finished_books_df["finish_date"]
         return finished_books_df
 
-    def fill_up_dataframe(self, books_df: pd.DataFrame) -> pd.DataFrame:
+    def get_timeline(self, books_df: pd.DataFrame) -> BookTimeline:
         """
-        Fill up the dataframe with missing rows.
+        Get the timeline of the page counts of the books.
 
-        Not all books are kept in all days but for some operations
-        we need the dataframe in a format like that.
-        For each date
+        Finished books logged after their finish date are backdated first,
+        so their page count is reached on the day they were finished.
 
-        :param books_df: the dataframe to fill up
-        :type df: pd.DataFrame
+        :param books_df: the logs of the books
+        :type books_df: pd.DataFrame
 
-        :return: the dataframe filled up
-        :rtype: pd.DataFrame
+        :return: the timeline of the books
+        :rtype: BookTimeline
         """
+        if books_df.empty:
+            return BookTimeline(apply_book_logs_schema(books_df.copy()))
+
         backdated_books_df = self.backdate_books(books_df.copy())
-        books_df = pd.concat([books_df, backdated_books_df], axis=0)
-        books_df["log_created_at"] = pd.to_datetime(books_df["log_created_at"])
-        # sort df by slug and date
-        books_df.sort_values(by=["slug", "log_created_at"], inplace=True)
-
-        # create new df with all unique dates
-        unique_dates = pd.date_range(
-            books_df["log_created_at"].min(), books_df["log_created_at"].max(), freq="D"
+        books_df = apply_book_logs_schema(
+            pd.concat([books_df, backdated_books_df], axis=0)
         )
+        return BookTimeline(books_df)
 
-        # cross join unique dates with unique slugs
-        unique_slugs = books_df["slug"].unique()
-        cartesian_product = pd.MultiIndex.from_product(
-            [unique_slugs, unique_dates], names=["slug", "log_created_at"]
-        )
-        cross_join_df = pd.DataFrame(index=cartesian_product).reset_index()
+    def get_reading_stats(
+        self,
+        reading_stats_df: pd.DataFrame,
+        latest_book_state_df: pd.DataFrame,
+        books_df: pd.DataFrame,
+    ) -> ReadingStats:
+        """
+        Get the reading statistics of the user.
 
-        # merge cross join with books_df
-        result_df = cross_join_df.merge(
-            books_df, how="left", on=["slug", "log_created_at"]
-        )
+        The statistics are computed once per version of the data, reruns
+        passing the same dataframes on the same day get the cached ones.
 
-        # sort and reset the index of the result df
-        result_df.sort_values(by=["slug", "log_created_at"], inplace=True)
-        result_df.reset_index(drop=True, inplace=True)
+        :param reading_stats_df: the reading statistics of every day
+        :type reading_stats_df: pd.DataFrame
+        :param latest_book_state_df: the latest state of the books
+        :type latest_book_state_df: pd.DataFrame
+        :param books_df: the logs of the books
+        :type books_df: pd.DataFrame
 
-        # interpolate the missing values
-        result_df = result_df.groupby("slug", group_keys=False).apply(
-            self._custom_interpolate
+        :return: the KPIs, the rolling rates, the streaks and the progress
+        :rtype: ReadingStats
+        """
+        today = pd.Timestamp.today().normalize()
+        frames = (reading_stats_df, latest_book_state_df, books_df)
+        reading_stats = get_cached_reading_stats(frames, today)
+        if reading_stats is not None:
+            return reading_stats
+
+        live_books_df = latest_book_state_df[
+            get_filter_index(latest_book_state_df).get_mask()
+        ]
+        books_with_state_df = self.add_books_state(live_books_df)
+        in_progress_slugs = books_with_state_df.query("state == 'in progress'")["slug"]
+
+        timeline = self.get_timeline(books_df)
+        reading_stats = ReadingStats(
+            reading_stats_df,
+            books_with_state_df,
+            timeline,
+            self.get_closest_date_pagecounts_for_books(
+                timeline.logs, in_progress_slugs, date=today - pd.Timedelta(days=14)
+            ),
+            today,
         )
+        cache_reading_stats(frames, reading_stats)
+        return reading_stats
 
-        # fill remaining missing values with 0
-        result_df.fillna({"page_current": 0}, inplace=True)
+    def fill_up_dataframe(
+        self,
+        books_df: pd.DataFrame,
+        start: pd.Timestamp | None = None,
+        end: pd.Timestamp | None = None,
+        slugs: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Fill up the dataframe with missing rows.
 
-        return result_df
+        Not all books are kept in all days but for some operations
+        we need the dataframe in a format like that.
+        For each date from the first log of a book its latest log is kept.
+
+        :param books_df: the dataframe to fill up
+        :type df: pd.DataFrame
+        :param start: the first day to fill up, defaults to the first log
+        :type start: pd.Timestamp, optional
+        :param end: the last day to fill up, defaults to the last log
+        :type end: pd.Timestamp, optional
+        :param slugs: the books to fill up, defaults to every book
+        :type slugs: list[str], optional
 
-    def _custom_interpolate(self, group: pd.DataFrame) -> pd.DataFrame:
-        group["page_current"] = group["page_current"].ffill()
-        return group
+        :return: the dataframe filled up
+        :rtype: pd.DataFrame
+        """
+        return self.get_timeline(books_df).to_dense(start, end, slugs)
 
     def get_earliest_log_per_book(books_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -263,7 +424,9 @@ class BookKeeperDataOps:
         df_copy = latest_books_df.copy()
 
         df_copy.loc[:, "state"] = BookState.NOT_STARTED.value
-        df_copy.loc[df_copy["page_current"] > 0, "state"] = BookState.IN_PROGRESS.value
+        df_copy.loc[df_copy["page_current"].fillna(0) > 0, "state"] = (
+            BookState.IN_PROGRESS.value
+        )
         df_copy.loc[~pd.isnull(df_copy["finish_date"]), "state"] = (
             BookState.FINISHED.value
         )
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Database engine focused module of the app.
+
+With classes and functions related to the connection pools of the database.
+"""
+
+import time
+from contextlib import contextmanager
+from os import environ
+from threading import Lock
+from typing import Any, Iterator, Mapping
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, Connection, Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+ASYNC_DRIVER = "postgresql+asyncpg"
+
+
+class PoolMetrics:
+    """Class to collect the checkout and wait statistics of a connection pool."""
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self._lock = Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def attach(self, engine: Engine) -> None:
+        """
+        Listen to the pool events of the engine.
+
+        :param engine: the engine to collect the statistics of
+        :type engine: sqlalchemy.engine.Engine
+        """
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+
+    def record_wait(self, seconds: float) -> None:
+        """
+        Record the time it took to get a connection from the pool.
+
+        :param seconds: the time waited
+        :type seconds: float
+        """
+        with self._lock:
+            self.waits += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def snapshot(self) -> dict[str, float]:
+        """
+        Get the statistics collected so far.
+
+        :return: the statistics by name
+        :rtype: dict[str, float]
+        """
+        with self._lock:
+            return {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "checked_out": self.checked_out,
+                "max_checked_out": self.max_checked_out,
+                "avg_wait_seconds": (
+                    self.total_wait_seconds / self.waits if self.waits else 0.0
+                ),
+                "max_wait_seconds": self.max_wait_seconds,
+            }
+
+    def _on_connect(self, *_: Any) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, *_: Any) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def _on_checkin(self, *_: Any) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def _on_invalidate(self, *_: Any) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+
+class EngineFactory:
+    """Class to lazily build the database engines of the app from the environment."""
+
+    def __init__(self, env: Mapping[str, str] = environ) -> None:
+        """
+        Class constructor.
+
+        :param env: the variables to configure the engines from
+        :type env: Mapping[str, str]
+        """
+        self.env = env
+        self._lock = Lock()
+        self._engines: dict[bool, Engine] = {}
+        self._metrics: dict[bool, PoolMetrics] = {}
+        self._async_engines: dict[bool, AsyncEngine] = {}
+        self._async_metrics: dict[bool, PoolMetrics] = {}
+
+    def get_engine(self, read_only: bool = False) -> Engine:
+        """
+        Get the engine, building it on first use.
+
+        Read only engines connect to PG_READ_REPLICA_URL when it is set
+        and fall back to the primary otherwise.
+
+        :param read_only: whether the engine is only used for reads
+        :type read_only: bool, optional
+
+        :return: the engine
+        :rtype: sqlalchemy.engine.Engine
+        """
+        use_replica = self._use_replica(read_only)
+
+        with self._lock:
+            if use_replica not in self._engines:
+                engine = create_engine(
+                    self._get_url(use_replica), **self._get_engine_options()
+                )
+                metrics = PoolMetrics()
+                metrics.attach(engine)
+                self._engines[use_replica] = engine
+                self._metrics[use_replica] = metrics
+
+            return self._engines[use_replica]
+
+    def get_async_engine(self, read_only: bool = False) -> AsyncEngine:
+        """
+        Get the asyncio engine, building it on first use.
+
+        Configured like the synchronous engine but connects with asyncpg.
+
+        :param read_only: whether the engine is only used for reads
+        :type read_only: bool, optional
+
+        :return: the asyncio engine
+        :rtype: sqlalchemy.ext.asyncio.AsyncEngine
+        """
+        use_replica = self._use_replica(read_only)
+
+        with self._lock:
+            if use_replica not in self._async_engines:
+                url = make_url(self._get_url(use_replica)).set(drivername=ASYNC_DRIVER)
+                engine = create_async_engine(
+                    url, **self._get_engine_options(async_driver=True)
+                )
+                metrics = PoolMetrics()
+                metrics.attach(engine.sync_engine)
+                self._async_engines[use_replica] = engine
+                self._async_metrics[use_replica] = metrics
+
+            return self._async_engines[use_replica]
+
+    @contextmanager
+    def connect(self, read_only: bool = False) -> Iterator[Connection]:
+        """
+        Check out a connection and record how long it took.
+
+        :param read_only: whether the connection is only used for reads
+        :type read_only: bool, optional
+
+        :return: the connection, returned to the pool on exit
+        :rtype: Iterator[sqlalchemy.engine.Connection]
+        """
+        engine = self.get_engine(read_only)
+        start = time.perf_counter()
+        with engine.connect() as conn:
+            self.get_metrics(read_only).record_wait(time.perf_counter() - start)
+            yield conn
+
+    def get_metrics(self, read_only: bool = False) -> PoolMetrics:
+        """
+        Get the pool metrics of the engine.
+
+        :param read_only: whether to get the metrics of the read only engine
+        :type read_only: bool, optional
+
+        :return: the metrics of the pool
+        :rtype: PoolMetrics
+        """
+        self.get_engine(read_only)
+        return self._metrics[self._use_replica(read_only)]
+
+    def get_pool_status(self) -> dict[str, dict[str, float]]:
+        """
+        Get the metrics and the current state of every pool built so far.
+
+        :return: the metrics by pool, primary or replica, sync or async
+        :rtype: dict[str, dict[str, float]]
+        """
+        with self._lock:
+            pools = [
+                ("", self._engines, self._metrics),
+                ("async_", self._async_engines, self._async_metrics),
+            ]
+            pools = [
+                (prefix, dict(engines), dict(metrics))
+                for prefix, engines, metrics in pools
+            ]
+
+        status = {}
+        for prefix, engines, metrics in pools:
+            for use_replica, engine in engines.items():
+                pool = engine.pool
+                name = f"{prefix}{'replica' if use_replica else 'primary'}"
+                status[name] = {
+                    **metrics[use_replica].snapshot(),
+                    "pool_size": getattr(pool, "size", lambda: 0)(),
+                    "overflow": getattr(pool, "overflow", lambda: 0)(),
+                }
+        return status
+
+    def _use_replica(self, read_only: bool) -> bool:
+        """
+        Check whether reads should go to the read replica.
+
+        :param read_only: whether the engine is only used for reads
+        :type read_only: bool
+
+        :return: whether to use the read replica
+        :rtype: bool
+        """
+        return read_only and bool(self.env.get("PG_READ_REPLICA_URL"))
+
+    def _get_url(self, use_replica: bool) -> URL | str:
+        """
+        Get the url of the database.
+
+        :param use_replica: whether to get the url of the read replica
+        :type use_replica: bool
+
+        :return: the url of the database
+        :rtype: sqlalchemy.engine.URL | str
+        """
+        if use_replica:
+            return self.env["PG_READ_REPLICA_URL"]
+
+        return URL.create(
+            "postgresql",
+            username=self.env.get("PG_USER"),
+            password=self.env.get("PG_PASSWORD"),
+            host=self.env.get("PG_HOST"),
+            port=int(self.env.get("PG_PORT", 5432)),
+            database=self.env.get("PG_DATABASE", "admin_db"),
+        )
+
+    def _get_engine_options(self, async_driver: bool = False) -> dict[str, Any]:
+        """
+        Get the pool and connection options of the engines.
+
+        :param async_driver: whether the options are for asyncpg, defaults to False
+        :type async_driver: bool, optional
+
+        :return: the keyword arguments of create_engine
+        :rtype: dict[str, Any]
+        """
+        options: dict[str, Any] = {
+            "pool_size": int(self.env.get("PG_POOL_SIZE", 5)),
+            "max_overflow": int(self.env.get("PG_MAX_OVERFLOW", 10)),
+            "pool_timeout": float(self.env.get("PG_POOL_TIMEOUT", 30)),
+            "pool_recycle": int(self.env.get("PG_POOL_RECYCLE", 1800)),
+            "pool_pre_ping": self.env.get("PG_POOL_PRE_PING", "true").lower()
+            in ("1", "true", "yes"),
+        }
+
+        statement_timeout = self.env.get("PG_STATEMENT_TIMEOUT")
+        if statement_timeout and async_driver:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(int(statement_timeout))}
+            }
+        elif statement_timeout:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={int(statement_timeout)}"
+            }
+
+        return options
+
+
+engine_factory = EngineFactory()
+
+
+def get_engine(read_only: bool = False) -> Engine:
+    """
+    Get the engine of the app.
+
+    :param read_only: whether the engine is only used for reads
+    :type read_only: bool, optional
+
+    :return: the engine
+    :rtype: sqlalchemy.engine.Engine
+    """
+    return engine_factory.get_engine(read_only)
+
+
+def get_async_engine(read_only: bool = False) -> AsyncEngine:
+    """
+    Get the asyncio engine of the app.
+
+    :param read_only: whether the engine is only used for reads
+    :type read_only: bool, optional
+
+    :return: the asyncio engine
+    :rtype: sqlalchemy.ext.asyncio.AsyncEngine
+    """
+    return engine_factory.get_async_engine(read_only)
+
+
+def get_pool_status() -> dict[str, dict[str, float]]:
+    """
+    Get the metrics and the current state of the connection pools of the app.
+
+    :return: the metrics by pool, primary or replica
+    :rtype: dict[str, dict[str, float]]
+    """
+    return engine_factory.get_pool_status()
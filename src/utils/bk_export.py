@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Export focused module of the app.
+
+With classes and functions related to streaming the book logs out to files.
+"""
+
+import csv
+import json
+from datetime import date
+from enum import Enum
+from pathlib import Path
+from typing import IO, Iterator, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, Date, Integer, Row
+from sqlalchemy.sql import Select
+
+from .bk_engine import engine_factory
+from .bk_io import BookKeeperIO
+from .bk_schema import apply_book_logs_schema
+
+EXPORT_CHUNK_SIZE = 5000
+
+
+class ExportFormat(Enum):
+    """Possible formats of an export."""
+
+    CSV = "csv"
+    JSONL = "jsonl"
+    PARQUET = "parquet"
+
+    @classmethod
+    def from_path(cls, path: str | Path) -> "ExportFormat":
+        """
+        Get the format matching the extension of the path.
+
+        :param path: the path of the export
+        :type path: str | Path
+
+        :return: the format of the export
+        :rtype: ExportFormat
+        """
+        return cls(Path(path).suffix.lstrip(".").lower())
+
+
+class BookLogsExporter:
+    """
+    Class to export the logs of a user without loading them all in memory.
+
+    The logs are read through a server side cursor and written out
+    one chunk at a time, so memory only depends on the chunk size.
+    """
+
+    def __init__(self, bk: BookKeeperIO, chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        Class constructor.
+
+        :param bk: the IO of the user to export the logs of
+        :type bk: BookKeeperIO
+        :param chunk_size: the number of logs fetched and written at once
+        :type chunk_size: int, optional
+        """
+        self.bk = bk
+        self.chunk_size = chunk_size
+
+    def iter_chunks(
+        self,
+        latest_only: bool = False,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Iterate over the logs of the user in chunks of dataframes.
+
+        :param latest_only: whether to get only the latest log per book
+        :type latest_only: bool, optional
+        :param start: the first day of the logs, defaults to the first log
+        :type start: date, optional
+        :param end: the last day of the logs, defaults to the last log
+        :type end: date, optional
+
+        :return: the chunks of logs, with the canonical dtypes
+        :rtype: Iterator[pd.DataFrame]
+        """
+        for columns, rows in self._iter_rows(latest_only, start, end):
+            yield apply_book_logs_schema(pd.DataFrame(rows, columns=columns))
+
+    def export(
+        self,
+        path: str | Path,
+        export_format: ExportFormat | None = None,
+        latest_only: bool = False,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> int:
+        """
+        Export the logs of the user to a file.
+
+        :param path: the path of the file, overwritten if it exists
+        :type path: str | Path
+        :param export_format: the format of the file, defaults to its extension
+        :type export_format: ExportFormat, optional
+        :param latest_only: whether to export only the latest log per book
+        :type latest_only: bool, optional
+        :param start: the first day of the logs, defaults to the first log
+        :type start: date, optional
+        :param end: the last day of the logs, defaults to the last log
+        :type end: date, optional
+
+        :return: the number of logs exported
+        :rtype: int
+        """
+        export_format = export_format or ExportFormat.from_path(path)
+        chunks = self._iter_rows(latest_only, start, end)
+
+        if export_format == ExportFormat.PARQUET:
+            return self._write_parquet(path, chunks)
+
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            if export_format == ExportFormat.CSV:
+                return self._write_csv(f, chunks)
+            return self._write_jsonl(f, chunks)
+
+    def _select(
+        self, latest_only: bool, start: date | None, end: date | None
+    ) -> Select:
+        """
+        Select the logs to export, ordered by book and date.
+
+        :param latest_only: whether to select only the latest log per book
+        :type latest_only: bool
+        :param start: the first day of the logs
+        :type start: date | None
+        :param end: the last day of the logs
+        :type end: date | None
+
+        :return: the select statement
+        :rtype: sqlalchemy.Select
+        """
+        table = self.bk.table
+        stmt = self.bk._select_books()
+        if start is not None:
+            stmt = stmt.where(table.c.log_created_at >= start)
+        if end is not None:
+            stmt = stmt.where(table.c.log_created_at <= end)
+
+        if latest_only:
+            return stmt.distinct(table.c.slug).order_by(
+                table.c.slug, table.c.log_created_at.desc()
+            )
+        return stmt.order_by(table.c.slug, table.c.log_created_at)
+
+    def _iter_rows(
+        self, latest_only: bool, start: date | None, end: date | None
+    ) -> Iterator[tuple[list[str], Sequence[Row]]]:
+        """
+        Iterate over the logs in chunks of rows fetched from a server side cursor.
+
+        :param latest_only: whether to get only the latest log per book
+        :type latest_only: bool
+        :param start: the first day of the logs
+        :type start: date | None
+        :param end: the last day of the logs
+        :type end: date | None
+
+        :return: the column names and the rows of every chunk
+        :rtype: Iterator[tuple[list[str], Sequence[Row]]]
+        """
+        if not self.bk._user_table_exists():
+            return
+
+        stmt = self._select(latest_only, start, end)
+        with engine_factory.connect(read_only=True) as conn:
+            result = conn.execution_options(
+                stream_results=True, max_row_buffer=self.chunk_size
+            ).execute(stmt)
+            columns = list(result.keys())
+            for rows in result.partitions(self.chunk_size):
+                yield columns, rows
+
+    def _get_arrow_schema(self) -> pa.Schema:
+        """
+        Get the Parquet schema of the exported columns, from the user's table.
+
+        :return: the schema of the export
+        :rtype: pyarrow.Schema
+        """
+        fields = []
+        for col in self.bk._select_books().selected_columns:
+            if isinstance(col.type, Boolean):
+                arrow_type = pa.bool_()
+            elif isinstance(col.type, Integer):
+                arrow_type = pa.int64()
+            elif isinstance(col.type, Date):
+                arrow_type = pa.date32()
+            else:
+                arrow_type = pa.string()
+            fields.append(pa.field(col.name, arrow_type))
+
+        return pa.schema(fields)
+
+    def _write_csv(
+        self, f: IO[str], chunks: Iterator[tuple[list[str], Sequence[Row]]]
+    ) -> int:
+        """
+        Write the chunks as CSV, with a header row.
+
+        :param f: the file to write to
+        :type f: IO[str]
+        :param chunks: the column names and the rows of every chunk
+        :type chunks: Iterator[tuple[list[str], Sequence[Row]]]
+
+        :return: the number of logs written
+        :rtype: int
+        """
+        writer = csv.writer(f)
+        writer.writerow([col.name for col in self.bk._select_books().selected_columns])
+
+        n_rows = 0
+        for _, rows in chunks:
+            writer.writerows(rows)
+            n_rows += len(rows)
+
+        return n_rows
+
+    @staticmethod
+    def _write_jsonl(
+        f: IO[str], chunks: Iterator[tuple[list[str], Sequence[Row]]]
+    ) -> int:
+        """
+        Write the chunks as JSON Lines, one log per line.
+
+        :param f: the file to write to
+        :type f: IO[str]
+        :param chunks: the column names and the rows of every chunk
+        :type chunks: Iterator[tuple[list[str], Sequence[Row]]]
+
+        :return: the number of logs written
+        :rtype: int
+        """
+        n_rows = 0
+        for columns, rows in chunks:
+            f.writelines(
+                json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+            )
+            n_rows += len(rows)
+
+        return n_rows
+
+    def _write_parquet(
+        self, path: str | Path, chunks: Iterator[tuple[list[str], Sequence[Row]]]
+    ) -> int:
+        """
+        Write the chunks as row groups of a Parquet file.
+
+        :param path: the path of the file
+        :type path: str | Path
+        :param chunks: the column names and the rows of every chunk
+        :type chunks: Iterator[tuple[list[str], Sequence[Row]]]
+
+        :return: the number of logs written
+        :rtype: int
+        """
+        schema = self._get_arrow_schema()
+        n_rows = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for columns, rows in chunks:
+                arrays = {
+                    col: [row[i] for row in rows] for i, col in enumerate(columns)
+                }
+                writer.write_table(pa.table(arrays, schema=schema))
+                n_rows += len(rows)
+
+        return n_rows
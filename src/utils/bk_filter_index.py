@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Filter index focused module of the app.
+
+With classes and functions related to filtering the latest state of the books.
+"""
+
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+
+from .bk_frame_cache import FrameCache
+
+# the facets of the books and the columns their values are taken from
+FACET_COLUMNS = {
+    "author": ["author"],
+    "publisher": ["publisher"],
+    "language": ["language"],
+    "tag": ["tag1", "tag2", "tag3"],
+}
+
+filter_indexes = FrameCache()
+
+
+class BookFilterIndex:
+    """
+    Class to filter the latest state of the books without scanning it.
+
+    Every facet keeps the positions of the books per value, a filter ORs the
+    values selected within a facet and ANDs the facets as boolean masks
+    over the positions of the books in the dataframe.
+    The published years are kept sorted, ranges are found by binary search.
+    """
+
+    def __init__(self, latest_book_state_df: pd.DataFrame) -> None:
+        """
+        Class constructor.
+
+        Only positions are kept, the dataframe itself is not referenced.
+
+        :param latest_book_state_df: the latest state of the books
+        :type latest_book_state_df: pd.DataFrame
+        """
+        self.n_books = len(latest_book_state_df)
+        self.values: dict[str, np.ndarray] = {}
+        self._codes: dict[str, np.ndarray] = {}
+        self._postings: dict[str, dict[str, np.ndarray]] = {}
+
+        for facet, columns in FACET_COLUMNS.items():
+            self._index_facet(
+                facet,
+                [
+                    latest_book_state_df[col]
+                    for col in columns
+                    if col in latest_book_state_df
+                ],
+            )
+
+        if "deleted" in latest_book_state_df:
+            self._live = ~latest_book_state_df["deleted"].fillna(False).to_numpy(bool)
+        else:
+            self._live = np.ones(self.n_books, dtype=bool)
+
+        years = latest_book_state_df.get("published_year", pd.Series(dtype="Int32"))
+        years = pd.to_numeric(years).to_numpy(dtype=float, na_value=np.nan)
+        year_order = np.argsort(years, kind="stable")
+        # the missing years are sorted last and left out
+        self._year_order = year_order[: np.count_nonzero(~np.isnan(years))]
+        self._years_sorted = years[self._year_order]
+
+    def get_mask(
+        self,
+        authors: Iterable[str] | None = None,
+        publishers: Iterable[str] | None = None,
+        languages: Iterable[str] | None = None,
+        tags: Iterable[str] | None = None,
+        published_year_min: int | None = None,
+        published_year_max: int | None = None,
+        include_deleted: bool = False,
+    ) -> np.ndarray:
+        """
+        Get the mask of the books matching the filters.
+
+        :param authors: the authors to filter by, any of them matches
+        :type authors: Iterable[str], optional
+        :param publishers: the publishers to filter by, any of them matches
+        :type publishers: Iterable[str], optional
+        :param languages: the languages to filter by, any of them matches
+        :type languages: Iterable[str], optional
+        :param tags: the tags to filter by, any of them matches
+        :type tags: Iterable[str], optional
+        :param published_year_min: the min published year to filter by
+        :type published_year_min: int, optional
+        :param published_year_max: the max published year to filter by
+        :type published_year_max: int, optional
+        :param include_deleted: whether to keep the deleted books
+        :type include_deleted: bool, optional
+
+        :return: whether each book, by position, matches every filter
+        :rtype: np.ndarray
+        """
+        mask = np.ones(self.n_books, dtype=bool)
+        if not include_deleted:
+            mask &= self._live
+
+        for facet, selected in (
+            ("author", authors),
+            ("publisher", publishers),
+            ("language", languages),
+            ("tag", tags),
+        ):
+            if selected:
+                mask &= self._get_facet_mask(facet, selected)
+
+        if published_year_min or published_year_max:
+            mask &= self._get_year_mask(published_year_min, published_year_max)
+
+        return mask
+
+    def get_facet_counts(self, facet: str, mask: np.ndarray | None = None) -> pd.Series:
+        """
+        Count the books per value of the facet.
+
+        :param facet: the facet to count, one of FACET_COLUMNS
+        :type facet: str
+        :param mask: the books to count, defaults to the ones not deleted
+        :type mask: np.ndarray, optional
+
+        :return: the number of books per value, the most frequent first
+        :rtype: pd.Series
+        """
+        mask = self._live if mask is None else mask
+        values = self.values[facet]
+        if not len(values):
+            return pd.Series(dtype="int64", name=facet)
+
+        codes = self._codes[facet][:, mask]
+        rows = np.broadcast_to(np.arange(codes.shape[1]), codes.shape)
+
+        # a book counts once for a value, even if it is in several columns
+        found = codes >= 0
+        pairs = np.unique(rows[found] * len(values) + codes[found])
+        counts = np.bincount(pairs % len(values), minlength=len(values))
+
+        facet_counts = pd.Series(counts, index=values, name=facet)
+        return facet_counts[facet_counts > 0].sort_values(ascending=False)
+
+    def _index_facet(self, facet: str, columns: list[pd.Series]) -> None:
+        """
+        Index the values of the facet taken from the columns.
+
+        :param facet: the name of the facet
+        :type facet: str
+        :param columns: the columns holding the values of the facet
+        :type columns: list[pd.Series]
+        """
+        raw_values = (
+            pd.concat([col.astype(object) for col in columns])
+            if columns
+            else pd.Series(dtype=object)
+        )
+        raw_values = raw_values[raw_values.notna() & (raw_values != "")]
+        values = np.array(sorted(set(raw_values)), dtype=object)
+
+        codes = np.full((len(columns), self.n_books), -1, dtype=np.int64)
+        for i, col in enumerate(columns):
+            codes[i] = pd.Categorical(col.astype(object), values).codes
+        self.values[facet] = values
+        self._codes[facet] = codes
+
+        # the positions of the books per value, from the codes sorted once
+        flat_codes = codes.ravel()
+        order = np.argsort(flat_codes, kind="stable")
+        bounds = np.searchsorted(flat_codes[order], np.arange(len(values) + 1))
+        positions = order % max(self.n_books, 1)
+        self._postings[facet] = {
+            value: positions[bounds[i] : bounds[i + 1]]
+            for i, value in enumerate(values)
+        }
+
+    def _get_facet_mask(self, facet: str, selected: Iterable[str]) -> np.ndarray:
+        """
+        Get the mask of the books having any of the values of the facet.
+
+        :param facet: the name of the facet
+        :type facet: str
+        :param selected: the values selected
+        :type selected: Iterable[str]
+
+        :return: whether each book has any of the values
+        :rtype: np.ndarray
+        """
+        if isinstance(selected, str):
+            selected = [selected]
+
+        mask = np.zeros(self.n_books, dtype=bool)
+        postings = self._postings[facet]
+        for value in selected:
+            if value in postings:
+                mask[postings[value]] = True
+        return mask
+
+    def _get_year_mask(self, year_min: int | None, year_max: int | None) -> np.ndarray:
+        """
+        Get the mask of the books published between the years, both included.
+
+        :param year_min: the min published year, no bound if missing
+        :type year_min: int | None
+        :param year_max: the max published year, no bound if missing
+        :type year_max: int | None
+
+        :return: whether each book was published in the range
+        :rtype: np.ndarray
+        """
+        start = np.searchsorted(self._years_sorted, year_min) if year_min else 0
+        end = (
+            np.searchsorted(self._years_sorted, year_max, side="right")
+            if year_max
+            else len(self._years_sorted)
+        )
+        mask = np.zeros(self.n_books, dtype=bool)
+        mask[self._year_order[start:end]] = True
+        return mask
+
+
+def get_filter_index(latest_book_state_df: pd.DataFrame) -> BookFilterIndex:
+    """
+    Get the filter index of the latest state of the books.
+
+    One index is built per dataframe and kept as long as the dataframe lives,
+    so reruns filtering the same state reuse it.
+
+    :param latest_book_state_df: the latest state of the books
+    :type latest_book_state_df: pd.DataFrame
+
+    :return: the filter index of the books
+    :rtype: BookFilterIndex
+    """
+    filter_index = filter_indexes.get(latest_book_state_df)
+    if filter_index is None:
+        filter_index = BookFilterIndex(latest_book_state_df)
+        filter_indexes.put(filter_index, latest_book_state_df)
+    return filter_index
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Frame cache focused module of the app.
+
+With classes and functions related to keeping values computed from dataframes.
+"""
+
+import weakref
+from typing import Any
+
+import pandas as pd
+
+
+class FrameCache:
+    """
+    Class to keep values computed from dataframes as long as the dataframes live.
+
+    A value is keyed by the ids of the dataframes it was computed from.
+    One finalizer is registered per dataframe, the first time it is cached,
+    it drops every value computed from the dataframe once it is collected,
+    so an id is never reused while values are still kept under it.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.values: dict[tuple[int, ...], Any] = {}
+        # the keys of the values computed from each dataframe alive
+        self._keys_by_frame: dict[int, set[tuple[int, ...]]] = {}
+
+    def __len__(self) -> int:
+        """Get the number of values kept."""
+        return len(self.values)
+
+    def get(self, *frames: pd.DataFrame) -> Any | None:
+        """
+        Get the value computed from the dataframes, if still kept.
+
+        :param frames: the dataframes the value was computed from
+        :type frames: pd.DataFrame
+
+        :return: the value, None if not kept
+        :rtype: Any | None
+        """
+        return self.values.get(tuple(id(df) for df in frames))
+
+    def put(self, value: Any, *frames: pd.DataFrame) -> None:
+        """
+        Keep the value as long as the dataframes it was computed from live.
+
+        :param value: the value to keep
+        :type value: Any
+        :param frames: the dataframes the value was computed from
+        :type frames: pd.DataFrame
+        """
+        key = tuple(id(df) for df in frames)
+        self.values[key] = value
+        for df in frames:
+            if id(df) not in self._keys_by_frame:
+                self._keys_by_frame[id(df)] = set()
+                weakref.finalize(df, self._forget_frame, id(df))
+            self._keys_by_frame[id(df)].add(key)
+
+    def _forget_frame(self, frame_id: int) -> None:
+        """
+        Drop the values computed from a collected dataframe.
+
+        :param frame_id: the id the dataframe had
+        :type frame_id: int
+        """
+        for key in self._keys_by_frame.pop(frame_id, set()):
+            self.values.pop(key, None)
+            for other_id in key:
+                self._keys_by_frame.get(other_id, set()).discard(key)
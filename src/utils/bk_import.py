@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Import focused module of the app.
+
+With classes and functions related to loading reading lists from files.
+"""
+
+import csv
+import io
+import os
+from enum import Enum
+from pathlib import Path
+from typing import IO, Callable, Iterator, NamedTuple
+
+import pandas as pd
+import psycopg2
+from sqlalchemy import column, select, table
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from .bk_engine import engine_factory
+from .bk_io import BookKeeperIO, StorageLayout, get_book_log_columns
+from .bk_slug_index import fold_accents, get_slug_key
+
+IMPORT_CHUNK_SIZE = 10_000
+STAGING_TABLE_NAME = "import_book_logs"
+INTEGER_MAX = 2**31 - 1
+
+REQUIRED_COLUMNS = ["title", "author"]
+TEXT_COLUMNS = ["subtitle", "location", "publisher", "tag1", "tag2", "tag3", "language"]
+INTEGER_COLUMNS = ["published_year", "page_n", "page_current"]
+DATE_COLUMNS = ["log_created_at", "finish_date"]
+DUPLICATE_REASONS = ["already exists", "repeated in file"]
+TRUE_VALUES = {"true", "1", "yes"}
+
+
+class ImportFormat(Enum):
+    """Possible formats of an imported file."""
+
+    CSV = "csv"
+    JSONL = "jsonl"
+
+    @classmethod
+    def from_path(cls, path: str | Path) -> "ImportFormat":
+        """
+        Get the format matching the extension of the path.
+
+        :param path: the path of the file
+        :type path: str | Path
+
+        :return: the format of the file
+        :rtype: ImportFormat
+        """
+        return cls(Path(path).suffix.lstrip(".").lower())
+
+
+class ImportReport(NamedTuple):
+    """What an import has gone through so far."""
+
+    rows_read: int = 0
+    rows_imported: int = 0
+    rows_duplicate: int = 0
+    rows_invalid: int = 0
+
+
+class ImportIssue(NamedTuple):
+    """A row of the file that was not imported and why."""
+
+    row: int
+    slug: str | None
+    reason: str
+
+
+# called after every chunk with the totals and the share of the file read
+ImportProgress = Callable[[ImportReport, float], None]
+
+
+def create_slugs(books_df: pd.DataFrame, legacy: bool = False) -> pd.Series:
+    """
+    Create the slugs of the books, same as BookKeeperIO._create_slug row by row.
+
+    :param books_df: the books, with their author and title
+    :type books_df: pd.DataFrame
+    :param legacy: whether to drop the accented letters as the slugs
+        stored before the accents were folded, defaults to False
+    :type legacy: bool, optional
+
+    :return: the slugs of the books
+    :rtype: pd.Series
+    """
+
+    def to_slug_part(values: pd.Series) -> pd.Series:
+        return (
+            values.fillna("")
+            .astype(str)
+            .map(str if legacy else fold_accents)
+            .str.replace(r"[^a-zA-Z0-9\s-]", "", regex=True)
+            .str.replace(" ", "-", regex=False)
+            .str.lower()
+        )
+
+    return to_slug_part(books_df["author"]) + "-" + to_slug_part(books_df["title"])
+
+
+def validate_books(books_df: pd.DataFrame) -> pd.Series:
+    """
+    Check the books against the columns of the user's table.
+
+    The integer and date columns are expected to be converted already,
+    a value lost in the conversion is reported as invalid.
+
+    :param books_df: the books, converted by prepare_books
+    :type books_df: pd.DataFrame
+
+    :return: why each book is invalid, None for the valid ones
+    :rtype: pd.Series
+    """
+    reasons = pd.Series(None, index=books_df.index, dtype=object)
+
+    def flag(mask: pd.Series, reason: str) -> None:
+        reasons[mask & reasons.isna()] = reason
+
+    for col in REQUIRED_COLUMNS:
+        flag(books_df[col].fillna("").astype(str).str.strip() == "", f"missing {col}")
+    for col in INTEGER_COLUMNS + DATE_COLUMNS:
+        flag(books_df[col].isna() & books_df[f"_{col}_given"], f"invalid {col}")
+    for col in INTEGER_COLUMNS:
+        flag(books_df[col].fillna(0) < 0, f"negative {col}")
+        flag(books_df[col].fillna(0) > INTEGER_MAX, f"invalid {col}")
+    flag(
+        (books_df["page_current"] > books_df["page_n"]).fillna(False),
+        "page_current above page_n",
+    )
+
+    return reasons
+
+
+def prepare_books(books_df: pd.DataFrame, first_row: int) -> pd.DataFrame:
+    """
+    Convert the books read from the file to the columns of the user's table.
+
+    Missing text columns are left empty like the Add page does,
+    books without a log date are logged today.
+
+    :param books_df: the books as read from the file
+    :type books_df: pd.DataFrame
+    :param first_row: the number of the first book in the file, from 1
+    :type first_row: int
+
+    :return: the converted books, with their row number and slug
+    :rtype: pd.DataFrame
+    """
+    df = pd.DataFrame(index=books_df.index)
+    df["_row"] = range(first_row, first_row + len(books_df))
+
+    for col in REQUIRED_COLUMNS + TEXT_COLUMNS:
+        values = books_df[col] if col in books_df.columns else None
+        df[col] = pd.Series(values, index=df.index, dtype=object).fillna("")
+        df[col] = df[col].astype(str)
+
+    for col in INTEGER_COLUMNS + DATE_COLUMNS:
+        values = books_df[col] if col in books_df.columns else None
+        values = pd.Series(values, index=df.index, dtype=object)
+        df[f"_{col}_given"] = values.notna() & (values.astype(str).str.strip() != "")
+        if col in INTEGER_COLUMNS:
+            numbers = pd.to_numeric(values, errors="coerce")
+            numbers[numbers % 1 != 0] = None
+            df[col] = numbers.astype("Int64")
+        else:
+            df[col] = pd.to_datetime(
+                values, errors="coerce", format="ISO8601"
+            ).dt.normalize()
+
+    today = pd.Timestamp.today().normalize()
+    df["log_created_at"] = df["log_created_at"].fillna(today)
+    df["started"] = df["page_current"].fillna(0) > 0
+    df["deleted"] = (
+        books_df["deleted"].astype(str).str.strip().str.lower().isin(TRUE_VALUES)
+        if "deleted" in books_df.columns
+        else False
+    )
+    df["slug"] = create_slugs(df)
+
+    return df
+
+
+class BookLogsImporter:
+    """
+    Class to import a reading list file into the logs of a user.
+
+    The file is read and written in chunks, so memory only depends
+    on the chunk size and the number of books, not on the size of the file.
+    Books already in the user's logs, by exact or normalized slug, are skipped.
+    """
+
+    def __init__(self, bk: BookKeeperIO, chunk_size: int = IMPORT_CHUNK_SIZE):
+        """
+        Class constructor.
+
+        :param bk: the IO of the user to import the books for
+        :type bk: BookKeeperIO
+        :param chunk_size: the number of rows read and written at once
+        :type chunk_size: int, optional
+        """
+        self.bk = bk
+        self.chunk_size = chunk_size
+        self.issues: list[ImportIssue] = []
+
+        self._existing_keys: set[str] | None = None
+        self._seen_logs: set[tuple[str, pd.Timestamp]] = set()
+
+    def run(
+        self,
+        path: str | Path,
+        import_format: ImportFormat | None = None,
+        progress: ImportProgress | None = None,
+    ) -> ImportReport:
+        """
+        Import the books of the file.
+
+        :param path: the path of the file
+        :type path: str | Path
+        :param import_format: the format of the file, defaults to its extension
+        :type import_format: ImportFormat, optional
+        :param progress: called after every chunk, defaults to None
+        :type progress: ImportProgress, optional
+
+        :return: the totals of the import
+        :rtype: ImportReport
+        """
+        import_format = import_format or ImportFormat.from_path(path)
+        size = os.path.getsize(path) or 1
+
+        report = ImportReport()
+        # binary, the position of a text file cannot be told while lines are read
+        with open(path, "rb") as f:
+            for chunk_df in self._read_chunks(f, import_format):
+                chunk_report = self.import_chunk(chunk_df, report.rows_read + 1)
+                report = ImportReport(*(a + b for a, b in zip(report, chunk_report)))
+                if progress is not None:
+                    progress(report, min(f.tell() / size, 1.0))
+
+        return report
+
+    def import_chunk(self, books_df: pd.DataFrame, first_row: int) -> ImportReport:
+        """
+        Validate, deduplicate and write a chunk of books.
+
+        :param books_df: the books as read from the file
+        :type books_df: pd.DataFrame
+        :param first_row: the number of the first book in the file, from 1
+        :type first_row: int
+
+        :return: what happened to the books of the chunk
+        :rtype: ImportReport
+        """
+        df = prepare_books(books_df, first_row)
+
+        reasons = validate_books(df)
+        existing_keys = self._get_existing_keys()
+        # books logged before the accents were folded keep their old slug
+        legacy_slugs = create_slugs(df, legacy=True)
+        exists = df["slug"].map(get_slug_key).isin(existing_keys)
+        exists |= legacy_slugs.map(get_slug_key).isin(existing_keys)
+        reasons[reasons.isna() & exists] = "already exists"
+        log_keys = pd.Series(
+            list(zip(df["slug"], df["log_created_at"])), index=df.index
+        )
+        repeated = log_keys.duplicated() | log_keys.isin(self._seen_logs)
+        reasons[reasons.isna() & repeated] = "repeated in file"
+
+        valid = reasons.isna()
+        valid_df = df[valid]
+        if not valid_df.empty and not self._copy_books(valid_df):
+            reasons[valid] = "could not be written"
+            valid = reasons.isna()
+            valid_df = df[valid]
+
+        self._seen_logs.update(log_keys[valid])
+        # an index not loaded yet is filled from the database on the next load
+        if self.bk.slug_index:
+            self.bk.slug_index.update(valid_df["slug"].unique().tolist())
+        self.issues.extend(
+            ImportIssue(int(row), slug, reason)
+            for row, slug, reason in zip(df["_row"], df["slug"], reasons)
+            if pd.notna(reason)
+        )
+
+        duplicate = reasons.isin(DUPLICATE_REASONS)
+        return ImportReport(
+            rows_read=len(df),
+            rows_imported=len(valid_df),
+            rows_duplicate=int(duplicate.sum()),
+            rows_invalid=int((reasons.notna() & ~duplicate).sum()),
+        )
+
+    def write_issues(self, path: str | Path) -> None:
+        """
+        Write the rows not imported and why to a CSV file.
+
+        :param path: the path of the report
+        :type path: str | Path
+        """
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(ImportIssue._fields)
+            writer.writerows(self.issues)
+
+    def _copy_books(self, books_df: pd.DataFrame) -> bool:
+        """
+        Load the books into the user's table through COPY.
+
+        The books are copied into a temporary staging table, then upserted
+        from it with the same conflict handling as save_books.
+
+        :param books_df: the valid books, converted by prepare_books
+        :type books_df: pd.DataFrame
+
+        :return: whether the books were written or not
+        :rtype: bool
+        """
+        columns = [col.name for col in get_book_log_columns()]
+        copy_df = books_df[columns]
+        if self.bk.layout == StorageLayout.PARTITIONED:
+            columns = ["user_id", *columns]
+            copy_df = copy_df.assign(user_id=self.bk.user_id)[columns]
+
+        # strings are quoted so that only the forced columns read "" as null
+        buffer = io.StringIO()
+        copy_df.to_csv(
+            buffer,
+            index=False,
+            header=False,
+            quoting=csv.QUOTE_NONNUMERIC,
+            date_format="%Y-%m-%d",
+        )
+        buffer.seek(0)
+
+        staging = table(STAGING_TABLE_NAME, *(column(col) for col in columns))
+        upsert_stmt = self.bk._on_conflict_update_daily_log(
+            insert(self.bk.table).from_select(columns, select(staging))
+        )
+        forced_null = ", ".join(INTEGER_COLUMNS + DATE_COLUMNS)
+
+        if not self.bk._user_table_exists():
+            self.bk._create_user_table()
+        try:
+            with engine_factory.connect() as conn:
+                target = conn.dialect.identifier_preparer.format_table(self.bk.table)
+                conn.exec_driver_sql(
+                    f"CREATE TEMP TABLE {STAGING_TABLE_NAME} ON COMMIT DROP AS "
+                    f"SELECT {', '.join(columns)} FROM {target} WITH NO DATA"
+                )
+                with conn.connection.driver_connection.cursor() as cursor:
+                    cursor.copy_expert(
+                        f"COPY {STAGING_TABLE_NAME} ({', '.join(columns)}) FROM STDIN "
+                        f"WITH (FORMAT csv, FORCE_NULL ({forced_null}))",
+                        buffer,
+                    )
+                previous_df = self.bk._read_logs_for_stats(conn, set(books_df["slug"]))
+                conn.execute(upsert_stmt)
+                self.bk._update_reading_stats(conn, previous_df, books_df)
+                conn.commit()
+        except (SQLAlchemyError, psycopg2.Error):
+            self.bk._forget_user_table()
+            return False
+
+        self.bk._history_stale = True
+        self.bk._reading_stats_df = None
+        return True
+
+    def _get_existing_keys(self) -> set[str]:
+        """
+        Get the normalized slugs of the books in the user's logs, queried once.
+
+        :return: the keys of the existing books
+        :rtype: set[str]
+        """
+        if self._existing_keys is None:
+            slugs = (
+                self.bk._get_latest_books()["slug"].tolist()
+                if self.bk._user_table_exists()
+                else []
+            )
+            self._existing_keys = {get_slug_key(slug) for slug in slugs}
+
+        return self._existing_keys
+
+    def _read_chunks(
+        self, f: IO[bytes], import_format: ImportFormat
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Read the file in chunks, CSV values as strings.
+
+        :param f: the open file
+        :type f: IO[bytes]
+        :param import_format: the format of the file
+        :type import_format: ImportFormat
+
+        :return: the chunks of the file
+        :rtype: Iterator[pd.DataFrame]
+        """
+        if import_format == ImportFormat.CSV:
+            return pd.read_csv(
+                f, dtype=str, keep_default_na=False, chunksize=self.chunk_size
+            )
+        return pd.read_json(f, lines=True, dtype=False, chunksize=self.chunk_size)
@@ -7,160 +7,681 @@ With classes and functions related to CRUD operations on the data.
 """
 
 import re
+from datetime import date
+from enum import Enum
 from os import environ
+from threading import Lock
 from typing import Any, Tuple
 
 import pandas as pd
-from psycopg2 import ProgrammingError
 from sqlalchemy import (
+    DDL,
+    BigInteger,
     Boolean,
     Column,
     Date,
+    Index,
     Integer,
     MetaData,
     String,
     Table,
     UniqueConstraint,
-    create_engine,
+    case,
+    delete,
+    event,
+    func,
     inspect,
+    select,
+    true,
 )
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.sql import ColumnElement, Select
 from sqlalchemy.sql.dml import Insert
 
+from .bk_data_ops import BookKeeperDataOps
+from .bk_engine import engine_factory, get_engine
+from .bk_schema import (
+    DATE_COLUMNS,
+    DATE_DTYPE,
+    apply_book_logs_schema,
+    get_memory_report,
+)
+from .bk_search import SEARCH_RESULTS_LIMIT, BookSearchIndex, get_search_results
+from .bk_slug_index import SlugIndex, fold_accents
+from .bk_snapshot import DataVersion, get_snapshot_cache
+from .bk_timeline import DAILY_STATS_COLUMNS
+from .bk_today_batch import TodayBatch
+from .bk_write_behind import get_write_behind_queue
 from .example_data import EXAMPLE_DATA
 
-# init the sql engine
-host = environ.get("PG_HOST")
-user = environ.get("PG_USER")
-password = environ.get("PG_PASSWORD")
+# the engine itself is built lazily by bk_engine
 schema = environ.get("PG_SCHEMA")
+storage_layout = environ.get("PG_STORAGE_LAYOUT", "per_user")
+
+# max number of rows sent in one multi-row upsert statement
+# postgres caps bind parameters at 65535 per statement, with 17 columns
+# a batch of 1000 rows stays well below that
+UPSERT_BATCH_SIZE = 1000
+
+# user tables are defined statically instead of reflected from the database
+# every session of the process shares the same metadata
+metadata = MetaData()
+metadata_lock = Lock()
+
+# the users' tables known to exist, keyed by schema, user and layout
+# only tables found are kept, one created by another process is found later
+# a failing query drops the table
+user_tables_existing: set[tuple[str | None, str, str]] = set()
+# the schemas the daily reading statistics table is known to exist in
+reading_stats_tables_created: set[str | None] = set()
+
+# name of the table holding every user's logs in the partitioned layout
+PARTITIONED_TABLE_NAME = "book_logs"
+# name of the table holding every user's daily reading statistics
+READING_STATS_TABLE_NAME = "daily_reading_stats"
+# the columns of the logs the reading statistics are computed from
+READING_STATS_LOG_COLUMNS = ["slug", "log_created_at", "page_current", "finish_date"]
+PARTITION_COUNT = int(environ.get("PG_BOOK_LOGS_PARTITIONS", 16))
+
+
+class StorageLayout(Enum):
+    """Possible layouts of the book logs in the database."""
+
+    PER_USER = "per_user"
+    PARTITIONED = "partitioned"
+
+
+def get_book_log_columns() -> list[Column]:
+    """
+    Get the columns of a book logs table, without the id.
+
+    New column objects are returned on each call as a column
+    can only belong to one table.
+
+    :return: the columns of the book logs
+    :rtype: list[sqlalchemy.Column]
+    """
+    return [
+        Column("title", String),
+        Column("subtitle", String),
+        Column("author", String),
+        Column("location", String),
+        Column("publisher", String),
+        Column("published_year", Integer),
+        Column("page_n", Integer),
+        Column("page_current", Integer),
+        Column("finish_date", Date),
+        Column("tag1", String),
+        Column("tag2", String),
+        Column("tag3", String),
+        Column("language", String),
+        Column("slug", String),
+        Column("started", Boolean),
+        Column("deleted", Boolean),
+        Column("log_created_at", Date),
+    ]
+
+
+def get_book_logs_table(table_name: str, schema: str | None) -> Table:
+    """
+    Get the definition of a user's book logs table.
+
+    The table is defined on first use and cached in the shared metadata,
+    the database is not queried.
+
+    :param table_name: the name of the table
+    :type table_name: str
+    :param schema: the schema of the table
+    :type schema: str | None
+
+    :return: the table definition
+    :rtype: sqlalchemy.Table
+    """
+    key = f"{schema}.{table_name}" if schema else table_name
+
+    with metadata_lock:
+        if key in metadata.tables:
+            return metadata.tables[key]
+
+        return Table(
+            table_name,
+            metadata,
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            *get_book_log_columns(),
+            Index(f"ix_{table_name}_slug", "slug"),
+            Index(f"ix_{table_name}_log_created_at", "log_created_at"),
+            # constraint names are unique per schema in postgres
+            UniqueConstraint(
+                "slug", "log_created_at", name=f"{table_name}_unique_slug_date"
+            ),
+            schema=schema,
+        )
+
+
+def get_partitioned_book_logs_table(schema: str | None) -> Table:
+    """
+    Get the definition of the book logs table shared by every user.
+
+    The table is hash-partitioned by user_id into PARTITION_COUNT partitions,
+    which are created together with the table.
+
+    :param schema: the schema of the table
+    :type schema: str | None
+
+    :return: the table definition
+    :rtype: sqlalchemy.Table
+    """
+    key = f"{schema}.{PARTITIONED_TABLE_NAME}" if schema else PARTITIONED_TABLE_NAME
+
+    with metadata_lock:
+        if key in metadata.tables:
+            return metadata.tables[key]
+
+        table = Table(
+            PARTITIONED_TABLE_NAME,
+            metadata,
+            # the partition key has to be part of every unique constraint
+            Column("user_id", String, primary_key=True),
+            Column("id", Integer, primary_key=True, autoincrement=True),
+            *get_book_log_columns(),
+            Index(f"ix_{PARTITIONED_TABLE_NAME}_user_slug", "user_id", "slug"),
+            Index(
+                f"ix_{PARTITIONED_TABLE_NAME}_user_log_created_at",
+                "user_id",
+                "log_created_at",
+            ),
+            UniqueConstraint(
+                "user_id",
+                "slug",
+                "log_created_at",
+                name=f"{PARTITIONED_TABLE_NAME}_unique_user_slug_date",
+            ),
+            schema=schema,
+            postgresql_partition_by="HASH (user_id)",
+        )
+
+        parent = f"{schema}.{PARTITIONED_TABLE_NAME}" if schema else table.name
+        for remainder in range(PARTITION_COUNT):
+            event.listen(
+                table,
+                "after_create",
+                DDL(
+                    f"CREATE TABLE IF NOT EXISTS {parent}_p{remainder} "
+                    f"PARTITION OF {parent} "
+                    f"FOR VALUES WITH (MODULUS {PARTITION_COUNT}, "
+                    f"REMAINDER {remainder})"
+                ),
+            )
 
-engine = create_engine(f"postgresql://{user}:{password}@{host}:5432/admin_db")
+        return table
+
+
+def get_reading_stats_table(schema: str | None) -> Table:
+    """
+    Get the definition of the daily reading statistics table shared by every user.
+
+    :param schema: the schema of the table
+    :type schema: str | None
+
+    :return: the table definition
+    :rtype: sqlalchemy.Table
+    """
+    key = f"{schema}.{READING_STATS_TABLE_NAME}" if schema else READING_STATS_TABLE_NAME
+
+    with metadata_lock:
+        if key in metadata.tables:
+            return metadata.tables[key]
+
+        return Table(
+            READING_STATS_TABLE_NAME,
+            metadata,
+            Column("user_id", String, primary_key=True),
+            Column("layout", String, primary_key=True),
+            Column("stat_date", Date, primary_key=True),
+            Column("total_pages", BigInteger, nullable=False, default=0),
+            Column("pages_delta", Integer, nullable=False, default=0),
+            Column("books_finished", Integer, nullable=False, default=0),
+            Column("active_books", Integer, nullable=False, default=0),
+            schema=schema,
+        )
+
+
+def write_pending_books(user_id: str, layout: str, df: pd.DataFrame) -> bool:
+    """
+    Write the logs flushed by the write-behind queue to the user's table.
+
+    :param user_id: the id of the user
+    :type user_id: str
+    :param layout: the layout of the user's logs
+    :type layout: str
+    :param df: the logs to write
+    :type df: pd.DataFrame
+
+    :return: whether the logs were written or not
+    :rtype: bool
+    """
+    return BookKeeperIO(user_id, layout=StorageLayout(layout))._write_books(df)
 
 
 class BookKeeperIO:
     """Class to handle the IO operations of the BookKeeper app."""
 
-    def __init__(self, user_id: str):
+    def __init__(self, user_id: str, layout: StorageLayout | None = None):
         """
         Class constructor.
 
         :param user_id: the id of the user
         :type user_id: str
-        :param bucket: the name of the bucket
-        :type bucket: str
+        :param layout: the layout of the book logs, defaults to PG_STORAGE_LAYOUT
+        :type layout: StorageLayout, optional
         """
         self.user_id = user_id
 
-        self.sql_engine = engine
+        self.sql_engine = get_engine()
         self.schema = schema
-        self.metadata = MetaData()
-        self.metadata.reflect(bind=self.sql_engine, schema=self.schema)
+        self.metadata = metadata
+        self.layout = layout or StorageLayout(storage_layout)
+
+        if self.layout == StorageLayout.PARTITIONED:
+            self.table = get_partitioned_book_logs_table(self.schema)
+            self.conflict_columns = ["user_id", "slug", "log_created_at"]
+        else:
+            self.table = get_book_logs_table(f"{self.user_id}_book_logs", self.schema)
+            self.conflict_columns = ["slug", "log_created_at"]
+
+        self.reading_stats_table = get_reading_stats_table(self.schema)
+        self.slug_index = SlugIndex()
+        self.today_batch = TodayBatch()
+        # built on the first search from the latest state searched
+        self.search_index = BookSearchIndex()
+        self._search_source_df: pd.DataFrame | None = None
+        # logs sent to the database and unchanged logs not sent again
+        self.upserts_written = 0
+        self.upserts_avoided = 0
+        self.snapshot_cache = get_snapshot_cache()
+        self.write_behind = get_write_behind_queue(write_pending_books)
+
+        # tables loaded so far, refreshed incrementally from the watermark
+        self._books_df: pd.DataFrame | None = None
+        self._today_batch_df: pd.DataFrame | None = None
+        self._latest_state_df: pd.DataFrame | None = None
+        self._today: pd.Timestamp | None = None
+        self._watermark_id: int | None = None
+        self._watermark_date: date | None = None
+        self._history_stale = False
+        self._reading_stats_df: pd.DataFrame | None = None
+
+    @property
+    def existing_book_slugs(self) -> set[str]:
+        """
+        Get the slugs of the books loaded so far.
 
-        self.existing_book_slugs: set[str] = set()
+        :return: the slugs of the books
+        :rtype: set[str]
+        """
+        return self.slug_index.slugs
 
     # public methods
-    def get_updated_tables(self) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    def get_latest_tables(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Update today's batch and the latest state of the books.
+
+        Both are queried directly from the database, the history of the books
+        is not transferred. If the history has already been loaded it is
+        refreshed instead and the tables are derived from it.
+
+        Today's books not saved yet are kept in the batch returned.
+
+        :return: today's batch and the latest state of the books
+        :rtype: Tuple[pd.DataFrame, pd.DataFrame]
+        """
+        if self._books_df is not None:
+            _, today_batch_df, latest_state_df = self.get_updated_tables()
+        elif not self._user_table_exists():
+            today = pd.Timestamp.today().normalize()  # noqa: F841
+            _, today_batch_df, latest_state_df = self._overlay_pending_books(
+                EXAMPLE_DATA, EXAMPLE_DATA.query("log_created_at==@today"), EXAMPLE_DATA
+            )
+        else:
+            latest_state_df = self._get_latest_books()
+            self.slug_index.reset(latest_state_df["slug"].unique().tolist())
+
+            _, today_batch_df, latest_state_df = self._overlay_pending_books(
+                None, self._get_today_books(), latest_state_df
+            )
+
+        return self._load_today_batch(today_batch_df), latest_state_df
+
+    def get_books_history(self) -> pd.DataFrame:
+        """
+        Get every log of the user's books.
+
+        Loaded lazily on the first call and refreshed only after a save.
+
+        :return: the user's book list
+        :rtype: pd.DataFrame
+        """
+        if self._books_df is None or self._history_stale:
+            self.get_updated_tables()
+
+        books_df, _, _ = self._overlay_pending_books(self._books_df, None, None)
+        return books_df
+
+    def get_updated_tables(
+        self, full_refresh: bool = False
+    ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
         """
         Update the user's book list, today's batch and the latest state of the books.
 
+        The first call loads every log of the user, from the local snapshot
+        when there is a valid one, from the database otherwise.
+        Later calls only fetch the logs above the watermark, the highest id
+        and log date already loaded, and merge them into the loaded tables.
+
+        :param full_refresh: whether to reload every log, defaults to False
+        :type full_refresh: bool, optional
+
         :return: the user's book list, today's batch and the latest state of the books
         :rtype: Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
         """
-        books_df = self._get_all_books()
+        today = pd.Timestamp.today().normalize()
 
-        if not books_df.empty:
-            today = pd.Timestamp.today().normalize().date()  # noqa: F841
-            today_batch_df = books_df.query("log_created_at==@today")
-            latest_state_df = self._get_latest_book_version(
+        if not full_refresh and self._books_df is None:
+            self._load_snapshot(today)
+
+        if full_refresh or self._books_df is None or self._watermark_id is None:
+            books_df = self._get_all_books()
+            self._books_df = books_df
+            self._today_batch_df = books_df.query("log_created_at==@today")
+            self._latest_state_df = self._get_latest_book_version(
                 books_df, date_col="log_created_at"
             )
+            changed = True
+        else:
+            new_books_df = self._get_changed_books(self._get_books_since_watermark())
+            changed = not new_books_df.empty
+            if changed or today != self._today:
+                self._merge_new_books(new_books_df, today)
+
+        self._today = today
+        self._set_watermark(self._books_df)
+        self._history_stale = False
+        if changed:
+            self._save_snapshot()
+
+        return self._overlay_pending_books(
+            self._books_df, self._today_batch_df.copy(), self._latest_state_df
+        )
 
-        return books_df, today_batch_df, latest_state_df
-
-    def save_books(self, df: pd.DataFrame) -> bool:
+    def save_books(self, df: pd.DataFrame | None = None, bulk: bool = True) -> bool:
         """
         Save the dataframe to the user's table.
 
         Works with daily logs.
         Drops all previous logs from that date.
         Writes the table.
-
-        :param df: the dataframe to save
-        :type df: pd.DataFrame
+        Without a dataframe, only the logs of today's batch whose hash
+        changed since the last save are written, the database is not reached
+        when none did. The logs skipped are counted in upserts_avoided.
+        In bulk mode the whole dataframe is sent as multi-row upserts
+        of at most UPSERT_BATCH_SIZE rows, otherwise row by row.
+        Either way the return value is the same.
+        With a write-behind queue the logs are only appended to its journal,
+        the tables returned until they are written already include them.
+
+        :param df: the dataframe to save, defaults to today's unsaved logs
+        :type df: pd.DataFrame, optional
+        :param bulk: whether to use multi-row upserts, defaults to True
+        :type bulk: bool, optional
 
         :return: whether the dataframe was saved or not
         :rtype: bool
         """
-        if not self._user_table_exists():
-            self._create_user_table()
+        saved_slugs: set[str] = set()
+        if df is None:
+            df, saved_slugs = self._get_unsaved_books()
+            if df.empty:
+                return True
+
+        if self.write_behind is not None:
+            self.write_behind.enqueue(
+                self.user_id, self.layout.value, self._get_book_records(df)
+            )
+            self._history_stale = True
+            saved = True
+        else:
+            saved = self._write_books(df, bulk=bulk)
 
-        try:
-            with self.sql_engine.connect() as conn:
-                for _, row in df.iterrows():
-                    stmt = self._get_upsert_daily_book_log_stmt(dict(row))
-                    conn.execute(stmt)
+        if saved:
+            self._mark_saved(df, saved_slugs)
+        return saved
+
+    def get_save_metrics(self) -> dict[str, int]:
+        """
+        Get how many logs were saved and how many unchanged ones were skipped.
+
+        :return: the counters by name
+        :rtype: dict[str, int]
+        """
+        return {
+            "upserts_written": self.upserts_written,
+            "upserts_avoided": self.upserts_avoided,
+        }
+
+    def get_reading_stats(self) -> pd.DataFrame:
+        """
+        Get the reading statistics of every day.
 
+        The statistics are read from the daily_reading_stats table, kept up
+        to date by every save. They are only computed from the logs when
+        none are stored for the user yet.
+        The statistics read are kept until the next save, while logs are
+        waiting in the write-behind queue they are read again on every call.
+
+        :return: the total pages, the pages read, the books finished and
+            the books read of every day
+        :rtype: pd.DataFrame
+        """
+        if self._reading_stats_df is not None:
+            return self._reading_stats_df
+
+        pending_df = self._get_pending_books()
+        if not self._user_table_exists():
+            # the example data is replaced as a whole by the pending logs
+            books_df = EXAMPLE_DATA if pending_df.empty else pending_df
+            stats_df = BookKeeperDataOps().get_timeline(books_df).daily_stats()
+        else:
+            with engine_factory.connect() as conn:
+                stats_df = self._load_reading_stats(conn, pending_df)
                 conn.commit()
-            return True
-        except ProgrammingError:
-            return False
 
-    def add_book(
-        self, book: dict[str, Any], finished: bool, df: pd.DataFrame
-    ) -> Tuple[bool, pd.DataFrame]:
+        # the stored statistics change once the queue is flushed
+        if pending_df.empty:
+            self._reading_stats_df = stats_df
+        return stats_df
+
+    def _get_unsaved_books(self) -> Tuple[pd.DataFrame, set[str]]:
+        """
+        Get the logs of today's batch changed since the last save.
+
+        The logs left out are counted as avoided upserts.
+
+        :return: the changed logs and their slugs
+        :rtype: Tuple[pd.DataFrame, set[str]]
+        """
+        slugs = set(self.today_batch.dirty)
+        self.upserts_avoided += len(self.today_batch) - len(slugs)
+        if not slugs:
+            return pd.DataFrame(), slugs
+
+        return self.today_batch.get_dirty_df(), slugs
+
+    def _mark_saved(self, df: pd.DataFrame, slugs: set[str]) -> None:
+        """
+        Count the saved logs and flag the ones of today's batch as saved.
+
+        The reading statistics loaded are dropped, the save changed them.
+
+        :param df: the saved logs
+        :type df: pd.DataFrame
+        :param slugs: the slugs of today's batch saved, empty for other logs
+        :type slugs: set[str]
+        """
+        self.upserts_written += len(df)
+        self.today_batch.mark_clean(slugs)
+        self._reading_stats_df = None
+
+    def _write_books(self, df: pd.DataFrame, bulk: bool = True) -> bool:
+        """
+        Write the dataframe to the user's table.
+
+        :param df: the dataframe to write
+        :type df: pd.DataFrame
+        :param bulk: whether to use multi-row upserts, defaults to True
+        :type bulk: bool, optional
+
+        :return: whether the dataframe was written or not
+        :rtype: bool
+        """
+        # a second attempt is made in case the cached table has been dropped
+        for _ in range(2):
+            if not self._user_table_exists():
+                self._create_user_table()
+
+            try:
+                with engine_factory.connect() as conn:
+                    previous_df = self._read_logs_for_stats(
+                        conn, set(df.get("slug", ()))
+                    )
+                    if bulk:
+                        books = self._get_book_records(df)
+                        if books:
+                            conn.execute(self._get_upsert_daily_book_logs_stmt(), books)
+                    else:
+                        for _, row in df.iterrows():
+                            stmt = self._get_upsert_daily_book_log_stmt(dict(row))
+                            conn.execute(stmt)
+
+                    self._update_reading_stats(conn, previous_df, df)
+                    conn.commit()
+                if not df.empty:
+                    user_tables_existing.add(self._user_table_key())
+                self._history_stale = True
+                return True
+            except ProgrammingError:
+                self._forget_user_table()
+
+        return False
+
+    def get_memory_report(self) -> pd.DataFrame | None:
+        """
+        Get the memory saved by the canonical dtypes on the loaded history.
+
+        :return: the bytes used and saved per column, None if nothing is loaded
+        :rtype: pd.DataFrame | None
+        """
+        if self._books_df is None:
+            return None
+
+        return get_memory_report(self._books_df)
+
+    def get_today_batch(self) -> pd.DataFrame:
+        """
+        Get today's logs, including the ones not saved yet.
+
+        :return: today's batch
+        :rtype: pd.DataFrame
         """
-        Add a new book to the user's book list.
+        return self.today_batch.to_df()
+
+    def add_book(self, book: dict[str, Any], finished: bool) -> bool:
+        """
+        Add a new book to today's batch.
 
         :param book: the book to add
         :type book: dict[str, Any]
         :param finished: whether the book is finished or not
         :type finished: bool
-        :param df: the dataframe to add the book to
-        :type df: pd.DataFrame
 
-        :return: whether the book was added or not, the dataframe with the book added
-        :rtype: Tuple[bool, pd.DataFrame]
+        :return: whether the book was added or not
+        :rtype: bool
         """
         book["slug"] = self._create_slug(book)
+        # books logged before the accents were folded keep their old slug
+        slugs = {book["slug"], self._create_slug(book, legacy=True)}
+        if any(self.slug_index.get_duplicates(slug) for slug in slugs):
+            return False
 
-        todays_books_slugs = (
-            set(df["slug"].unique().tolist()) if not df.empty else set()
-        )
-        if book["slug"] in todays_books_slugs.union(self.existing_book_slugs):
-            return False, df
+        self.slug_index.add(book["slug"])
+        self.today_batch.put(self._get_today_log(book=book, finished=finished))
+        self._index_today_log(book["slug"])
+        return True
 
-        return True, self._append_book_to_df(book=book, finished=finished, df=df)
+    def get_similar_slugs(self, book: dict[str, Any]) -> list[str]:
+        """
+        Get the books already logged that look like the given one.
 
-    def update_book(
-        self, book: dict[str, Any], finished: bool, df: pd.DataFrame
-    ) -> pd.DataFrame:
+        Exact and normalized duplicates are refused by add_book,
+        these are the near misses worth a warning, such as typos.
+
+        :param book: the book to look up, with its author and title
+        :type book: dict[str, Any]
+
+        :return: the slugs of the similar books, the most similar first
+        :rtype: list[str]
+        """
+        return self.slug_index.get_similar(self._create_slug(book))
+
+    def update_book(self, book: dict[str, Any], finished: bool) -> bool:
         """
-        Update an existing book.
+        Update an existing book in today's batch.
 
         :param book: the book to update
         :type book: dict[str, Any]
         :param finished: whether the book is finished or not
         :type finished: bool
-        :param df: the dataframe to update the book in
-        :type df: pd.DataFrame
 
-        :return: the dataframe with the book updated
-        :rtype: pd.DataFrame
+        :return: whether the book was updated or not
+        :rtype: bool
         """
-        ## some logic needed to handle the update
-        todays_books_slugs = (
-            set(df["slug"].unique().tolist()) if not df.empty else set()
-        )
+        self.slug_index.add(book["slug"])
+        self.today_batch.put(self._get_today_log(book=book, finished=finished))
+        self._index_today_log(book["slug"])
+        return True
+
+    def search_books(
+        self, latest_df: pd.DataFrame, query: str, limit: int = SEARCH_RESULTS_LIMIT
+    ) -> pd.DataFrame:
+        """
+        Search the books by the words of their title, author, tags and location.
+
+        The index is built from the latest state on the first search and
+        rebuilt only when another latest state is searched, today's changes
+        are added to it as they are made.
 
-        if book["slug"] in todays_books_slugs.union(self.existing_book_slugs):
-            df = df.drop(df[df["slug"] == book["slug"]].index)
+        :param latest_df: the latest dataframe of the user's books
+        :type latest_df: pd.DataFrame
+        :param query: the words to search for, the last one can be partial
+        :type query: str
+        :param limit: the maximum number of books returned
+        :type limit: int, optional
 
-        return True, self._append_book_to_df(book=book, finished=finished, df=df)
+        :return: the books found with their score, the best first
+        :rtype: pd.DataFrame
+        """
+        if self._search_source_df is not latest_df:
+            self.search_index.reset(latest_df.to_dict("records"))
+            for log in self.today_batch:
+                self.search_index.put(log)
+            self._search_source_df = latest_df
+
+        return get_search_results(
+            self.search_index, self.search_index.search(query, limit)
+        )
 
-    def revert_deletion_book(
-        self, slug: str, today_df: pd.DataFrame
-    ) -> Tuple[bool, pd.DataFrame]:
+    def revert_deletion_book(self, slug: str) -> bool:
         """
         Revert the deletion of a book.
 
@@ -168,84 +689,51 @@ class BookKeeperIO:
 
         :param slug: the slug of the book to revert
         :type slug: str
-        :param today_df: the dataframe to revert the book in
-        :type today_df: pd.DataFrame
 
-        :return: whether the book was reverted or not, the dataframe with the book reverted
-        :rtype: Tuple[bool, pd.DataFrame]
+        :return: whether the book was reverted or not
+        :rtype: bool
         """
-        if slug in set(today_df["slug"].unique().tolist()):
-            today_df.loc[today_df["slug"] == slug, "deleted"] = False
-            return True, today_df
+        reverted = self.today_batch.set_deleted(slug, False)
+        self._index_today_log(slug)
+        return reverted
 
-        return False, today_df
-
-    def get_upsert_daily_book_log_stmt(self, book: dict[str, Any]) -> bool:
+    def get_upsert_daily_book_log_stmt(self, book: dict[str, Any]) -> Insert:
         """
         Upsert the daily book log.
 
         :param book: the book to upsert
         :type book: dict[str, Any]
 
-        :return: whether the book was upserted or not
-        :rtype: bool
+        :return: the SQL statement to upsert the book
+        :rtype: sqlalchemy.sql.dml.Insert
         """
-        table_name = f"{self.schema}.{self.user_id}_book_logs"
-        table = self.metadata.tables[table_name]
-
-        book = {k: v for k, v in book.items() if k != "id"}  # filter out the id
-
-        stmt = insert(table).values(**book)
-        stmt = stmt.on_conflict_do_update(
-            index_elements=["slug", "log_created_at"],
-            set_={
-                "title": stmt.excluded.title,
-                "subtitle": stmt.excluded.subtitle,
-                "author": stmt.excluded.author,
-                "location": stmt.excluded.location,
-                "publisher": stmt.excluded.publisher,
-                "published_year": stmt.excluded.published_year,
-                "page_n": stmt.excluded.page_n,
-                "page_current": stmt.excluded.page_current,
-                "finish_date": stmt.excluded.finish_date,
-                "tag1": stmt.excluded.tag1,
-                "tag2": stmt.excluded.tag2,
-                "tag3": stmt.excluded.tag3,
-                "language": stmt.excluded.language,
-                "started": stmt.excluded.page_current > 0,
-                "deleted": stmt.excluded.deleted,
-            },
-        )
-
-        return stmt
+        return self._get_upsert_daily_book_log_stmt(book)
 
-    def delete_book(
-        self, slug: str, today_df: pd.DataFrame, latest_df: pd.DataFrame
-    ) -> Tuple[bool, pd.DataFrame]:
+    def delete_book(self, slug: str, latest_df: pd.DataFrame) -> bool:
         """
         Delete a book from the user's book list.
 
         :param slug: the slug of the book to delete
         :type slug: str
-        :param today_df: the dataframe to delete the book from
-        :type today_df: pd.DataFrame
         :param latest_df: the latest dataframe of the user's books
         :type latest_df: pd.DataFrame
 
-        :return: whether the book was deleted or not, the dataframe with the book deleted
-        :rtype: Tuple[bool, pd.DataFrame]
+        :return: whether the book was deleted or not
+        :rtype: bool
         """
-        if slug in set(today_df["slug"].unique().tolist()):
-            today_df.loc[today_df["slug"] == slug, "deleted"] = True
-            return True, today_df
+        if not self.today_batch.set_deleted(slug, True):
+            book_to_be_deleted = latest_df.loc[latest_df["slug"] == slug].to_dict(
+                "records"
+            )[0]
+            self.slug_index.add(slug)
+            self.today_batch.put(
+                self._get_today_log(
+                    book=book_to_be_deleted, finished=False, deleted=True
+                )
+            )
 
-        book_to_be_deleted = latest_df.loc[latest_df["slug"] == slug].to_dict(
-            "records"
-        )[0]
-        today_df = self._append_book_to_df(
-            book=book_to_be_deleted, finished=False, df=today_df, deleted=True
-        )
-        return True, today_df
+        self._index_today_log(slug)
+        return True
 
     def remove_deleted_books(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -261,6 +749,74 @@ class BookKeeperIO:
         return df.query("slug not in @deleted_books")
 
     # private methods
+    def _overlay_pending_books(
+        self,
+        books_df: pd.DataFrame | None,
+        today_batch_df: pd.DataFrame | None,
+        latest_state_df: pd.DataFrame | None,
+    ) -> Tuple[pd.DataFrame | None, pd.DataFrame | None, pd.DataFrame | None]:
+        """
+        Add the logs still waiting in the write-behind queue to the tables.
+
+        A pending log replaces the log of the same book and day.
+        The example data is replaced as a whole.
+
+        :param books_df: the user's book list, None to skip it
+        :type books_df: pd.DataFrame | None
+        :param today_batch_df: today's batch, None to skip it
+        :type today_batch_df: pd.DataFrame | None
+        :param latest_state_df: the latest state of the books, None to skip it
+        :type latest_state_df: pd.DataFrame | None
+
+        :return: the user's book list, today's batch and the latest state of the books
+        :rtype: Tuple[pd.DataFrame | None, pd.DataFrame | None, pd.DataFrame | None]
+        """
+        pending_df = self._get_pending_books()
+        if pending_df.empty:
+            return books_df, today_batch_df, latest_state_df
+
+        pending_df = pending_df.drop(columns="user_id", errors="ignore")
+        pending_keys = pd.MultiIndex.from_frame(pending_df[["slug", "log_created_at"]])
+        self.slug_index.update(pending_df["slug"])
+
+        def overlay(df: pd.DataFrame) -> pd.DataFrame:
+            if "id" not in df.columns:
+                df = df.iloc[0:0]
+            keys = pd.MultiIndex.from_frame(df[["slug", "log_created_at"]])
+            # empty frames and columns would only decide the dtypes, the schema does
+            frames = [
+                frame.dropna(axis=1, how="all")
+                for frame in (df[~keys.isin(pending_keys)], pending_df)
+                if not frame.empty
+            ]
+            columns = df.columns.union(pending_df.columns, sort=False)
+            return apply_book_logs_schema(
+                pd.concat(frames, ignore_index=True).reindex(columns=columns)
+            )
+
+        today = pd.Timestamp.today().normalize()  # noqa: F841
+        if books_df is not None:
+            books_df = overlay(books_df)
+        if today_batch_df is not None:
+            today_batch_df = overlay(today_batch_df).query("log_created_at==@today")
+        if latest_state_df is not None:
+            latest_state_df = self._get_latest_book_version(
+                overlay(latest_state_df), date_col="log_created_at"
+            )
+
+        return books_df, today_batch_df, latest_state_df
+
+    def _get_pending_books(self) -> pd.DataFrame:
+        """
+        Get the user's logs still waiting in the write-behind queue.
+
+        :return: the pending logs, empty without a write-behind queue
+        :rtype: pd.DataFrame
+        """
+        if self.write_behind is None:
+            return pd.DataFrame()
+        return self.write_behind.get_pending(self.user_id, self.layout.value)
+
     def _get_all_books(self) -> pd.DataFrame:
         """
         Get all the user's books.
@@ -272,24 +828,599 @@ class BookKeeperIO:
         :rtype: pd.DataFrame
         """
         if self._user_table_exists():
-            books_df = pd.read_sql(
-                f"SELECT * FROM {self.schema}.{self.user_id}_book_logs",
-                self.sql_engine,
-            )
-            self.existing_book_slugs = set(books_df["slug"].unique().tolist())
+            # the watermark is set from these logs, so they are read from the
+            # primary, a lagging replica could miss logs below the watermark
+            # that no later refresh would fetch
+            books_df = self._read_books(self._select_books())
+            self.slug_index.reset(books_df["slug"].unique().tolist())
             return books_df
 
         return EXAMPLE_DATA
 
+    def _select_books(self) -> Select:
+        """
+        Select the user's logs, with the same columns in either layout.
+
+        :return: the select statement
+        :rtype: sqlalchemy.Select
+        """
+        columns = [col for col in self.table.c if col.name != "user_id"]
+        return select(*columns).where(self._user_filter())
+
+    def _user_filter(self) -> ColumnElement[bool]:
+        """
+        Get the condition restricting a query to the user's logs.
+
+        :return: the condition on the user_id in the partitioned layout
+        :rtype: sqlalchemy.ColumnElement[bool]
+        """
+        if self.layout == StorageLayout.PARTITIONED:
+            return self.table.c.user_id == self.user_id
+        return true()
+
+    def _reading_stats_filter(self) -> ColumnElement[bool]:
+        """
+        Get the condition restricting a query to the user's reading statistics.
+
+        :return: the condition on the user_id and the layout
+        :rtype: sqlalchemy.ColumnElement[bool]
+        """
+        table = self.reading_stats_table
+        return (table.c.user_id == self.user_id) & (table.c.layout == self.layout.value)
+
+    def _read_logs_for_stats(
+        self, conn: Connection, slugs: set[str] | None
+    ) -> pd.DataFrame:
+        """
+        Read the logs of the books the statistics are updated for.
+
+        :param conn: the connection of the save
+        :type conn: sqlalchemy.engine.Connection
+        :param slugs: the slugs of the books, every book if None
+        :type slugs: set[str] | None
+
+        :return: the logs of the books, only the columns of the statistics
+        :rtype: pd.DataFrame
+        """
+        columns = [self.table.c[col] for col in READING_STATS_LOG_COLUMNS]
+        stmt = select(*columns).where(self._user_filter())
+        if slugs is not None:
+            stmt = stmt.where(self.table.c.slug.in_(slugs))
+
+        result = conn.execute(stmt)
+        return apply_book_logs_schema(
+            pd.DataFrame(result.fetchall(), columns=READING_STATS_LOG_COLUMNS)
+        )
+
+    def _load_reading_stats(
+        self, conn: Connection, pending_df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        Read the user's reading statistics, rebuilding them if none are stored.
+
+        The change of the logs still waiting in the write-behind queue
+        is added to the statistics read, they are not stored yet.
+
+        :param conn: the connection to read and write with, committed by the caller
+        :type conn: sqlalchemy.engine.Connection
+        :param pending_df: the logs waiting in the write-behind queue
+        :type pending_df: pd.DataFrame
+
+        :return: the reading statistics
+        :rtype: pd.DataFrame
+        """
+        self._create_reading_stats_table(conn)
+        stats_df = self._read_reading_stats(conn)
+        if stats_df.empty:
+            stats_df = self._rebuild_reading_stats(conn)
+        if pending_df.empty:
+            return stats_df
+
+        previous_df = self._read_logs_for_stats(conn, set(pending_df["slug"]))
+        stored_end = None if stats_df.empty else stats_df["stat_date"].iloc[-1]
+        end, delta_df = self._get_reading_stats_delta(
+            previous_df, pending_df, stored_end
+        )
+
+        stats_df = stats_df.set_index("stat_date")
+        delta_df = delta_df.set_index("stat_date")
+        dates = stats_df.index.union(delta_df.index)
+        if dates.empty:
+            return stats_df.reset_index()
+        dates = pd.date_range(dates.min(), end, freq="D", unit="s", name="stat_date")
+        stats_df = stats_df.reindex(dates)
+        stats_df["total_pages"] = stats_df["total_pages"].ffill()
+        stats_df = stats_df.fillna(0).add(delta_df.reindex(dates), fill_value=0)
+        return stats_df.astype("int64").reset_index()
+
+    def _read_reading_stats(self, conn: Connection) -> pd.DataFrame:
+        """
+        Read the user's reading statistics, one row for every day.
+
+        :param conn: the connection to read with
+        :type conn: sqlalchemy.engine.Connection
+
+        :return: the reading statistics, empty if none are stored
+        :rtype: pd.DataFrame
+        """
+        table = self.reading_stats_table
+        stmt = (
+            select(*(table.c[col] for col in DAILY_STATS_COLUMNS))
+            .where(self._reading_stats_filter())
+            .order_by(table.c.stat_date)
+        )
+        stats_df = pd.DataFrame(
+            conn.execute(stmt).fetchall(), columns=DAILY_STATS_COLUMNS
+        )
+        if stats_df.empty:
+            return stats_df
+
+        # days a save has not reached yet keep the total of the day before
+        stats_df["stat_date"] = pd.to_datetime(stats_df["stat_date"]).astype(DATE_DTYPE)
+        dates = pd.date_range(
+            stats_df["stat_date"].min(),
+            stats_df["stat_date"].max(),
+            freq="D",
+            unit="s",
+            name="stat_date",
+        )
+        stats_df = stats_df.set_index("stat_date").reindex(dates)
+        stats_df["total_pages"] = stats_df["total_pages"].ffill()
+        return stats_df.fillna(0).astype("int64").reset_index()
+
+    def _rebuild_reading_stats(self, conn: Connection) -> pd.DataFrame:
+        """
+        Compute the user's reading statistics from every log and store them.
+
+        :param conn: the connection to write with
+        :type conn: sqlalchemy.engine.Connection
+
+        :return: the reading statistics
+        :rtype: pd.DataFrame
+        """
+        books_df = self._read_logs_for_stats(conn, None)
+        stats_df = BookKeeperDataOps().get_timeline(books_df).daily_stats()
+
+        conn.execute(
+            delete(self.reading_stats_table).where(self._reading_stats_filter())
+        )
+        if not stats_df.empty:
+            conn.execute(
+                insert(self.reading_stats_table), self._get_stats_records(stats_df)
+            )
+        return stats_df
+
+    def _update_reading_stats(
+        self, conn: Connection, previous_df: pd.DataFrame, written_df: pd.DataFrame
+    ) -> None:
+        """
+        Update the user's reading statistics with the logs just written.
+
+        Only the books written are read, their statistics before and after
+        the save are computed and the difference is added to the stored rows.
+        Days after the last stored one first get the total of that day.
+
+        :param conn: the connection of the save
+        :type conn: sqlalchemy.engine.Connection
+        :param previous_df: the logs of the books written, before the save
+        :type previous_df: pd.DataFrame
+        :param written_df: the logs written
+        :type written_df: pd.DataFrame
+        """
+        if written_df.empty:
+            return
+
+        table = self.reading_stats_table
+        self._create_reading_stats_table(conn)
+        stored_end = conn.execute(
+            select(func.max(table.c.stat_date)).where(self._reading_stats_filter())
+        ).scalar()
+        if stored_end is None:
+            self._rebuild_reading_stats(conn)
+            return
+
+        end, delta_df = self._get_reading_stats_delta(
+            previous_df, written_df, pd.Timestamp(stored_end)
+        )
+        if end > pd.Timestamp(stored_end):
+            stored_total = conn.execute(
+                select(table.c.total_pages).where(
+                    self._reading_stats_filter(), table.c.stat_date == stored_end
+                )
+            ).scalar()
+            carried_df = pd.DataFrame(
+                {
+                    "stat_date": pd.date_range(
+                        pd.Timestamp(stored_end) + pd.Timedelta(days=1), end, freq="D"
+                    ),
+                    "total_pages": stored_total,
+                    "pages_delta": 0,
+                    "books_finished": 0,
+                    "active_books": 0,
+                }
+            )
+            conn.execute(
+                insert(table).on_conflict_do_nothing(),
+                self._get_stats_records(carried_df),
+            )
+
+        if delta_df.empty:
+            return
+
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.layout, table.c.stat_date],
+            set_={
+                col: table.c[col] + stmt.excluded[col]
+                for col in DAILY_STATS_COLUMNS[1:]
+            },
+        )
+        conn.execute(stmt, self._get_stats_records(delta_df))
+
+    def _get_reading_stats_delta(
+        self,
+        previous_df: pd.DataFrame,
+        written_df: pd.DataFrame,
+        stored_end: pd.Timestamp | None,
+    ) -> Tuple[pd.Timestamp, pd.DataFrame]:
+        """
+        Get the change of the reading statistics brought by the written logs.
+
+        :param previous_df: the logs of the books written, before the save
+        :type previous_df: pd.DataFrame
+        :param written_df: the logs written
+        :type written_df: pd.DataFrame
+        :param stored_end: the last day of the stored statistics, None if none are
+        :type stored_end: pd.Timestamp | None
+
+        :return: the last day of the statistics with the logs written and
+            the change of every day that changed
+        :rtype: Tuple[pd.Timestamp, pd.DataFrame]
+        """
+        written_df = apply_book_logs_schema(
+            written_df.reindex(columns=READING_STATS_LOG_COLUMNS)
+        )
+        written_keys = pd.MultiIndex.from_frame(written_df[["slug", "log_created_at"]])
+        previous_keys = pd.MultiIndex.from_frame(
+            previous_df[["slug", "log_created_at"]]
+        )
+        current_df = pd.concat(
+            [previous_df[~previous_keys.isin(written_keys)], written_df],
+            ignore_index=True,
+        )
+        end = current_df["log_created_at"].max()
+        if stored_end is not None:
+            end = max(stored_end, end)
+
+        data_ops = BookKeeperDataOps()
+        delta_df = (
+            data_ops.get_timeline(current_df)
+            .daily_stats(end)
+            .set_index("stat_date")
+            .sub(
+                data_ops.get_timeline(previous_df)
+                .daily_stats(end)
+                .set_index("stat_date"),
+                fill_value=0,
+            )
+        )
+        return end, delta_df[(delta_df != 0).any(axis=1)].reset_index()
+
+    def _get_stats_records(self, stats_df: pd.DataFrame) -> list[dict[str, Any]]:
+        """
+        Get the rows of the reading statistics table of the user.
+
+        :param stats_df: the reading statistics of the days
+        :type stats_df: pd.DataFrame
+
+        :return: the rows to insert
+        :rtype: list[dict[str, Any]]
+        """
+        return [
+            {
+                "user_id": self.user_id,
+                "layout": self.layout.value,
+                "stat_date": pd.Timestamp(row["stat_date"]).date(),
+                **{col: int(row[col]) for col in DAILY_STATS_COLUMNS[1:]},
+            }
+            for row in stats_df.to_dict("records")
+        ]
+
+    def _get_latest_books(self) -> pd.DataFrame:
+        """
+        Get the latest log of each of the user's books.
+
+        Computed by postgres, only one row per book is transferred.
+
+        :return: the latest version of the books
+        :rtype: pd.DataFrame
+        """
+        stmt = (
+            self._select_books()
+            .distinct(self.table.c.slug)
+            .order_by(self.table.c.slug, self.table.c.log_created_at.desc())
+        )
+        return self._read_books(stmt)
+
+    def _get_today_books(self) -> pd.DataFrame:
+        """
+        Get the logs of the user's books created today.
+
+        :return: today's batch
+        :rtype: pd.DataFrame
+        """
+        today = pd.Timestamp.today().normalize().date()
+        stmt = self._select_books().where(self.table.c.log_created_at == today)
+        return self._read_books(stmt)
+
+    def _get_books_since_watermark(self) -> pd.DataFrame:
+        """
+        Get the user's logs that are new or might have changed since the last load.
+
+        Upserts of the current day keep the id of the log, the ones of
+        an earlier day give it a new id, so anything not above the
+        watermark id or date is unchanged.
+
+        :return: the user's logs above the watermark
+        :rtype: pd.DataFrame
+        """
+        stmt = self._select_books().where(
+            (self.table.c.id > self._watermark_id)
+            | (self.table.c.log_created_at >= self._watermark_date)
+        )
+        return self._read_books(stmt)
+
+    def _get_changed_books(self, new_books_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep the fetched logs that are new or differ from the loaded ones.
+
+        The latest day is fetched again on every refresh,
+        its logs are only merged when a save changed them.
+
+        :param new_books_df: the logs fetched above the watermark
+        :type new_books_df: pd.DataFrame
+
+        :return: the logs with a new id or with changed values
+        :rtype: pd.DataFrame
+        """
+        if new_books_df.empty:
+            return new_books_df
+
+        loaded_df = self._books_df[self._books_df["id"].isin(new_books_df["id"])]
+        # missing values are matched with missing values
+        matched = new_books_df.merge(
+            loaded_df[new_books_df.columns].drop_duplicates(),
+            how="left",
+            indicator=True,
+        )["_merge"]
+        return new_books_df[(matched == "left_only").to_numpy()]
+
+    def _merge_new_books(self, new_books_df: pd.DataFrame, today: pd.Timestamp) -> None:
+        """
+        Merge the newly fetched logs into the loaded tables.
+
+        A new log replaces the loaded log of the same book and day,
+        which has another id if it was written late.
+        Only the books present in the new logs get their latest state recomputed.
+        The schema is applied again as concatenating categoricals with
+        different categories falls back to objects.
+
+        :param new_books_df: the logs fetched above the watermark
+        :type new_books_df: pd.DataFrame
+        :param today: the current date
+        :type today: pd.Timestamp
+        """
+        new_ids = new_books_df["id"]
+        new_keys = pd.MultiIndex.from_frame(new_books_df[["slug", "log_created_at"]])
+        keys = pd.MultiIndex.from_frame(self._books_df[["slug", "log_created_at"]])
+        books_df = pd.concat(
+            [self._books_df[~keys.isin(new_keys)], new_books_df],
+            ignore_index=True,
+        )
+
+        if today == self._today:
+            today_batch_df = pd.concat(
+                [
+                    self._today_batch_df[~self._today_batch_df["id"].isin(new_ids)],
+                    new_books_df.query("log_created_at==@today"),
+                ]
+            )
+        else:
+            today_batch_df = books_df.query("log_created_at==@today")
+
+        changed_slugs = new_books_df["slug"].unique()
+        latest_state_df = pd.concat(
+            [
+                self._latest_state_df[
+                    ~self._latest_state_df["slug"].isin(changed_slugs)
+                ],
+                self._get_latest_book_version(
+                    books_df[books_df["slug"].isin(changed_slugs)],
+                    date_col="log_created_at",
+                ),
+            ],
+            ignore_index=True,
+        )
+
+        self.slug_index.update(changed_slugs)
+        self._books_df = apply_book_logs_schema(books_df)
+        self._today_batch_df = apply_book_logs_schema(today_batch_df)
+        self._latest_state_df = apply_book_logs_schema(latest_state_df)
+
+    def _set_watermark(self, books_df: pd.DataFrame) -> None:
+        """
+        Remember the highest id and log date loaded.
+
+        The example data has no ids, the watermark is left unset for it
+        so the next call loads the user's table from scratch.
+
+        :param books_df: the loaded logs of the user
+        :type books_df: pd.DataFrame
+        """
+        if "id" not in books_df.columns or books_df.empty:
+            self._watermark_id = None
+            self._watermark_date = None
+            return
+
+        self._watermark_id = int(books_df["id"].max())
+        self._watermark_date = books_df["log_created_at"].max().date()
+
+    def _snapshot_key(self) -> str:
+        """
+        Get the key of the user's snapshot.
+
+        :return: the schema, the layout and the user
+        :rtype: str
+        """
+        return f"{self.schema}/{self.layout.value}/{self.user_id}"
+
+    def _load_snapshot(self, today: pd.Timestamp) -> bool:
+        """
+        Load the tables from the user's snapshot if it is still valid.
+
+        The logs up to the snapshot's max id must still be there unchanged
+        in number, newer logs are fetched above the watermark afterwards.
+
+        :param today: the current date
+        :type today: pd.Timestamp
+
+        :return: whether the snapshot was loaded or not
+        :rtype: bool
+        """
+        if self.snapshot_cache is None or not self._user_table_exists():
+            return False
+
+        snapshot = self.snapshot_cache.load(self._snapshot_key())
+        if snapshot is None:
+            return False
+
+        books_df, version = snapshot
+        if self._get_data_version(version.max_id) != version:
+            self.snapshot_cache.delete(self._snapshot_key())
+            return False
+
+        self._books_df = books_df
+        self._today_batch_df = books_df.query("log_created_at==@today")
+        self._latest_state_df = self._get_latest_book_version(
+            books_df, date_col="log_created_at"
+        )
+        self.slug_index.reset(books_df["slug"].unique().tolist())
+        self._today = today
+        self._set_watermark(books_df)
+
+        return True
+
+    def _save_snapshot(self) -> None:
+        """Save the loaded logs as the user's snapshot."""
+        books_df = self._books_df
+        if self.snapshot_cache is None or self._watermark_id is None:
+            return
+
+        version = DataVersion(int(books_df["id"].max()), len(books_df))
+        self.snapshot_cache.save(self._snapshot_key(), books_df, version)
+
+    def _get_data_version(self, max_id: int) -> DataVersion:
+        """
+        Get the version of the user's logs up to the given id.
+
+        A single aggregate served by the index on the id.
+
+        :param max_id: the highest id to count
+        :type max_id: int
+
+        :return: the highest id and the number of logs up to max_id
+        :rtype: DataVersion
+        """
+        stmt = select(
+            func.coalesce(func.max(self.table.c.id), 0), func.count(self.table.c.id)
+        ).where(self._user_filter(), self.table.c.id <= max_id)
+        with engine_factory.connect() as conn:
+            return DataVersion(*conn.execute(stmt).one())
+
+    def _read_books(self, stmt: Select) -> pd.DataFrame:
+        """
+        Read the result of the query into a dataframe.
+
+        The columns are cast to the canonical dtypes of bk_schema.
+        The cached existence of the user's table is dropped if the query fails.
+        The app reads from the primary, only the exports use the replica.
+
+        :param stmt: the query to run
+        :type stmt: sqlalchemy.Select
+
+        :return: the result of the query
+        :rtype: pd.DataFrame
+        """
+        try:
+            with engine_factory.connect() as conn:
+                books_df = pd.read_sql_query(stmt, conn)
+        except ProgrammingError:
+            self._forget_user_table()
+            raise
+
+        return apply_book_logs_schema(books_df)
+
+    def _user_table_key(self) -> tuple[str | None, str, str]:
+        """
+        Get the key of the user's table in the existence cache.
+
+        :return: the schema, the user and the layout
+        :rtype: tuple[str | None, str, str]
+        """
+        return self.schema, self.user_id, self.layout.value
+
+    def _forget_user_table(self) -> None:
+        """Drop the cached existence of the user's and the statistics' table."""
+        user_tables_existing.discard(self._user_table_key())
+        reading_stats_tables_created.discard(self.schema)
+
+    def _create_reading_stats_table(self, conn: Connection) -> None:
+        """
+        Create the daily reading statistics table if it does not exist yet.
+
+        The catalog is only queried the first time, the answer is cached.
+
+        :param conn: the connection to create the table with
+        :type conn: sqlalchemy.engine.Connection
+        """
+        if self.schema not in reading_stats_tables_created:
+            self.reading_stats_table.create(conn, checkfirst=True)
+            reading_stats_tables_created.add(self.schema)
+
     def _user_table_exists(self) -> bool:
         """
         Check if the user's table exists.
 
+        In the partitioned layout the shared table has to exist
+        and hold logs of the user.
+        The catalog is queried until the table is found, then it is cached.
+
+        :return: whether the table exists or not
+        :rtype: bool
+        """
+        key = self._user_table_key()
+        if key not in user_tables_existing and self._query_user_table_exists():
+            user_tables_existing.add(key)
+
+        return key in user_tables_existing
+
+    def _query_user_table_exists(self) -> bool:
+        """
+        Query the database whether the user's table exists.
+
         :return: whether the table exists or not
         :rtype: bool
         """
         inspector = inspect(self.sql_engine)
-        return inspector.has_table(f"{self.user_id}_book_logs", schema=self.schema)
+        if not inspector.has_table(self.table.name, schema=self.schema):
+            return False
+
+        if self.layout == StorageLayout.PARTITIONED:
+            stmt = select(self.table.c.id).where(self._user_filter()).limit(1)
+            with engine_factory.connect() as conn:
+                return conn.execute(stmt).first() is not None
+
+        return True
 
     def _get_latest_book_version(
         self, books_df: pd.DataFrame, date_col: str
@@ -318,97 +1449,158 @@ class BookKeeperIO:
         :rtype: bool
         """
         try:
-            _ = Table(
-                f"{self.user_id}_book_logs",
-                self.metadata,
-                Column("id", Integer, primary_key=True, autoincrement=True),
-                Column("title", String),
-                Column("subtitle", String),
-                Column("author", String),
-                Column("location", String),
-                Column("publisher", String),
-                Column("published_year", Integer),
-                Column("page_n", Integer),
-                Column("page_current", Integer),
-                Column("finish_date", Date),
-                Column("tag1", String),
-                Column("tag2", String),
-                Column("tag3", String),
-                Column("language", String),
-                Column("slug", String, index=True),
-                Column("started", Boolean),
-                Column("deleted", Boolean),
-                Column("log_created_at", Date, index=True),
-                UniqueConstraint("slug", "log_created_at", name="unique_slug_date"),
-                schema=self.schema,
-            )
-            self.metadata.create_all(self.sql_engine)
-            self.metadata.reflect(bind=self.sql_engine, schema=self.schema)
+            self.table.create(self.sql_engine, checkfirst=True)
+            # an empty shared table does not count as the user's in this layout
+            if self.layout == StorageLayout.PER_USER:
+                user_tables_existing.add(self._user_table_key())
 
             return True
         except ProgrammingError:
             return False
 
-    def _append_book_to_df(
+    def _get_today_log(
         self,
         book: dict[str, Any],
         finished: bool,
-        df: pd.DataFrame,
         deleted: bool = False,
-    ) -> pd.DataFrame:
+    ) -> dict[str, Any]:
         """
-        Append a new book to the dataframe.
+        Get today's log of the book.
 
-        :param book: the book to append
+        :param book: the book to log
         :type book: dict[str, Any]
         :param finished: whether the book is finished or not
         :type finished: bool
-        :param df: the dataframe to append the book to
-        :type df: pd.DataFrame
         :param deleted: whether the book is deleted or not, defaults to False
         :type deleted: bool, optional
 
-        :return: the dataframe with the book appended
-        :rtype: pd.DataFrame
+        :return: the log of the book
+        :rtype: dict[str, Any]
         """
-        if type(book["finish_date"]) != type(pd.to_datetime("today")):  # noqa: E721
-            book["finish_date"] = pd.to_datetime(book["finish_date"])
+        log = {k: v for k, v in book.items() if k != "id"}
+        if type(log["finish_date"]) != type(pd.to_datetime("today")):  # noqa: E721
+            log["finish_date"] = pd.to_datetime(log["finish_date"])
 
-        book["log_created_at"] = pd.to_datetime("today").normalize().date()
-        book["deleted"] = deleted
-        book["started"] = book["page_current"] > 0
+        log["log_created_at"] = pd.Timestamp.today().normalize()
+        log["deleted"] = deleted
+        log["started"] = log["page_current"] > 0
 
-        if not finished:
-            book["finish_date"] = None
+        if not finished or pd.isna(log["finish_date"]):
+            log["finish_date"] = None
 
-        if df.empty:
-            new_df = pd.DataFrame([book])
-        else:
-            new_df = pd.concat([df, pd.DataFrame([book])], ignore_index=True)
-        return new_df
+        return log
+
+    def _load_today_batch(self, today_batch_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Load today's logs into the batch, keeping the ones not saved yet.
+
+        :param today_batch_df: today's logs
+        :type today_batch_df: pd.DataFrame
+
+        :return: today's batch
+        :rtype: pd.DataFrame
+        """
+        self.today_batch.load(today_batch_df)
+        # example data is not in the index, its books must not be added again
+        self.slug_index.update(self.today_batch.records)
+        return self.today_batch.to_df()
+
+    def _index_today_log(self, slug: str) -> None:
+        """
+        Update the search index with today's log of the book, once it is built.
+
+        :param slug: the slug of the book
+        :type slug: str
+        """
+        if self._search_source_df is not None and slug in self.today_batch:
+            self.search_index.put(self.today_batch.records[slug])
 
     def _get_upsert_daily_book_log_stmt(self, book: dict[str, Any]) -> Insert:
         """
         Upsert the daily book log.
 
+        The book is converted like the rows of a bulk upsert,
+        missing values such as NaT or pd.NA are sent as NULL.
+
         :param book: the book to upsert
         :type book: dict[str, Any]
 
         :return: the SQL statement to upsert the book
         :rtype: sqlalchemy.sql.dml.Insert
         """
-        table_name = f"{self.schema}.{self.user_id}_book_logs"
-        table = self.metadata.tables[table_name]
+        (book,) = self._get_book_records(pd.DataFrame([book]))
+        stmt = insert(self.table).values(**book)
+        return self._on_conflict_update_daily_log(stmt)
 
-        book = {k: v for k, v in book.items() if k != "id"}  # filter out the id
-        book["finish_date"] = (
-            None if pd.isna(book["finish_date"]) else book["finish_date"]
-        )  # remove NaT when other in df have finish_date
+    def _get_upsert_daily_book_logs_stmt(self) -> Insert:
+        """
+        Upsert several daily book logs at once.
 
-        stmt = insert(table).values(**book)
-        stmt = stmt.on_conflict_do_update(
-            index_elements=["slug", "log_created_at"],
+        Executed with a list of books the statement is sent as multi-row
+        upserts of at most UPSERT_BATCH_SIZE rows.
+
+        :return: the SQL statement to upsert the books
+        :rtype: sqlalchemy.sql.dml.Insert
+        """
+        stmt = insert(self.table).execution_options(
+            insertmanyvalues_page_size=UPSERT_BATCH_SIZE
+        )
+        return self._on_conflict_update_daily_log(stmt)
+
+    def _get_book_records(self, df: pd.DataFrame) -> list[dict[str, Any]]:
+        """
+        Convert the dataframe to records ready to be upserted.
+
+        Drops the id and the columns not present in the user's table,
+        replaces missing values with None and keeps only the last row
+        per slug and date, as postgres refuses to upsert the same row twice
+        within one statement.
+
+        :param df: the dataframe to convert
+        :type df: pd.DataFrame
+
+        :return: the records to upsert
+        :rtype: list[dict[str, Any]]
+        """
+        columns = [
+            col
+            for col in df.columns
+            if col in self.table.c and col not in ("id", "user_id")
+        ]
+        df = df[columns].drop_duplicates(subset=["slug", "log_created_at"], keep="last")
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col]).dt.date
+
+        books = df.astype(object).where(df.notna(), None).to_dict("records")
+        if self.layout == StorageLayout.PARTITIONED:
+            for book in books:
+                book["user_id"] = self.user_id
+
+        return books
+
+    def _on_conflict_update_daily_log(self, stmt: Insert) -> Insert:
+        """
+        Extend the insert statement to update the daily log on conflict.
+
+        A log of an earlier day, written late by the write-behind queue
+        or an import, takes the new id of the proposed row, so it lands
+        above the watermark of the sessions that loaded it already.
+
+        :param stmt: the insert statement
+        :type stmt: sqlalchemy.sql.dml.Insert
+
+        :return: the SQL statement to upsert the book(s)
+        :rtype: sqlalchemy.sql.dml.Insert
+        """
+        today = pd.Timestamp.today().date()
+        return stmt.on_conflict_do_update(
+            index_elements=self.conflict_columns,
             set_={
+                "id": case(
+                    (stmt.excluded.log_created_at < today, stmt.excluded.id),
+                    else_=self.table.c.id,
+                ),
                 "title": stmt.excluded.title,
                 "subtitle": stmt.excluded.subtitle,
                 "author": stmt.excluded.author,
@@ -427,8 +1619,6 @@ class BookKeeperIO:
             },
         )
 
-        return stmt
-
     def _get_deleted_books(self, df: pd.DataFrame) -> set:
         """
         Get the deleted books.
@@ -442,18 +1632,29 @@ class BookKeeperIO:
         return set(df.query("deleted==True")["slug"].unique().tolist())
 
     @staticmethod
-    def _create_slug(book: dict[str, Any]) -> str:
+    def _create_slug(book: dict[str, Any], legacy: bool = False) -> str:
         """
         Create a slug for the book.
 
         :param book: the book to create the slug for
         :type book: dict[str, Any]
+        :param legacy: whether to drop the accented letters as the slugs
+            stored before the accents were folded, defaults to False
+        :type legacy: bool, optional
 
         :return: the slug of the book
         :rtype: str
         """
+        # accents are folded instead of dropped, "Márai" gives "marai" not "mrai"
+        fold = str if legacy else fold_accents
         author = (
-            re.sub(r"[^a-zA-Z0-9\s-]", "", book["author"]).replace(" ", "-").lower()
+            re.sub(r"[^a-zA-Z0-9\s-]", "", fold(book["author"]))
+            .replace(" ", "-")
+            .lower()
+        )
+        title = (
+            re.sub(r"[^a-zA-Z0-9\s-]", "", fold(book["title"]))
+            .replace(" ", "-")
+            .lower()
         )
-        title = re.sub(r"[^a-zA-Z0-9\s-]", "", book["title"]).replace(" ", "-").lower()
         return f"{author}-{title}"
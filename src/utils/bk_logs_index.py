@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Logs index focused module of the app.
+
+With classes and functions related to looking up the logs of a book.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .bk_frame_cache import FrameCache
+
+logs_indexes = FrameCache()
+
+
+class BookLogsIndex:
+    """
+    Class to get the logs of a book as a slice of the sorted history.
+
+    The history is sorted by slug and date once and the rows of every book
+    are recorded as a range, so a lookup is a dict access and a slice.
+    """
+
+    def __init__(self, books_df: pd.DataFrame) -> None:
+        """
+        Class constructor.
+
+        :param books_df: the logs of the books
+        :type books_df: pd.DataFrame
+        """
+        self.sorted_df = books_df.sort_values(["slug", "log_created_at"], kind="stable")
+
+        slugs = self.sorted_df["slug"].astype(object).to_numpy()
+        starts = np.flatnonzero(np.r_[True, slugs[1:] != slugs[:-1]])
+        ends = np.r_[starts[1:], len(slugs)]
+        self._ranges: dict[str, tuple[int, int]] = {
+            slug: (start, end)
+            for slug, start, end in zip(slugs[starts], starts.tolist(), ends.tolist())
+        }
+
+    def __contains__(self, slug: object) -> bool:
+        """Check whether the book has logs."""
+        return slug in self._ranges
+
+    def get_logs(self, slug: str) -> pd.DataFrame:
+        """
+        Get the logs of the book, from the oldest to the latest.
+
+        :param slug: the slug of the book
+        :type slug: str
+
+        :return: the logs of the book, empty if it has none
+        :rtype: pd.DataFrame
+        """
+        start, end = self._ranges.get(slug, (0, 0))
+        return self.sorted_df.iloc[start:end]
+
+
+def get_logs_index(books_df: pd.DataFrame) -> BookLogsIndex:
+    """
+    Get the logs index of the history of the books.
+
+    One index is built per dataframe and kept as long as the dataframe lives,
+    the index keeps its own sorted copy, not the dataframe.
+
+    :param books_df: the logs of the books
+    :type books_df: pd.DataFrame
+
+    :return: the logs index of the books
+    :rtype: BookLogsIndex
+    """
+    logs_index = logs_indexes.get(books_df)
+    if logs_index is None:
+        logs_index = BookLogsIndex(books_df)
+        logs_indexes.put(logs_index, books_df)
+    return logs_index
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Reading statistics focused module of the app.
+
+With classes and functions related to the KPIs and the reading rates of the user.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .bk_frame_cache import FrameCache
+from .bk_timeline import BookTimeline
+
+# the windows of the rolling reading rates, in days
+ROLLING_WINDOWS = (7, 30, 90)
+# the span of the smoothing of the pages read over time
+SMOOTHING_SPAN = 15
+# the days shown before the first log of the books in progress
+IN_PROGRESS_LEAD_DAYS = 3
+
+reading_stats_cache = FrameCache()
+
+
+class ReadingStats:
+    """
+    Class to compute the reading statistics shown on the Overview page.
+
+    Everything is computed once in the constructor from the daily
+    statistics, the latest state of the books and their timeline,
+    the instance is then only read, so it is kept while the data is unchanged.
+    """
+
+    def __init__(
+        self,
+        reading_stats_df: pd.DataFrame,
+        books_df: pd.DataFrame,
+        timeline: BookTimeline,
+        past_pagecounts: pd.Series,
+        today: pd.Timestamp,
+    ) -> None:
+        """
+        Class constructor.
+
+        :param reading_stats_df: the reading statistics of every day
+        :type reading_stats_df: pd.DataFrame
+        :param books_df: the latest state of the books not deleted, with their state
+        :type books_df: pd.DataFrame
+        :param timeline: the timeline of the page counts of the books
+        :type timeline: BookTimeline
+        :param past_pagecounts: the page counts of the books two weeks ago, by slug
+        :type past_pagecounts: pd.Series
+        :param today: the day the statistics are computed on
+        :type today: pd.Timestamp
+        """
+        self.today = pd.Timestamp(today).normalize()
+        self.books = books_df
+        self.daily = self._get_daily(reading_stats_df)
+        self.streaks = self._get_streaks(self.daily["pages_delta"].to_numpy() > 0)
+        self.kpis = self._get_kpis()
+        self.rolling_rates = {
+            window: (
+                None
+                if self.daily.empty
+                else round(float(self.daily[f"pages_per_day_{window}d"].iloc[-1]), 2)
+            )
+            for window in ROLLING_WINDOWS
+        }
+        self.in_progress = self._get_in_progress(past_pagecounts)
+        self.in_progress_daily = self._get_in_progress_daily(timeline)
+
+    def _get_daily(self, reading_stats_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Extend the daily statistics to today and add the smoothed and rolling rates.
+
+        :param reading_stats_df: the reading statistics of every day
+        :type reading_stats_df: pd.DataFrame
+
+        :return: the statistics of every day up to today
+        :rtype: pd.DataFrame
+        """
+        daily_df = reading_stats_df.set_index("stat_date")
+        if not daily_df.empty and daily_df.index.max() < self.today:
+            dates = pd.date_range(
+                daily_df.index.min(), self.today, freq="D", unit="s", name="stat_date"
+            )
+            daily_df = daily_df.reindex(dates)
+            daily_df["total_pages"] = daily_df["total_pages"].ffill()
+            daily_df = daily_df.fillna(0).astype("int64")
+        daily_df = daily_df.reset_index()
+
+        daily_df["smoothed_total_pages"] = (
+            daily_df["total_pages"].ewm(span=SMOOTHING_SPAN).mean()
+        )
+
+        # the pages read in a window are the difference of two cumulative sums
+        pages_read = np.r_[0, np.cumsum(daily_df["pages_delta"].to_numpy())]
+        days = np.arange(1, len(daily_df) + 1)
+        for window in ROLLING_WINDOWS:
+            window_pages = pages_read[days] - pages_read[np.maximum(days - window, 0)]
+            daily_df[f"pages_per_day_{window}d"] = window_pages / window
+
+        return daily_df
+
+    def _get_streaks(self, reading_days: np.ndarray) -> dict[str, int]:
+        """
+        Get the current and the longest run of consecutive reading days.
+
+        The current streak is still running if the user read yesterday,
+        today is not over yet.
+
+        :param reading_days: whether the user read on each day up to today
+        :type reading_days: np.ndarray
+
+        :return: the current and the longest streak, in days
+        :rtype: dict[str, int]
+        """
+        edges = np.flatnonzero(np.diff(np.r_[0, reading_days.astype(int), 0]))
+        starts, ends = edges[::2], edges[1::2]
+        lengths = ends - starts
+
+        n_days = len(reading_days)
+        current = lengths[(ends == n_days) | (ends == n_days - 1)]
+        return {
+            "current": int(current[-1]) if len(current) else 0,
+            "longest": int(lengths.max(initial=0)),
+        }
+
+    def _get_kpis(self) -> dict[str, float | int | None]:
+        """
+        Get the main KPIs of the user.
+
+        :return: the books and pages read, the days since the first log,
+            the days per book and the pages per day
+        :rtype: dict[str, float | int | None]
+        """
+        books_read = int((self.books["state"] == "finished").sum())
+        if self.daily.empty:
+            pages_read, days_passed = 0, 0
+        else:
+            pages_read = int(self.daily["total_pages"].max())
+            days_passed = (self.today - self.daily["stat_date"].min()).days
+
+        return {
+            "books_read": books_read,
+            "pages_read": pages_read,
+            "days_passed": days_passed,
+            "days_per_book": get_ratio(days_passed, books_read),
+            "pages_per_day": get_ratio(pages_read, days_passed),
+        }
+
+    def _get_in_progress(self, past_pagecounts: pd.Series) -> pd.DataFrame:
+        """
+        Get the books in progress with their progress and its change.
+
+        :param past_pagecounts: the page counts of the books two weeks ago, by slug
+        :type past_pagecounts: pd.Series
+
+        :return: the books in progress, with the progress and its change in percent
+        :rtype: pd.DataFrame
+        """
+        in_progress_df = self.books[self.books["state"] == "in progress"].copy()
+        page_n = in_progress_df["page_n"].to_numpy(dtype=float, na_value=np.nan)
+        page_current = in_progress_df["page_current"].to_numpy(
+            dtype=float, na_value=0.0
+        )
+        past_pages = past_pagecounts.reindex(
+            in_progress_df["slug"].astype(object), fill_value=0
+        ).to_numpy(dtype=float, na_value=0.0)
+
+        progress = page_current / page_n * 100
+        in_progress_df["progress_perc"] = np.round(progress, 2)
+        in_progress_df["progress_delta"] = np.round(
+            progress - past_pages / page_n * 100, 2
+        )
+        return in_progress_df
+
+    def _get_in_progress_daily(self, timeline: BookTimeline) -> pd.DataFrame:
+        """
+        Get the daily page counts of the books in progress.
+
+        :param timeline: the timeline of the page counts of the books
+        :type timeline: BookTimeline
+
+        :return: the page counts of every book in progress and day
+        :rtype: pd.DataFrame
+        """
+        slugs = self.in_progress["slug"].tolist()
+        logs_df = timeline.logs
+        start = logs_df.loc[logs_df["slug"].isin(slugs), "log_created_at"].min()
+        return timeline.to_dense(
+            start=start - pd.DateOffset(days=IN_PROGRESS_LEAD_DAYS), slugs=slugs
+        )
+
+
+def get_ratio(numerator: float, denominator: float) -> float | None:
+    """
+    Get the ratio rounded to two decimals.
+
+    :param numerator: the numerator of the ratio
+    :type numerator: float
+    :param denominator: the denominator of the ratio
+    :type denominator: float
+
+    :return: the ratio, None if the denominator is 0
+    :rtype: float | None
+    """
+    if not denominator:
+        return None
+    return round(numerator / denominator, 2)
+
+
+def get_cached_reading_stats(
+    frames: tuple[pd.DataFrame, ...], today: pd.Timestamp
+) -> ReadingStats | None:
+    """
+    Get the reading statistics computed from the dataframes, if still cached.
+
+    :param frames: the dataframes the statistics were computed from
+    :type frames: tuple[pd.DataFrame, ...]
+    :param today: the day the statistics are asked for
+    :type today: pd.Timestamp
+
+    :return: the reading statistics, None if not cached or computed another day
+    :rtype: ReadingStats | None
+    """
+    reading_stats = reading_stats_cache.get(*frames)
+    if reading_stats is None or reading_stats.today != pd.Timestamp(today).normalize():
+        return None
+    return reading_stats
+
+
+def cache_reading_stats(
+    frames: tuple[pd.DataFrame, ...], reading_stats: ReadingStats
+) -> None:
+    """
+    Keep the reading statistics as long as the dataframes they were computed from live.
+
+    The statistics of another day replace the ones kept for the same dataframes.
+
+    :param frames: the dataframes the statistics were computed from
+    :type frames: tuple[pd.DataFrame, ...]
+    :param reading_stats: the reading statistics
+    :type reading_stats: ReadingStats
+    """
+    reading_stats_cache.put(reading_stats, *frames)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Schema focused module of the app.
+
+With classes and functions related to the dtypes of the book log dataframes.
+"""
+
+import pandas as pd
+
+# pandas has no day resolution, seconds is the smallest unit it supports
+DATE_DTYPE = "datetime64[s]"
+
+BOOK_LOGS_DTYPES: dict[str, str] = {
+    "author": "category",
+    "location": "category",
+    "publisher": "category",
+    "tag1": "category",
+    "tag2": "category",
+    "tag3": "category",
+    "language": "category",
+    "published_year": "Int32",
+    "page_n": "Int32",
+    "page_current": "Int32",
+    "log_created_at": DATE_DTYPE,
+    "finish_date": DATE_DTYPE,
+    "started": "boolean",
+    "deleted": "boolean",
+}
+
+DATE_COLUMNS = [col for col, dtype in BOOK_LOGS_DTYPES.items() if dtype == DATE_DTYPE]
+
+
+def apply_book_logs_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast the columns of the book logs to their canonical dtypes.
+
+    Columns missing from the dataframe are skipped, the rest are left as is.
+    Categories are not shared between dataframes, so the schema has to be
+    applied again after concatenating them.
+
+    :param df: the book logs
+    :type df: pd.DataFrame
+
+    :return: the book logs with the canonical dtypes
+    :rtype: pd.DataFrame
+    """
+    dtypes = {
+        col: dtype
+        for col, dtype in BOOK_LOGS_DTYPES.items()
+        if col in df.columns and df[col].dtype != dtype
+    }
+    if not dtypes:
+        return df
+
+    df = df.copy()
+    for col, dtype in dtypes.items():
+        if dtype == DATE_DTYPE:
+            df[col] = pd.to_datetime(df[col]).dt.normalize().astype(DATE_DTYPE)
+        elif dtype == "category":
+            # a float categorical of missing values would not take strings later
+            df[col] = df[col].astype(object).astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+
+    return df
+
+
+def get_memory_report(books_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compare the memory usage of the book logs with and without the schema.
+
+    The dtypes of a plain read, objects for strings and dates, are rebuilt
+    from the typed dataframe, so nothing has to be kept around for the report.
+
+    :param books_df: the book logs with the canonical dtypes
+    :type books_df: pd.DataFrame
+
+    :return: the bytes used and saved per column, with a total row
+    :rtype: pd.DataFrame
+    """
+    report = pd.DataFrame(
+        {
+            "raw_bytes": _to_read_dtypes(books_df).memory_usage(index=False, deep=True),
+            "typed_bytes": books_df.memory_usage(index=False, deep=True),
+        }
+    )
+    report.loc["total"] = report.sum()
+    report["saved_bytes"] = report["raw_bytes"] - report["typed_bytes"]
+
+    return report
+
+
+def _to_read_dtypes(books_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast the book logs to the dtypes a plain pd.read_sql would return.
+
+    :param books_df: the book logs with the canonical dtypes
+    :type books_df: pd.DataFrame
+
+    :return: the book logs with the dtypes of a plain read
+    :rtype: pd.DataFrame
+    """
+    df = books_df.copy()
+    for col, dtype in BOOK_LOGS_DTYPES.items():
+        if col not in df.columns:
+            continue
+
+        has_na = df[col].isna().any()
+        if dtype == DATE_DTYPE:
+            df[col] = df[col].dt.date.astype(object)
+        elif dtype == "Int32":
+            df[col] = df[col].astype("float64" if has_na else "int64")
+        elif dtype == "boolean":
+            df[col] = df[col].astype(object if has_na else "bool")
+        else:
+            df[col] = df[col].astype(object)
+
+    return df
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Search focused module of the app.
+
+With classes and functions related to the full-text search of the books.
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Any, Iterable
+
+import pandas as pd
+
+from .bk_slug_index import fold_accents
+
+# the columns searched and how much a term found in them weighs
+SEARCH_FIELD_WEIGHTS = {
+    "title": 3.0,
+    "subtitle": 1.5,
+    "author": 2.0,
+    "tag1": 1.0,
+    "tag2": 1.0,
+    "tag3": 1.0,
+    "location": 0.5,
+}
+# share of the weight kept when a term only starts with the query term
+PREFIX_MATCH_WEIGHT = 0.5
+# the most terms a prefix is expanded to, the shortest prefixes match many
+PREFIX_TERMS_LIMIT = 200
+SEARCH_RESULTS_LIMIT = 20
+
+
+def tokenize(text: Any) -> list[str]:
+    """
+    Split the text into lowercase terms without accents.
+
+    :param text: the text to split, missing values have no terms
+    :type text: Any
+
+    :return: the terms of the text
+    :rtype: list[str]
+    """
+    if not isinstance(text, str):
+        return []
+    return re.findall(r"[a-z0-9]+", fold_accents(text).lower())
+
+
+class BookSearchIndex:
+    """
+    Class to search the books by the words of their title, author and tags.
+
+    Every term keeps the books it is found in with the weight of the fields,
+    the terms are also kept sorted so a prefix is found by binary search.
+    A book is added or replaced one at a time, so the index follows today's
+    changes without being rebuilt.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.books: dict[str, dict[str, Any]] = {}
+        self._postings: dict[str, dict[str, float]] = {}
+        self._terms: list[str] = []
+        self._terms_by_slug: dict[str, set[str]] = {}
+
+    def __contains__(self, slug: object) -> bool:
+        """Check whether the book is indexed."""
+        return slug in self.books
+
+    def __len__(self) -> int:
+        """Get the number of books indexed."""
+        return len(self.books)
+
+    def reset(self, books: Iterable[dict[str, Any]]) -> None:
+        """
+        Replace the indexed books.
+
+        :param books: the latest state of the books
+        :type books: Iterable[dict[str, Any]]
+        """
+        self.books = {}
+        self._postings = {}
+        self._terms_by_slug = {}
+        for book in books:
+            if not book.get("deleted"):
+                self._add(book)
+        self._terms = sorted(self._postings)
+
+    def put(self, book: dict[str, Any]) -> None:
+        """
+        Index the book, replacing its previous state, or drop it if deleted.
+
+        :param book: the latest state of the book
+        :type book: dict[str, Any]
+        """
+        self.remove(book["slug"])
+        if book.get("deleted"):
+            return
+
+        for term in self._add(book):
+            index = bisect_left(self._terms, term)
+            if index == len(self._terms) or self._terms[index] != term:
+                insort(self._terms, term)
+
+    def remove(self, slug: str) -> None:
+        """
+        Drop the book from the index.
+
+        :param slug: the slug of the book
+        :type slug: str
+        """
+        self.books.pop(slug, None)
+        for term in self._terms_by_slug.pop(slug, ()):
+            postings = self._postings[term]
+            del postings[slug]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def search(
+        self, query: str, limit: int = SEARCH_RESULTS_LIMIT
+    ) -> list[tuple[str, float]]:
+        """
+        Get the books matching every term of the query, the best first.
+
+        Query terms match the terms they are a prefix of, so the results
+        follow the query as it is typed. A book scores the weight of the
+        fields a term is in, times how rare the term is, summed over the
+        query terms.
+
+        :param query: the words to search for
+        :type query: str
+        :param limit: the maximum number of books returned
+        :type limit: int, optional
+
+        :return: the slug and the score of the books
+        :rtype: list[tuple[str, float]]
+        """
+        scores: dict[str, float] | None = None
+        # the rarest query terms first, so the candidates shrink fast
+        for term_scores in sorted(
+            (self._score_term(term) for term in set(tokenize(query))), key=len
+        ):
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {
+                    slug: score + term_scores[slug]
+                    for slug, score in scores.items()
+                    if slug in term_scores
+                }
+            if not scores:
+                return []
+
+        if scores is None:
+            return []
+        return heapq.nsmallest(limit, scores.items(), key=lambda hit: (-hit[1], hit[0]))
+
+    def _add(self, book: dict[str, Any]) -> set[str]:
+        """
+        Add the terms of the book to the postings, the sorted terms untouched.
+
+        :param book: the latest state of the book
+        :type book: dict[str, Any]
+
+        :return: the terms added, new or not
+        :rtype: set[str]
+        """
+        slug = book["slug"]
+        weights: dict[str, float] = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for term in tokenize(book.get(field)):
+                weights[term] = weights.get(term, 0.0) + weight
+
+        self.books[slug] = book
+        self._terms_by_slug[slug] = set(weights)
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[slug] = weight
+        return set(weights)
+
+    def _score_term(self, query_term: str) -> dict[str, float]:
+        """
+        Score the books having a term starting with the query term.
+
+        :param query_term: the term of the query
+        :type query_term: str
+
+        :return: the score of the books by slug
+        :rtype: dict[str, float]
+        """
+        scores: dict[str, float] = {}
+        start = bisect_left(self._terms, query_term)
+        for term in self._terms[start : start + PREFIX_TERMS_LIMIT]:
+            if not term.startswith(query_term):
+                break
+
+            postings = self._postings[term]
+            weight = math.log(1 + len(self.books) / len(postings))
+            if term != query_term:
+                weight *= PREFIX_MATCH_WEIGHT
+            for slug, field_weight in postings.items():
+                score = field_weight * weight
+                if score > scores.get(slug, 0.0):
+                    scores[slug] = score
+
+        return scores
+
+
+def get_search_results(
+    search_index: BookSearchIndex, hits: list[tuple[str, float]]
+) -> pd.DataFrame:
+    """
+    Get the indexed books of the hits, with their score.
+
+    :param search_index: the index the hits were found in
+    :type search_index: BookSearchIndex
+    :param hits: the slug and the score of the books
+    :type hits: list[tuple[str, float]]
+
+    :return: the books in the order of the hits
+    :rtype: pd.DataFrame
+    """
+    return pd.DataFrame(
+        [{**search_index.books[slug], "score": score} for slug, score in hits]
+    )
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Slug index focused module of the app.
+
+With classes and functions related to finding duplicate books by their slug.
+"""
+
+import re
+import unicodedata
+from collections import Counter
+from typing import Iterable
+
+# share of trigrams two keys need in common to be reported as similar
+SIMILARITY_THRESHOLD = 0.6
+SIMILAR_SLUGS_LIMIT = 5
+
+
+def fold_accents(text: str) -> str:
+    """
+    Strip the accents of the text, "Márai Sándor" becomes "Marai Sandor".
+
+    :param text: the text to fold
+    :type text: str
+
+    :return: the text without accents
+    :rtype: str
+    """
+    if text.isascii():
+        return text
+
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def get_slug_key(slug: str) -> str:
+    """
+    Get the normalized key of the slug.
+
+    Accents, case and punctuation are dropped, every run of separators becomes
+    a single hyphen, so "tom-cat-tales" and "tomcat-tales" keep different keys.
+    Initials are joined, so "j-r-r-tolkien-..." and "jrr-tolkien-..." share
+    the same key.
+
+    :param slug: the slug of the book
+    :type slug: str
+
+    :return: the key of the slug
+    :rtype: str
+    """
+    key = "-".join(re.findall(r"[a-z0-9]+", fold_accents(slug).lower()))
+    return re.sub(r"\b([a-z])-(?=[a-z]\b)", r"\1", key)
+
+
+def get_trigrams(key: str) -> set[str]:
+    """
+    Get the trigrams of the key, padded so short keys still have some.
+
+    :param key: the normalized key
+    :type key: str
+
+    :return: the trigrams of the key
+    :rtype: set[str]
+    """
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class SlugIndex:
+    """
+    Class to keep the slugs of the user's books indexed for duplicate checks.
+
+    Exact slugs and normalized keys are looked up in constant time,
+    similar keys are found through the trigrams they share.
+    """
+
+    def __init__(self, slugs: Iterable[str] = ()) -> None:
+        """
+        Class constructor.
+
+        :param slugs: the slugs to index
+        :type slugs: Iterable[str], optional
+        """
+        self.slugs: set[str] = set()
+        self._slugs_by_key: dict[str, set[str]] = {}
+        self._keys_by_trigram: dict[str, set[str]] = {}
+        self.update(slugs)
+
+    def __contains__(self, slug: object) -> bool:
+        """Check whether the exact slug is indexed."""
+        return slug in self.slugs
+
+    def __len__(self) -> int:
+        """Get the number of slugs indexed."""
+        return len(self.slugs)
+
+    def add(self, slug: str) -> None:
+        """
+        Index the slug.
+
+        :param slug: the slug of the book
+        :type slug: str
+        """
+        if slug in self.slugs:
+            return
+
+        self.slugs.add(slug)
+        key = get_slug_key(slug)
+        if key not in self._slugs_by_key:
+            self._slugs_by_key[key] = set()
+            for trigram in get_trigrams(key):
+                self._keys_by_trigram.setdefault(trigram, set()).add(key)
+        self._slugs_by_key[key].add(slug)
+
+    def update(self, slugs: Iterable[str]) -> None:
+        """
+        Index every slug.
+
+        :param slugs: the slugs of the books
+        :type slugs: Iterable[str]
+        """
+        for slug in slugs:
+            self.add(slug)
+
+    def reset(self, slugs: Iterable[str]) -> None:
+        """
+        Replace the indexed slugs.
+
+        :param slugs: the slugs of the books
+        :type slugs: Iterable[str]
+        """
+        self.slugs = set()
+        self._slugs_by_key = {}
+        self._keys_by_trigram = {}
+        self.update(slugs)
+
+    def get_duplicates(self, slug: str) -> set[str]:
+        """
+        Get the indexed slugs with the same normalized key as the slug.
+
+        :param slug: the slug of the book
+        :type slug: str
+
+        :return: the duplicate slugs, including the slug itself if indexed
+        :rtype: set[str]
+        """
+        return set(self._slugs_by_key.get(get_slug_key(slug), ()))
+
+    def get_similar(
+        self,
+        slug: str,
+        threshold: float = SIMILARITY_THRESHOLD,
+        limit: int = SIMILAR_SLUGS_LIMIT,
+    ) -> list[str]:
+        """
+        Get the indexed slugs similar to the slug, the most similar first.
+
+        The similarity is the Jaccard index of the trigrams of the keys.
+        Only keys sharing at least one trigram with the slug are scored.
+
+        :param slug: the slug of the book
+        :type slug: str
+        :param threshold: the minimum similarity, between 0 and 1
+        :type threshold: float, optional
+        :param limit: the maximum number of slugs returned
+        :type limit: int, optional
+
+        :return: the similar slugs, without the slug itself
+        :rtype: list[str]
+        """
+        trigrams = get_trigrams(get_slug_key(slug))
+        shared = Counter(
+            key
+            for trigram in trigrams
+            for key in self._keys_by_trigram.get(trigram, ())
+        )
+
+        scores = {}
+        for key, n_shared in shared.items():
+            n_key = len(get_trigrams(key))
+            score = n_shared / (len(trigrams) + n_key - n_shared)
+            if score >= threshold:
+                scores[key] = score
+
+        similar = [
+            similar_slug
+            for key in sorted(scores, key=lambda key: (-scores[key], key))
+            for similar_slug in sorted(self._slugs_by_key[key])
+            if similar_slug != slug
+        ]
+        return similar[:limit]
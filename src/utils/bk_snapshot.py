@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Snapshot focused module of the app.
+
+With classes and functions related to caching the book logs on local disk.
+"""
+
+import hashlib
+import json
+import os
+from functools import lru_cache
+from os import environ
+from pathlib import Path
+from threading import Lock, get_ident
+from typing import NamedTuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .bk_schema import apply_book_logs_schema
+
+VERSION_METADATA_KEY = b"bk_data_version"
+
+
+class DataVersion(NamedTuple):
+    """Stamp of the book logs a snapshot was taken of."""
+
+    max_id: int
+    row_count: int
+
+
+class SnapshotCache:
+    """Class to keep Parquet snapshots of the book logs in a size bounded directory."""
+
+    def __init__(self, directory: str | Path, max_bytes: int) -> None:
+        """
+        Class constructor.
+
+        :param directory: the directory of the snapshots, created if missing
+        :type directory: str | Path
+        :param max_bytes: the size above which the least recently used are evicted
+        :type max_bytes: int
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+
+    def load(self, key: str) -> tuple[pd.DataFrame, DataVersion] | None:
+        """
+        Load the snapshot of the key and mark it as recently used.
+
+        :param key: the key of the snapshot
+        :type key: str
+
+        :return: the book logs and their version, None if there is no snapshot
+        :rtype: tuple[pd.DataFrame, DataVersion] | None
+        """
+        path = self._get_path(key)
+        try:
+            table = pq.read_table(path)
+            os.utime(path)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+
+        metadata = table.schema.metadata or {}
+        if VERSION_METADATA_KEY not in metadata:
+            return None
+
+        version = DataVersion(**json.loads(metadata[VERSION_METADATA_KEY]))
+        return apply_book_logs_schema(table.to_pandas()), version
+
+    def save(self, key: str, books_df: pd.DataFrame, version: DataVersion) -> None:
+        """
+        Save the snapshot of the key, then evict snapshots over the size limit.
+
+        The file is written next to its final place and renamed,
+        so a concurrent session never reads a partial snapshot.
+
+        :param key: the key of the snapshot
+        :type key: str
+        :param books_df: the book logs
+        :type books_df: pd.DataFrame
+        :param version: the version of the book logs
+        :type version: DataVersion
+        """
+        table = pa.Table.from_pandas(books_df, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {
+                **(table.schema.metadata or {}),
+                VERSION_METADATA_KEY: json.dumps(version._asdict()),
+            }
+        )
+
+        path = self._get_path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{get_ident()}.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        """
+        Delete the snapshot of the key.
+
+        :param key: the key of the snapshot
+        :type key: str
+        """
+        self._get_path(key).unlink(missing_ok=True)
+
+    def evict(self) -> list[Path]:
+        """
+        Delete the least recently used snapshots until the directory fits max_bytes.
+
+        :return: the deleted snapshots
+        :rtype: list[Path]
+        """
+        with self._lock:
+            snapshots = []
+            for path in self.directory.glob("*.parquet"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                snapshots.append((stat.st_mtime, stat.st_size, path))
+
+            total_bytes = sum(size for _, size, _ in snapshots)
+            evicted = []
+            for _, size, path in sorted(snapshots):
+                if total_bytes <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total_bytes -= size
+                evicted.append(path)
+
+            return evicted
+
+    def _get_path(self, key: str) -> Path:
+        """
+        Get the path of the snapshot, the key is hashed to a safe file name.
+
+        :param key: the key of the snapshot
+        :type key: str
+
+        :return: the path of the snapshot
+        :rtype: Path
+        """
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.parquet"
+
+
+def get_snapshot_cache() -> SnapshotCache | None:
+    """
+    Get the snapshot cache configured by BK_SNAPSHOT_DIR.
+
+    :return: the snapshot cache, None if snapshots are disabled
+    :rtype: SnapshotCache | None
+    """
+    directory = environ.get("BK_SNAPSHOT_DIR")
+    if not directory:
+        return None
+
+    max_bytes = int(environ.get("BK_SNAPSHOT_MAX_BYTES", 256 * 1024 * 1024))
+    return _get_shared_snapshot_cache(directory, max_bytes)
+
+
+@lru_cache(maxsize=None)
+def _get_shared_snapshot_cache(directory: str, max_bytes: int) -> SnapshotCache:
+    """
+    Get the snapshot cache shared by the sessions of the process.
+
+    :param directory: the directory of the snapshots
+    :type directory: str
+    :param max_bytes: the size above which the least recently used are evicted
+    :type max_bytes: int
+
+    :return: the snapshot cache
+    :rtype: SnapshotCache
+    """
+    return SnapshotCache(directory, max_bytes)
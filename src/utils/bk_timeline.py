@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Timeline focused module of the app.
+
+With classes and functions related to the page counts of the books over time.
+"""
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+ONE_DAY = np.timedelta64(1, "D")
+DAILY_STATS_COLUMNS = [
+    "stat_date",
+    "total_pages",
+    "pages_delta",
+    "books_finished",
+    "active_books",
+]
+
+
+class BookTimeline:
+    """
+    Class to keep the page counts of the books as runs between their logs.
+
+    Every log starts a run holding its page count until the next log of
+    the same book, the last one until the end of the timeline.
+    Daily totals are summed from the changes between the runs, daily rows
+    are only expanded for the books and the window asked for.
+    """
+
+    def __init__(self, books_df: pd.DataFrame) -> None:
+        """
+        Class constructor.
+
+        :param books_df: the logs of the books, with the canonical dtypes
+        :type books_df: pd.DataFrame
+        """
+        # the highest page count wins when a book is logged twice a day
+        logs_df = books_df.sort_values(
+            ["slug", "log_created_at", "page_current"], na_position="first"
+        ).drop_duplicates(["slug", "log_created_at"], keep="last")
+        logs_df = logs_df.reset_index(drop=True)
+
+        # logs without a page count keep the one of the previous log
+        logs_df["page_current"] = (
+            logs_df.groupby("slug")["page_current"].ffill().fillna(0)
+        )
+
+        self.logs = logs_df
+        self.start: pd.Timestamp = logs_df["log_created_at"].min()
+        self.end: pd.Timestamp = logs_df["log_created_at"].max()
+
+    def __len__(self) -> int:
+        """Get the number of runs in the timeline."""
+        return len(self.logs)
+
+    def to_dense(
+        self,
+        start: date | None = None,
+        end: date | None = None,
+        slugs: list[str] | None = None,
+    ) -> pd.DataFrame:
+        """
+        Expand the runs to one row per book and day.
+
+        A book gets rows from its first log, or the start of the window
+        if later, to the end of the window. The days without a log repeat
+        the previous log of the book. The rows are days, not stored logs,
+        so they carry no id.
+
+        :param start: the first day of the window, defaults to the first log
+        :type start: date, optional
+        :param end: the last day of the window, defaults to the last log
+        :type end: date, optional
+        :param slugs: the books to expand, defaults to every book
+        :type slugs: list[str], optional
+
+        :return: the logs of the books for every day of the window
+        :rtype: pd.DataFrame
+        """
+        runs_df = self.logs
+        if slugs is not None:
+            runs_df = runs_df[runs_df["slug"].isin(slugs)]
+        start, end = self._get_window(start, end)
+        if runs_df.empty or pd.isna(start):
+            return runs_df.iloc[0:0].reset_index(drop=True)
+
+        log_dates = runs_df["log_created_at"].to_numpy()
+        next_dates = runs_df.groupby("slug")["log_created_at"].shift(-1).to_numpy()
+        run_ends = np.where(pd.isna(next_dates), end, next_dates - ONE_DAY)
+        run_ends = np.minimum(run_ends.astype(log_dates.dtype), end)
+        run_starts = np.maximum(log_dates, start)
+
+        lengths = np.clip((run_ends - run_starts) // ONE_DAY + 1, 0, None)
+        positions = np.repeat(np.arange(len(runs_df)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+
+        dense_df = runs_df.drop(columns="id", errors="ignore")
+        dense_df = dense_df.iloc[positions].reset_index(drop=True)
+        dense_df["log_created_at"] = run_starts[positions] + offsets * ONE_DAY
+
+        return dense_df
+
+    def daily_totals(
+        self, start: date | None = None, end: date | None = None
+    ) -> pd.DataFrame:
+        """
+        Sum the page counts of every book for each day of the window.
+
+        :param start: the first day of the window, defaults to the first log
+        :type start: date, optional
+        :param end: the last day of the window, defaults to the last log
+        :type end: date, optional
+
+        :return: the date and the summed page count of every day
+        :rtype: pd.DataFrame
+        """
+        start, end = self._get_window(start, end)
+        if self.logs.empty or pd.isna(start):
+            return pd.DataFrame(
+                {"log_created_at": pd.Series(dtype=self.logs["log_created_at"].dtype)}
+                | {"page_current": pd.Series(dtype="int64")}
+            )
+
+        pages = self.logs["page_current"].astype("int64")
+        changes = pages - pages.groupby(self.logs["slug"]).shift(fill_value=0)
+        dates = pd.date_range(
+            min(self.start, start), end, freq="D", unit="s", name="log_created_at"
+        )
+        totals = (
+            changes.groupby(self.logs["log_created_at"])
+            .sum()
+            .reindex(dates, fill_value=0)
+            .cumsum()
+        )
+
+        return totals[totals.index >= start].rename("page_current").reset_index()
+
+    def daily_stats(self, end: date | None = None) -> pd.DataFrame:
+        """
+        Get the reading statistics of every day from the first log on.
+
+        Every column is a sum over the books, so the statistics of a set of
+        books can be updated by adding the difference of their own.
+
+        :param end: the last day, defaults to the last log
+        :type end: date, optional
+
+        :return: the total pages, the pages read, the books finished and
+            the books read of every day
+        :rtype: pd.DataFrame
+        """
+        start, end = self._get_window(None, end)
+        if self.logs.empty or pd.isna(start):
+            return pd.DataFrame(
+                {"stat_date": pd.Series(dtype=self.logs["log_created_at"].dtype)}
+                | {col: pd.Series(dtype="int64") for col in DAILY_STATS_COLUMNS[1:]}
+            )
+
+        pages = self.logs["page_current"].astype("int64")
+        changes = pages - pages.groupby(self.logs["slug"]).shift(fill_value=0)
+        dates = pd.date_range(start, end, freq="D", unit="s", name="stat_date")
+        stats_df = (
+            pd.DataFrame(
+                {"pages_delta": changes, "active_books": (changes > 0).astype("int64")}
+            )
+            .groupby(self.logs["log_created_at"])
+            .sum()
+            .reindex(dates, fill_value=0)
+        )
+        stats_df["total_pages"] = stats_df["pages_delta"].cumsum()
+
+        # a book counts as finished on the finish date of its latest log
+        stats_df["books_finished"] = 0
+        if "finish_date" in self.logs:
+            finish_dates = self.logs.drop_duplicates("slug", keep="last")["finish_date"]
+            stats_df["books_finished"] = (
+                finish_dates.value_counts().reindex(dates, fill_value=0).astype("int64")
+            )
+
+        return stats_df.reset_index()[DAILY_STATS_COLUMNS]
+
+    def _get_window(
+        self, start: date | None, end: date | None
+    ) -> tuple[np.datetime64, np.datetime64]:
+        """
+        Get the window of days, defaulting to the one of the logs.
+
+        :param start: the first day of the window
+        :type start: date | None
+        :param end: the last day of the window
+        :type end: date | None
+
+        :return: the first and the last day as datetimes of the logs' unit
+        :rtype: tuple[np.datetime64, np.datetime64]
+        """
+        start = self.start if start is None or pd.isna(start) else start
+        end = self.end if end is None or pd.isna(end) else end
+        if pd.isna(start) or pd.isna(end):
+            return np.datetime64("NaT"), np.datetime64("NaT")
+
+        dtype = self.logs["log_created_at"].dtype
+        return (
+            pd.Timestamp(start).normalize().to_datetime64().astype(dtype),
+            pd.Timestamp(end).normalize().to_datetime64().astype(dtype),
+        )
@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Today batch focused module of the app.
+
+With classes and functions related to the book logs edited during the day.
+"""
+
+from datetime import date
+from typing import Any, Iterator
+
+import numpy as np
+import pandas as pd
+
+from .bk_schema import apply_book_logs_schema
+
+
+class TodayBatch:
+    """
+    Class to keep today's book logs as records keyed by slug.
+
+    Adding or changing a book only touches its record, the dataframe is built
+    when it is asked for and reused until a record changes again.
+    Every record is hashed, the ones whose hash differs from the saved one
+    are flagged dirty so only they are saved. Changing a record back to
+    its saved values clears the flag again.
+    """
+
+    def __init__(self) -> None:
+        """Class constructor."""
+        self.records: dict[str, dict[str, Any]] = {}
+        self.dirty: set[str] = set()
+        self._hashes: dict[str, int] = {}
+        self._saved_hashes: dict[str, int] = {}
+        self._df: pd.DataFrame | None = None
+        # keeps the columns of the loaded logs for an empty batch
+        self._empty_df = pd.DataFrame()
+
+    def __contains__(self, slug: object) -> bool:
+        """Check whether the book has a log today."""
+        return slug in self.records
+
+    def __len__(self) -> int:
+        """Get the number of books logged today."""
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Iterate over today's logs."""
+        return iter(self.records.values())
+
+    def load(self, today_batch_df: pd.DataFrame) -> None:
+        """
+        Replace the saved logs with the ones loaded, keeping the unsaved ones.
+
+        :param today_batch_df: today's logs as stored in the database
+        :type today_batch_df: pd.DataFrame
+        """
+        unsaved = {slug: self.records[slug] for slug in self.dirty}
+        self.records = {
+            record["slug"]: record for record in today_batch_df.to_dict("records")
+        }
+        self._hashes = {
+            slug: get_record_hash(record) for slug, record in self.records.items()
+        }
+        self._saved_hashes = dict(self._hashes)
+
+        self.dirty = set()
+        for record in unsaved.values():
+            self.put(record)
+        self._empty_df = today_batch_df.iloc[0:0]
+        self._df = None
+
+    def put(self, record: dict[str, Any]) -> bool:
+        """
+        Set the log of the book, flagging it dirty if it changed.
+
+        :param record: the log of the book
+        :type record: dict[str, Any]
+
+        :return: whether the log changed or not
+        :rtype: bool
+        """
+        slug = record["slug"]
+        record_hash = get_record_hash(record)
+        if self._hashes.get(slug) == record_hash:
+            return False
+
+        self.records[slug] = record
+        self._hashes[slug] = record_hash
+        if self._saved_hashes.get(slug) == record_hash:
+            self.dirty.discard(slug)
+        else:
+            self.dirty.add(slug)
+        self._df = None
+        return True
+
+    def set_deleted(self, slug: str, deleted: bool) -> bool:
+        """
+        Flag the log of the book as deleted or not.
+
+        :param slug: the slug of the book
+        :type slug: str
+        :param deleted: whether the book is deleted
+        :type deleted: bool
+
+        :return: whether the book has a log today or not
+        :rtype: bool
+        """
+        if slug not in self.records:
+            return False
+
+        self.put({**self.records[slug], "deleted": deleted})
+        return True
+
+    def mark_clean(self, slugs: set[str]) -> None:
+        """
+        Flag the logs as saved.
+
+        :param slugs: the slugs of the saved books
+        :type slugs: set[str]
+        """
+        for slug in slugs & self.dirty:
+            self._saved_hashes[slug] = self._hashes[slug]
+        self.dirty -= slugs
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Get today's logs as a dataframe, built only if a record changed.
+
+        :return: today's logs
+        :rtype: pd.DataFrame
+        """
+        if self._df is None:
+            self._df = (
+                apply_book_logs_schema(pd.DataFrame(list(self.records.values())))
+                if self.records
+                else self._empty_df
+            )
+
+        return self._df
+
+    def get_dirty_df(self) -> pd.DataFrame:
+        """
+        Get the logs changed since the last save.
+
+        :return: the unsaved logs
+        :rtype: pd.DataFrame
+        """
+        return apply_book_logs_schema(
+            pd.DataFrame(
+                [self.records[slug] for slug in self.records if slug in self.dirty]
+            )
+        )
+
+
+def get_record_hash(record: dict[str, Any]) -> int:
+    """
+    Hash the values of the log, the id left out.
+
+    Values are normalized first, so a log read back from the database
+    hashes the same as the one it was saved from.
+
+    :param record: the log of the book
+    :type record: dict[str, Any]
+
+    :return: the hash of the log
+    :rtype: int
+    """
+    return hash(
+        tuple(
+            sorted(
+                (key, _normalize_value(value))
+                for key, value in record.items()
+                if key != "id"
+            )
+        )
+    )
+
+
+def _normalize_value(value: Any) -> Any:
+    """
+    Normalize a value of a log, missing values to None and dates to strings.
+
+    :param value: the value to normalize
+    :type value: Any
+
+    :return: the normalized value
+    :rtype: Any
+    """
+    if pd.isna(value):
+        return None
+    if isinstance(value, (date, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,422 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Write-behind focused module of the app.
+
+With classes and functions related to saving the book logs in the background.
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import closing
+from os import environ
+from threading import Event, Lock, Thread
+from typing import Any, Callable
+
+import pandas as pd
+
+from .bk_schema import apply_book_logs_schema
+
+FLUSH_INTERVAL_SECONDS = 1.0
+FLUSH_BATCH_SIZE = 5000
+RETRY_MAX_SECONDS = 60.0
+
+# writes the logs of a user in a layout, returns whether they were saved
+BooksWriter = Callable[[str, str, pd.DataFrame], bool]
+
+write_behind_queues: dict[str, "WriteBehindQueue"] = {}
+write_behind_queues_lock = Lock()
+
+
+class SaveJournal:
+    """Class to keep the logs waiting to be saved in a local SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        """
+        Class constructor.
+
+        :param path: the path of the journal, created if missing
+        :type path: str
+        """
+        self.path = path
+        self._lock = Lock()
+
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pending_books (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    layout TEXT NOT NULL,
+                    slug TEXT NOT NULL,
+                    log_created_at TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_pending_books_user "
+                "ON pending_books (user_id, layout)"
+            )
+
+    def append(self, user_id: str, layout: str, books: list[dict[str, Any]]) -> None:
+        """
+        Append the logs of the user, durable once the call returns.
+
+        :param user_id: the id of the user
+        :type user_id: str
+        :param layout: the layout of the user's logs
+        :type layout: str
+        :param books: the logs to save
+        :type books: list[dict[str, Any]]
+        """
+        now = time.time()
+        rows = [
+            (
+                user_id,
+                layout,
+                book["slug"],
+                str(book["log_created_at"]),
+                json.dumps(book, default=str),
+                now,
+            )
+            for book in books
+        ]
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT INTO pending_books "
+                "(user_id, layout, slug, log_created_at, record, enqueued_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def read(
+        self, limit: int | None, user_id: str | None = None, layout: str | None = None
+    ) -> list[tuple[int, str, str, dict[str, Any]]]:
+        """
+        Read the oldest logs waiting to be saved.
+
+        :param limit: the number of logs to read, None for every log
+        :type limit: int | None
+        :param user_id: the user to read the logs of, defaults to every user
+        :type user_id: str, optional
+        :param layout: the layout to read the logs of, defaults to every layout
+        :type layout: str, optional
+
+        :return: the sequence number, the user, the layout and the log
+        :rtype: list[tuple[int, str, str, dict[str, Any]]]
+        """
+        query = "SELECT seq, user_id, layout, record FROM pending_books"
+        params: tuple = ()
+        if user_id is not None:
+            query += " WHERE user_id = ? AND layout = ?"
+            params = (user_id, layout)
+        query += " ORDER BY seq"
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (*params, limit)
+
+        with self._lock, closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        return [(seq, uid, lay, json.loads(record)) for seq, uid, lay, record in rows]
+
+    def get_groups(self) -> list[tuple[str, str]]:
+        """
+        Get the users and layouts with logs waiting, the longest waiting first.
+
+        :return: the user and the layout of every group of logs
+        :rtype: list[tuple[str, str]]
+        """
+        with self._lock, closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT user_id, layout FROM pending_books "
+                "GROUP BY user_id, layout ORDER BY MIN(seq)"
+            ).fetchall()
+
+        return [(user_id, layout) for user_id, layout in rows]
+
+    def remove(self, seqs: list[int]) -> None:
+        """
+        Remove the saved logs.
+
+        :param seqs: the sequence numbers of the logs
+        :type seqs: list[int]
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "DELETE FROM pending_books WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+
+    def get_depth(self) -> tuple[int, float | None]:
+        """
+        Get the number of logs waiting and when the oldest was appended.
+
+        :return: the number of logs and the time of the oldest
+        :rtype: tuple[int, float | None]
+        """
+        with self._lock, closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT COUNT(*), MIN(enqueued_at) FROM pending_books"
+            ).fetchone()
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a connection to the journal.
+
+        :return: the connection
+        :rtype: sqlite3.Connection
+        """
+        conn = sqlite3.connect(self.path, timeout=30)
+        # sync on every commit so an appended log survives a crash
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+
+class WriteBehindQueue:
+    """
+    Class to save the book logs to the database from a background thread.
+
+    The logs are appended to the journal and saved in coalesced batches,
+    one upsert per user. The logs of a user that fail to save are retried
+    with their own backoff, the other users' logs are saved meanwhile.
+    Whatever is left in the journal is replayed when the queue is started.
+    """
+
+    def __init__(
+        self,
+        journal_path: str,
+        write_books: BooksWriter,
+        flush_interval: float = FLUSH_INTERVAL_SECONDS,
+        start: bool = True,
+    ) -> None:
+        """
+        Class constructor.
+
+        :param journal_path: the path of the SQLite journal
+        :type journal_path: str
+        :param write_books: the function writing the logs of a user to the database
+        :type write_books: BooksWriter
+        :param flush_interval: the seconds between two flushes
+        :type flush_interval: float, optional
+        :param start: whether to start the background thread, defaults to True
+        :type start: bool, optional
+        """
+        self.journal = SaveJournal(journal_path)
+        self.write_books = write_books
+        self.flush_interval = flush_interval
+
+        self._metrics_lock = Lock()
+        self._flush_lock = Lock()
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.flushed_rows = 0
+        self.total_flush_seconds = 0.0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+        self.last_error: str | None = None
+        # the failures in a row and the time of the next try, per user and layout
+        self._retries: dict[tuple[str, str], tuple[int, float]] = {}
+
+        self._wake = Event()
+        self._stop = Event()
+        self._thread: Thread | None = None
+        if start:
+            self.start()
+
+    def start(self) -> None:
+        """Start the background thread, replaying what is left in the journal."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="bk-write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """
+        Stop the background thread after a last flush.
+
+        :param timeout: the seconds to wait for the thread, defaults to no limit
+        :type timeout: float, optional
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def enqueue(self, user_id: str, layout: str, books: list[dict[str, Any]]) -> None:
+        """
+        Append the logs to the journal and wake the background thread.
+
+        :param user_id: the id of the user
+        :type user_id: str
+        :param layout: the layout of the user's logs
+        :type layout: str
+        :param books: the logs to save
+        :type books: list[dict[str, Any]]
+        """
+        if books:
+            self.journal.append(user_id, layout, books)
+            self._wake.set()
+
+    def get_pending(self, user_id: str, layout: str) -> pd.DataFrame:
+        """
+        Get the logs of the user not saved yet, the latest per book and day.
+
+        :param user_id: the id of the user
+        :type user_id: str
+        :param layout: the layout of the user's logs
+        :type layout: str
+
+        :return: the logs waiting to be saved
+        :rtype: pd.DataFrame
+        """
+        rows = self.journal.read(None, user_id=user_id, layout=layout)
+        if not rows:
+            return pd.DataFrame()
+
+        books_df = pd.DataFrame([book for _, _, _, book in rows])
+        books_df = books_df.drop_duplicates(["slug", "log_created_at"], keep="last")
+        return apply_book_logs_schema(books_df.reset_index(drop=True))
+
+    def flush(self, due_only: bool = False) -> bool:
+        """
+        Save the oldest logs of every user in the journal, coalesced per user.
+
+        The logs of a user stay in the journal if saving them fails,
+        the next try is delayed exponentially for that user only.
+
+        :param due_only: whether to skip the users still backing off,
+            defaults to False
+        :type due_only: bool, optional
+
+        :return: whether every user's logs were saved
+        :rtype: bool
+        """
+        with self._flush_lock:
+            saved_all = True
+            for user_id, layout in self.journal.get_groups():
+                failures, retry_at = self._retries.get((user_id, layout), (0, 0.0))
+                if due_only and time.monotonic() < retry_at:
+                    saved_all = False
+                    continue
+
+                rows = self.journal.read(
+                    FLUSH_BATCH_SIZE, user_id=user_id, layout=layout
+                )
+                books_df = pd.DataFrame([book for _, _, _, book in rows])
+                books_df = books_df.drop_duplicates(
+                    ["slug", "log_created_at"], keep="last"
+                )
+                start = time.perf_counter()
+                try:
+                    saved = self.write_books(user_id, layout, books_df)
+                    error = None if saved else "the logs were not saved"
+                except Exception as e:  # noqa: B902
+                    saved, error = False, repr(e)
+                self._record_flush(time.perf_counter() - start, len(rows), error)
+
+                if saved:
+                    self.journal.remove([seq for seq, _, _, _ in rows])
+                    self._retries.pop((user_id, layout), None)
+                else:
+                    delay = min(
+                        self.flush_interval * 2 ** (failures + 1), RETRY_MAX_SECONDS
+                    )
+                    self._retries[(user_id, layout)] = (
+                        failures + 1,
+                        time.monotonic() + delay,
+                    )
+                saved_all = saved_all and saved
+
+            return saved_all
+
+    def get_metrics(self) -> dict[str, Any]:
+        """
+        Get the depth of the queue and the latency of the flushes.
+
+        :return: the metrics by name
+        :rtype: dict[str, Any]
+        """
+        depth, oldest = self.journal.get_depth()
+        with self._metrics_lock:
+            return {
+                "queue_depth": depth,
+                "oldest_pending_seconds": time.time() - oldest if oldest else 0.0,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "flushed_rows": self.flushed_rows,
+                "last_flush_seconds": self.last_flush_seconds,
+                "avg_flush_seconds": (
+                    self.total_flush_seconds / self.flushes if self.flushes else 0.0
+                ),
+                "max_flush_seconds": self.max_flush_seconds,
+                "last_error": self.last_error,
+            }
+
+    def _record_flush(self, seconds: float, rows: int, error: str | None) -> None:
+        """
+        Record the outcome of saving the logs of a user.
+
+        :param seconds: the time the save took
+        :type seconds: float
+        :param rows: the number of logs
+        :type rows: int
+        :param error: why the save failed, None if it succeeded
+        :type error: str | None
+        """
+        with self._metrics_lock:
+            self.flushes += 1
+            self.total_flush_seconds += seconds
+            self.last_flush_seconds = seconds
+            self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+            if error is None:
+                self.flushed_rows += rows
+            else:
+                self.failed_flushes += 1
+                self.last_error = error
+
+    def _run(self) -> None:
+        """Flush in a loop, the users whose saves fail are retried when due."""
+        while True:
+            stopping = self._stop.is_set()
+            # the last flush tries every user
+            self.flush(due_only=not stopping)
+            if stopping:
+                return
+
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+
+
+def get_write_behind_queue(write_books: BooksWriter) -> WriteBehindQueue | None:
+    """
+    Get the write-behind queue configured by BK_WRITE_BEHIND_JOURNAL.
+
+    One queue is started per journal and shared by the sessions of the process.
+
+    :param write_books: the function writing the logs of a user to the database
+    :type write_books: BooksWriter
+
+    :return: the queue, None if saves are written synchronously
+    :rtype: WriteBehindQueue | None
+    """
+    journal_path = environ.get("BK_WRITE_BEHIND_JOURNAL")
+    if not journal_path:
+        return None
+
+    with write_behind_queues_lock:
+        if journal_path not in write_behind_queues:
+            write_behind_queues[journal_path] = WriteBehindQueue(
+                journal_path,
+                write_books,
+                flush_interval=float(
+                    environ.get("BK_WRITE_BEHIND_INTERVAL", FLUSH_INTERVAL_SECONDS)
+                ),
+            )
+
+        return write_behind_queues[journal_path]
@@ -103,13 +103,11 @@ def with_user_logs(func):
             if "bk" not in st.session_state:
                 st.session_state.bk = BookKeeperIO(st.session_state["username"])
 
-            # get an update on the tables
-            if "books_df" not in st.session_state:
-                (
-                    st.session_state.books_df,
-                    st.session_state.today_books_df,
-                    st.session_state.latest_book_state_df,
-                ) = st.session_state.bk.get_updated_tables()
+            # get an update on the tables, the history is loaded lazily
+            if "latest_book_state_df" not in st.session_state:
+                _, st.session_state.latest_book_state_df = (
+                    st.session_state.bk.get_latest_tables()
+                )
 
         # here comes the func
         return func(*args, **kwargs)